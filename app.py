@@ -1,46 +1,107 @@
 import os
 import sys
 import json
-import base64
+import time
 import signal
 import threading
 import contextlib
 from datetime import datetime
 from json import JSONDecodeError
-from urllib.request import urlopen, Request, HTTPError
 
 import sentry_sdk
 from slack_bolt import App
 from pydantic import ValidationError
 from slack_bolt.adapter.socket_mode import SocketModeHandler
-
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from middleware.worker import BoundedWorkerPool, QueueFullError
+from middleware.attachment import AttachmentDownloader, MemoryBudget
+from middleware.cache import TTLCache
+from middleware.slack_rate_limit import SlackRateLimiter, RateLimitedSlackClient, COSMETIC
+from middleware.journal import (
+    Job, job_journal, JOB_SHUTDOWN_TIMEOUT, THREAD_FETCHED, LLM_OUTPUT, ISSUE_CREATED, REPLIED, ATTACHMENTS_UPLOADED,
+)
+from middleware.metrics import AdaptiveSampler, stage, registry, jobs_total, start_metrics_server
+from middleware.recorder import event_recorder
+from middleware.coordination import coordinator
+from middleware.directory import user_directory, MISSING, USER_DIRECTORY_SYNC
+from middleware.screen_metadata import screen_metadata
+from middleware.dedupe import ThreadClaims, thread_key, CLAIMED, DUPLICATE
+from middleware.thread_reader import iter_thread_messages
+from middleware.streaming import prune_attachment_urls
 from middleware.laas import jira_summary_generator
 from middleware.laas.heuristic import outside_slack_jira_user_map
-from middleware.laas.jira_operator import JiraOperator
-from middleware.laas.jira_fields_schema import Issue, get_format_instructions
-from middleware.laas.mimetype import get_mime_type_from_url, is_supported_mime_type
+from middleware.laas.jira_operator import get_jira_operator
+from middleware.laas.image import select_thumbnail_url, preview_attachment, to_image_ref_content
+from middleware.laas.response_cache import laas_response_cache, response_cache_key
+from middleware.laas.token_budget import (
+    LAAS_CONTEXT_TOKEN_BUDGET, LAAS_SUMMARY_HASH, SUMMARY_PARAMS, ThreadTooLongError, compact_messages, estimate_tokens,
+)
+from middleware.collection import SlackCollection, Collection, load_collections
+from middleware import slack_blocks
 
 if os.getenv('DEBUG', False):
     from dotenv import load_dotenv
     load_dotenv()
 
+SLACK_API_URL = os.getenv('SLACK_API_URL', WebClient.BASE_URL)
+
 # Initializes your app with your bot token and socket mode handler
-app = App(token=os.environ['SLACK_BOT_TOKEN'])
+# SLACK_API_URL 로 Slack Web API 주소를 바꿀 수 있습니다. e.g. benchmark 의 가짜 Slack 서버
+# 클라이언트를 직접 넘기면 Bolt 가 token 과 함께 지정했다는 경고를 남기므로, Bolt 가 만든 클라이언트의 주소만 바꿉니다.
+# Bolt 는 생성할 때 기본 주소로 auth.test 를 호출하므로, 주소를 바꾼 뒤 같은 확인을 직접 합니다.
+app = App(token=os.environ['SLACK_BOT_TOKEN'], token_verification_enabled=False)
+app.client.base_url = SLACK_API_URL
+app.client.auth_test()
 slack_handler = SocketModeHandler(app_token=os.environ['SLACK_APP_TOKEN'], app=app)
+# Slack API 는 모두 메서드별 rate limit 에 맞춰 호출합니다.
+slack_rate_limiter = SlackRateLimiter()
+slack_client = RateLimitedSlackClient(app.client, slack_rate_limiter)
+
+# 이모지별 이슈 생성 설정입니다. 스키마와 필드 매핑은 시작할 때 한 번만 계산합니다.
+collections = load_collections()
+
+# 이모지가 몰려도 스레드 수와 메모리 사용량이 일정하도록 워커 수와 대기열 크기를 제한합니다.
+laas_jira_pool = BoundedWorkerPool(
+    max_workers=int(os.getenv('LAAS_JIRA_WORKERS', 4)),
+    max_queue_size=int(os.getenv('LAAS_JIRA_QUEUE_SIZE', 16)),
+    thread_name_prefix='laas_jira',
+)
+# 대기열이 가득 찼을 때 거절하기 전에 기다리는 시간(초)입니다. 0 이면 즉시 거절합니다.
+laas_jira_queue_timeout = float(os.getenv('LAAS_JIRA_QUEUE_TIMEOUT', 0))
+registry.gauge('jira_bolt_active_workers', '작업 중인 워커 수', lambda: laas_jira_pool.active_workers)
+registry.gauge('jira_bolt_queue_depth', '대기 중인 작업 수', lambda: laas_jira_pool.queue_depth)
+registry.gauge('jira_bolt_user_directory_size', '유저 디렉터리의 Slack 유저 수', lambda: len(user_directory))
+
+# 모든 워커가 공유하는 Slack 유저 정보 캐시입니다. users_info 호출 횟수를 줄입니다.
+slack_user_cache = TTLCache(
+    maxsize=int(os.getenv('SLACK_USER_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('SLACK_USER_CACHE_TTL', 3600)),
+)
+
+# 같은 이벤트나 같은 메시지에 대한 작업이 중복으로 실행되지 않도록 합니다.
+thread_claims = ThreadClaims(coordinator=coordinator)
+
+
+def get_slack_user(user_id):
+    """
+    Slack 유저 정보를 가져옵니다. 유저 디렉터리와 캐시에 없을 때만 users_info 를 호출합니다.
+    """
+    user = user_directory.slack_user(user_id)
+    if user is not None:
+        return user
+    return slack_user_cache.get_or_load(user_id, lambda: slack_client.users_info(user=user_id)['user'])
 
 
-class SlackCollection:
-    # FIXME:
-    workspace = 'wantedx.slack.com'
-    loading_emoji = 'loading'
-
-
-class PICollection:
-    # FIXME:
-    workspace = 'wantedlab.atlassian.net'
-    project = 'PI'
-    trigger_emoji = 'pi_jira_gen'
-    laas_jira_hash = '8008b106b08d86b0af7a55d0ad18ca058aab88fc7e7a5945eedee7f16827d21e'
+def get_jira_user_id(jira, slack_id):
+    """
+    Slack 유저의 Jira 유저 ID를 가져옵니다. 유저 디렉터리에 있으면 네트워크 호출 없이 가져옵니다.
+    """
+    account_id = user_directory.jira_account_id(slack_id)
+    if account_id is MISSING:
+        account_id = jira.get_user_id_from_email(get_slack_user(slack_id)['profile'].get('email'))
+    return account_id or outside_slack_jira_user_map(slack_id)
 
 
 class SlackOperator:
@@ -58,6 +119,14 @@ class SlackOperator:
         self.thread_ts = None
         self.messages = None
         self.file_data = None
+        self.files = None
+        # LLM 에 보낼 이미지입니다. 메시지에는 원본의 digest 로 가리키고, 요청을 보낼 때 조각 단위로 인코딩합니다.
+        self.images = {}
+        # 작업 하나가 메모리에 두는 첨부파일 크기를 제한하고, 넘으면 임시 파일에 저장합니다.
+        self.budget = MemoryBudget()
+
+        # after check_gpt_response
+        self.response_cache_key = None
 
     def set_conversation_data(self):
         """
@@ -66,109 +135,125 @@ class SlackOperator:
         """
         messages = []
         file_data = []
-        conversations = app.client.conversations_replies(
-            channel=self.item_channel,
-            ts=self.item_ts,
-        )
-        self.thread_ts = conversations["messages"][0].get("thread_ts")
-
-        # 모든 대화 메시지를 가져옵니다
-        for message in conversations["messages"]:
-            # Process each message in the thread
-            message_dt = datetime.fromtimestamp(float(message['ts'])).isoformat()
-            message_user_info = app.client.users_info(user=message['user'])
-            text = f'{message_dt} {message_user_info["user"]["real_name"]}: """{message.get("text", "")}"""'
-            images = []
-
-            # conversation 에 대한 모든 첨부파일을 복제합니다.
-            for file in message.get('files', []):
-                private_file_url = file['url_private']
-
-                # 슬랙 파일 다운로드
-                headers = {'Authorization': f'Bearer {os.environ["SLACK_BOT_TOKEN"]}'}
-                req = Request(private_file_url, headers=headers)
-                try:
-                    response = urlopen(req)
-                except HTTPError:
-                    continue
-
-                content = response.read()
-                file_data.append(content)
-
-                # MIME 타입 확인
-                mime_type = response.getheader('Content-Type') or get_mime_type_from_url(private_file_url)
-                
-                # 지원되는 형식인지 확인
-                if not is_supported_mime_type(mime_type):
-                    # raise ValueError(f"Unsupported MIME type: {mime_type}")
-                    continue
-
-                # Non-animated GIF인지 확인 (GIF에만 적용)
-                if mime_type == "image/gif" and b"NETSCAPE2.0" in content:
-                    # raise ValueError("Animated GIFs are not supported.")
-                    continue
-
-                # Base64 인코딩 수행
-                base64_image = base64.b64encode(content).decode('utf-8')
-
-                # 웹에서 사용할 수 있는 형식으로 반환
-                if base64_image:
-                    images.append({
-                        "type": "image_url",
-                        "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
+        files = []
+        # 여러 답글에 다시 공유된 같은 파일은 한 번만 첨부하고 LLM 에도 한 번만 보냅니다.
+        digests = set()
+
+        with AttachmentDownloader(os.environ["SLACK_BOT_TOKEN"], budget=self.budget) as downloader:
+            # 페이지를 받는 대로 작성자를 조회하고 첨부파일 다운로드를 시작합니다.
+            pending = []
+            for message in iter_thread_messages(slack_client, self.item_channel, self.item_ts):
+                if not pending:
+                    self.thread_ts = message['thread_ts']
+                message_dt = datetime.fromtimestamp(float(message['ts'])).isoformat()
+                author = get_slack_user(message['user'])['real_name'] if message['user'] else message['name']
+                text = f'{message_dt} {author}: """{message["text"]}"""'
+                downloads = []
+                for file in message['files']:
+                    # LLM 에 보내기 충분한 썸네일이 있으면 원본과 함께 다운로드합니다.
+                    thumbnail_url = select_thumbnail_url(file)
+                    downloads.append((
+                        file,
+                        downloader.submit(file),
+                        downloader.submit(file, thumbnail_url) if thumbnail_url else None,
+                    ))
+                pending.append((text, downloads))
+
+            # 모든 대화 메시지를 메시지 순서대로 정리합니다
+            for text, downloads in pending:
+                images = []
+                for file, original, thumbnail in downloads:
+                    attachment = original.result()
+                    if attachment is None or attachment.digest in digests:
+                        continue
+                    digests.add(attachment.digest)
+                    # Jira 에는 원본을 첨부합니다.
+                    file_data.append(attachment)
+                    files.append({key: file.get(key) for key in ('id', 'name', 'mimetype', 'size', 'url_private')})
+
+                    # LLM 에는 썸네일이나 축소한 이미지를 보냅니다. 지원되는 이미지만 LaaS 요청에 포함합니다.
+                    preview = preview_attachment((thumbnail and thumbnail.result()) or attachment, self.budget)
+                    image = to_image_ref_content(attachment.digest, preview)
+                    if image:
+                        self.images[attachment.digest] = preview
+                        images.append(image)
+
+                if images:
+                    messages.append({
+                        "role": "user",
+                        "content": [{"type": "text", "text": text}, *images]
+                    })
+                else:
+                    messages.append({
+                        "role": "user",
+                        "content": text,
                     })
- 
-            if images:
-                messages.append({
-                    "role": "user",
-                    "content": [{"type": "text", "text": text}, *images]
-                })
-            else:
-                messages.append({
-                    "role": "user",
-                    "content": text,
-                })
 
         self.messages = messages
         self.file_data = file_data
+        self.files = files
         return True
 
+    def conversation_data(self):
+        """
+        작업 기록에 저장할 스레드 정보입니다. 첨부파일은 다시 다운로드할 수 있도록 파일 정보만 저장합니다.
+        """
+        return {'thread_ts': self.thread_ts, 'messages': self.messages, 'files': self.files}
+
+    def restore_conversation_data(self, data):
+        """
+        작업 기록에 저장한 스레드 정보로 set_conversation_data 를 대신합니다.
+        """
+        self.thread_ts = data['thread_ts']
+        self.files = data['files']
+        with AttachmentDownloader(os.environ["SLACK_BOT_TOKEN"], budget=self.budget) as downloader:
+            downloads = [downloader.submit(file) for file in self.files]
+            self.file_data = [attachment for attachment in (d.result() for d in downloads) if attachment]
+        # 썸네일은 다시 다운로드하지 않고 원본으로 LLM 에 보낼 이미지를 만듭니다.
+        for attachment in self.file_data:
+            self.images[attachment.digest] = preview_attachment(attachment, self.budget)
+        self.messages = prune_attachment_urls(data['messages'], self.images)
+
     @property
     def link(self):
         return f'https://{SlackCollection.workspace}/archives/{self.item_channel}/p{self.item_ts.replace(".", "")}{f"?thread_ts={self.thread_ts}" if self.thread_ts else ""}'
 
+    def compact_messages(self, hash, params, messages):
+        """
+        스레드가 LaaS 컨텍스트 예산을 넘으면 나눠서 요약한 메시지로 대체합니다.
+        """
+        budget = LAAS_CONTEXT_TOKEN_BUDGET - estimate_tokens(json.dumps(params, ensure_ascii=False))
+
+        def summarize(chunk):
+            response = jira_summary_generator(LAAS_SUMMARY_HASH or hash, SUMMARY_PARAMS, chunk, self.images)
+            return response.json()['choices'][0]['message']['content']
+
+        return compact_messages(messages, summarize, budget)
+
     def check_gpt_response(self, hash, params, messages):
         """
         GPT 응답이 올바른지 확인합니다.
         이 단계는 LaaS 서버의 응답을 잘 받았는지 확인하는 단계입니다
+        스레드가 바뀌지 않았다면 캐시된 응답을 사용합니다.
         """
+        self.response_cache_key = response_cache_key(hash, params, messages)
+        cached = laas_response_cache.get(self.response_cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            gpt_response = jira_summary_generator(hash, params, messages)
+            messages = self.compact_messages(hash, params, messages)
+            gpt_response = jira_summary_generator(hash, params, messages, self.images)
+        except ThreadTooLongError as e:
+            self.say(
+                channel=self.reaction_user,
+                blocks=slack_blocks.thread_too_long_blocks(self.link),
+            )
+            raise e
         except Exception as e:
             self.say(
                 channel=self.reaction_user,
-                blocks=[
-                    {
-                        "type": "header",
-                        "text": {
-                            "type": "plain_text",
-                            "text": f'LaaS 서버에 요청하는 도중에 실패했습니다. 잠시 후 다시 시도해주세요. 동일한 문제가 계속 발생하면 관리자에게 문의해주세요.'
-                        }
-                    },
-                    {
-                        "type": "context",
-                        "elements": [
-                            {
-                                "type": "mrkdwn",
-                                "text": f'Error Message: ```{e}``',
-                            },
-                            {
-                                "type": "mrkdwn",
-                                "text": f'<{self.link}|스레드 바로가기>',
-                            }
-                        ]
-                    }
-                ],
+                blocks=slack_blocks.laas_request_failed_blocks(e, self.link),
             )
             raise e
         try:
@@ -176,28 +261,7 @@ class SlackOperator:
         except KeyError as e:
             self.say(
                 channel=self.reaction_user,
-                blocks=[
-                    {
-                        "type": "header",
-                        "text": {
-                            "type": "plain_text",
-                            "text": f'Jira 이슈 생성에 실패했습니다.'
-                        }
-                    },
-                    {
-                        "type": "context",
-                        "elements": [
-                            {
-                                "type": "mrkdwn",
-                                "text": f'너무 많은 글자수가 스레드에 있진 않은지 확인해 보세요.\nError Message: ```{gpt_response}```',
-                            },
-                            {
-                                "type": "mrkdwn",
-                                "text": f'<{self.link}|스레드 바로가기>',
-                            }
-                        ]
-                    }
-                ],
+                blocks=slack_blocks.laas_response_failed_blocks(gpt_response, self.link),
             )
             raise e
 
@@ -212,32 +276,7 @@ class SlackOperator:
         except JSONDecodeError as e:
             say(
                 channel=self.reaction_user,
-                blocks=[
-                    {
-                        "type": "header",
-                        "text": {
-                            "type": "plain_text",
-                            "text": f'Jira 이슈 생성에 실패했습니다.'
-                        }
-                    },
-                    {
-                        "type": "context",
-                        "elements": [
-                            {
-                                "type": "mrkdwn",
-                                "text": gpt_response,
-                            },
-                            {
-                                "type": "mrkdwn",
-                                "text": f'GPT 가 생성한 내용을 지라로 전달할 수 없어서 실패했습니다. 지라를 생성하기에 앞서 스레드 요약이 충분한지 확인해보세요.',
-                            },
-                            {
-                                "type": "mrkdwn",
-                                "text": f'<{self.link}|스레드 바로가기>',
-                            }
-                        ]
-                    }
-                ],
+                blocks=slack_blocks.invalid_json_blocks(gpt_response, self.link),
             )
             raise e
 
@@ -245,41 +284,24 @@ class SlackOperator:
 def check_emoji(event, say, emoji):
     """
     이미 스레드에 이모지, 즉 생성된 이슈가 있는지 확인합니다.
+    작업이 실행되는 동안 다른 유저가 단 이모지는 이미 걸러냈으므로 개수에서 제외합니다.
     """
     item_channel = event['item']['channel']
     item_ts = event['item']['ts']
     reaction_user = event['user']
 
-    reactions = app.client.reactions_get(
+    reactions = slack_client.reactions_get(
         channel=item_channel,
         timestamp=item_ts,
     )
     jira_gen_count = sum(
         d['count'] for d in reactions['message']['reactions']
         if d['name'] == emoji
-    )
+    ) - thread_claims.concurrent(thread_key(event))
     if jira_gen_count > 1:
         say(
             channel=reaction_user,
-            blocks=[
-                {
-                    "type": "header",
-                    "text": {
-                        "type": "plain_text",
-                        "text": f'이미 지라 이슈가 생성되었습니다.'
-                    },
-                },
-                {
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f'이미 :{emoji}: 이모지가 있어서 지라 이슈를 생성할 수 없습니다.'
-                            ' 히스토리가 이미 지라 티켓으로 저장되었으니 어사인을 변경하시거나, 스레드에서 논의를 지속하거나, 이모지를 모두 지우고 다시 시도해보세요.'
-                        },
-                    ]
-                }
-            ],
+            blocks=slack_blocks.already_created_blocks(emoji),
         )
         return True
     return False
@@ -290,175 +312,244 @@ def loading_reaction(event):
     """
     GPT를 처리하는 동안 UX를 위해
     스레드에 loading 이모지를 추가합니다.
+    rate limit 에 여유가 없으면 이모지를 추가하지 않습니다.
     """
     channel = event['item']['channel']
     item_ts = event['item']['ts']
     try:
         # Respond with an emoji directly to the thread
-        app.client.reactions_add(
+        added = slack_client.reactions_add(
             channel=channel,
             name=SlackCollection.loading_emoji,
             timestamp=item_ts,
+            priority=COSMETIC,
         )
-    finally:
-        ...
+    except SlackApiError as e:
+        # 이어서 처리하는 작업은 지난 프로세스가 추가한 이모지가 남아 있습니다.
+        if e.response['error'] != 'already_reacted':
+            raise e
+        added = True
 
     try:
         yield
     finally:
         try:
             # Remove thumbsup reaction
-            app.client.reactions_remove(
-                channel=channel,
-                name=SlackCollection.loading_emoji,
-                timestamp=item_ts,
-            )
-        finally:
-            ...
+            # 꾸미는 호출이므로 rate limit 에 여유가 없으면 건너뛰고, 실패해도 작업 결과에 영향을 주지 않습니다.
+            if added:
+                slack_client.reactions_remove(
+                    channel=channel,
+                    name=SlackCollection.loading_emoji,
+                    timestamp=item_ts,
+                    priority=COSMETIC,
+                )
+        except Exception as e:
+            print(f'Failed to remove loading reaction: {e}')
 
 
-def laas_jira(event, say, collection: PICollection):
+def laas_jira(event, say, collection: Collection, job: Job):
     """
     GPT 호출에 시간이 걸리기 때문에 스레드에서 처리합니다.
     Lambda 에서 호출할 경우 FaaS를 사용하는 것이 좋습니다.
     https://slack.dev/bolt-python/concepts#lazy-listeners
+
+    단계를 마칠 때마다 job_journal 에 기록하고, 이어서 처리하는 작업은 마친 단계를 건너뜁니다.
     """
     # 성능을 위해 loading_reaction 의존성을 제거합니다.
-    with loading_reaction(event):
-        if check_emoji(event, say, collection.trigger_emoji):
+    with (
+        sentry_sdk.start_transaction(op='laas_jira', name=collection.name),
+        event_recorder.record(event, job),
+        loading_reaction(event),
+    ):
+        with stage('check_emoji'):
+            already_created = not job.reached(THREAD_FETCHED) and check_emoji(event, say, collection.trigger_emoji)
+        if already_created:
+            thread_claims.release(thread_key(event), created=True)
             return
 
         slack = SlackOperator(event, say, collection.trigger_emoji)
 
-        if not slack.set_conversation_data():
-            return
+        with stage('thread_fetch'):
+            if job.reached(THREAD_FETCHED):
+                slack.restore_conversation_data(job.data)
+            elif slack.set_conversation_data():
+                job_journal.checkpoint(job, THREAD_FETCHED, **slack.conversation_data())
+            else:
+                return
+
+        if job.reached(LLM_OUTPUT):
+            gpt_response = job.data['gpt_response']
+        else:
+            with stage('laas'):
+                gpt_response = slack.check_gpt_response(
+                    collection.laas_jira_hash,
+                    collection.schema_params,
+                    slack.messages,
+                )
+        with stage('validation'):
+            gpt_metadata = slack.validate_gpt_response_json(gpt_response, say)
+
+            try:
+                issue = collection.issue_model.model_validate(gpt_metadata)
+            except ValidationError as e:
+                slack.say(
+                    channel=slack.reaction_user,
+                    blocks=slack_blocks.validation_failed_blocks(e, slack.link),
+                )
+                raise e
+
+        if not job.reached(LLM_OUTPUT):
+            # 이슈 필드로 변환할 수 있는 응답만 캐시하여, 같은 스레드로 다시 시도하면 LaaS 를 호출하지 않습니다.
+            laas_response_cache.set(slack.response_cache_key, gpt_response)
+            job_journal.checkpoint(job, LLM_OUTPUT, gpt_response=gpt_response)
+
+        jira = get_jira_operator()
+        jira.ensure_connection()
+
+        if job.reached(ISSUE_CREATED):
+            jira_response = job.data['jira_response']
+        else:
+            with stage('user_lookup'):
+                refined_fields = issue.refined_fields(
+                    get_jira_user_id(jira, slack.item_user),
+                    get_jira_user_id(jira, slack.reaction_user),
+                    slack.link,
+                    project=collection.project,
+                    field_map=collection.field_map,
+                )
+                refined_fields, _ = screen_metadata.filter_fields(refined_fields)
+
+            with stage('jira_create'):
+                try:
+                    jira_response = jira.safe_create_issues(refined_fields)
+                    # 이슈를 다시 생성하지 않도록 바로 기록합니다.
+                    job_journal.checkpoint(job, ISSUE_CREATED, jira_response=jira_response)
+                    thread_claims.release(thread_key(event), created=True)
+                except Exception as e:
+                    slack.say(
+                        channel=slack.reaction_user,
+                        blocks=slack_blocks.jira_failed_blocks(e, slack.link),
+                    )
+                    raise e
+
+        if not job.reached(REPLIED):
+            say(
+                channel=slack.item_channel,
+                blocks=issue.refined_blocks(jira_response, slack.item_user, slack.reaction_user, collection.workspace),
+                # 스레드가 없으면 스레드를 생성합니다.
+                thread_ts=slack.thread_ts or slack.item_ts,
+            )
+            job_journal.checkpoint(job, REPLIED)
 
-        gpt_response = slack.check_gpt_response(
-            collection.laas_jira_hash,
-            {'schema': get_format_instructions(Issue)},
-            slack.messages,
-        )
-        gpt_metadata = slack.validate_gpt_response_json(gpt_response, say)
+        # 이슈 키를 먼저 알린 뒤 첨부파일을 업로드하고, 결과를 스레드에 알립니다.
+        if slack.file_data:
+            with stage('attachment_upload'):
+                try:
+                    jira.update_attachments(jira_response['key'], slack.file_data)
+                except Exception as e:
+                    say(
+                        channel=slack.item_channel,
+                        blocks=slack_blocks.attachments_failed_blocks(e, jira_response['key'], collection.workspace),
+                        thread_ts=slack.thread_ts or slack.item_ts,
+                    )
+                    raise e
+            say(
+                channel=slack.item_channel,
+                blocks=slack_blocks.attachments_uploaded_blocks(jira_response['key'], len(slack.file_data), collection.workspace),
+                thread_ts=slack.thread_ts or slack.item_ts,
+            )
+        job_journal.checkpoint(job, ATTACHMENTS_UPLOADED)
 
-        reporter_email = app.client.users_info(user=slack.item_user)['user']['profile'].get('email')
-        assignee_email = app.client.users_info(user=slack.reaction_user)['user']['profile'].get('email')
 
-        try:
-            issue = Issue.model_validate(gpt_metadata)
-        except ValidationError as e:
-            slack.say(
-                channel=slack.reaction_user,
-                blocks=[
-                    {
-                        "type": "header",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "Jira 이슈 생성에 실패했습니다."
-                        }
-                    },
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "이슈 타입별로 필수적인 필드가 있습니다. 필수 필드가 누락되지 않았는지 확인해보세요",
-                        }
-                    },
-                    {
-                        "type": "context",
-                        "elements": [
-                            {
-                                "type": "mrkdwn",
-                                "text": f"<{slack.link}|스레드 바로가기>"
-                            }
-                        ]
-                    },
-                    {
-                        "type": "context",
-                        "elements": [
-                            {
-                                "type": "mrkdwn",
-                                "text": f"Error Message: ```{str(e)}```"
-                            }
-                        ]
-                    },
-                ]
-            )
-            raise e
+@app.event("reaction_added")
+def reaction(event, say, body):
+    """
+    이모지에 따라 트리거되는 작업을 정의합니다.
+    재전송된 이벤트와 이미 처리 중이거나 처리한 메시지는 Slack, LaaS 를 호출하기 전에 걸러냅니다.
+    """
+    collection = collections.get(event['reaction'])
+    if not collection:
+        return
+    delay = coordinator.delay(event['item']['channel']) if coordinator else 0
+    if delay:
+        # 채널을 담당하는 레플리카가 먼저 처리할 수 있도록 기다린 뒤 처리합니다. Bolt 의 리스너 스레드는 기다리지 않습니다.
+        timer = threading.Timer(delay, handle_reaction, (event, say, body, collection))
+        timer.daemon = True
+        timer.start()
+        return
+    handle_reaction(event, say, body, collection)
+
+
+@app.event("reaction_removed")
+def reaction_removed(event):
+    """
+    트리거 이모지를 지우면 이슈를 생성했다는 기록을 지워 이모지를 다시 달 때 reactions_get 으로 확인하게 합니다.
+    """
+    if collections.get(event['reaction']):
+        thread_claims.forget(thread_key(event))
 
-        jira = JiraOperator()
-        refined_fields = issue.refined_fields(
-            jira.get_user_id_from_email(reporter_email) or outside_slack_jira_user_map(slack.item_user),
-            jira.get_user_id_from_email(assignee_email) or outside_slack_jira_user_map(slack.reaction_user),
-            slack.link,
+
+def handle_reaction(event, say, body, collection):
+    claim = thread_claims.claim(body.get('event_id'), thread_key(event))
+    if claim == DUPLICATE:
+        return
+    say = slack_rate_limiter.wrap_say(say)
+    if claim != CLAIMED:
+        # 이 프로세스의 상태로 알 수 있으므로 reactions_get 을 호출하지 않습니다.
+        say(
+            channel=event['user'],
+            blocks=slack_blocks.already_created_blocks(collection.trigger_emoji),
         )
+        return
+    submit_laas_jira(event, say, collection)
 
-        try:
-            jira_response = jira.safe_create_issues(refined_fields, slack.file_data)
-        except Exception as e:
-            slack.say(
-                channel=slack.reaction_user,
-                blocks=[
-                    {
-                        "type": "header",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "Jira 이슈 생성에 실패했습니다."
-                        }
-                    },
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "Jira 설정이 변경되거나, 개발 오류일 수 있습니다.",
-                        }
-                    },
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "혹은 Jira 서버 오류로 인해 이슈 생성에 실패할 수 있습니다. 이런 경우 잠시 후 다시 시도해보세요.",
-                        }
-                    },
-                    {
-                        "type": "context",
-                        "elements": [
-                            {
-                                "type": "mrkdwn",
-                                "text": f"<{slack.link}|스레드 바로가기>"
-                            }
-                        ]
-                    },
-                    {
-                        "type": "context",
-                        "elements": [
-                            {
-                                "type": "mrkdwn",
-                                "text": f"Error Message: ```{str(e)}```"
-                            }
-                        ]
-                    },
-                ]
-            )
-            raise e
 
+def submit_laas_jira(event, say, collection, job=None):
+    """
+    laas_jira 작업을 기록하고 워커 풀에 제출합니다.
+    대기열이 가득 차면 작업을 거절하고 이모지를 단 유저에게 DM을 전송합니다.
+    작업이 끝나면 thread_claims 를 풀어주고 결과를 기록합니다. 종료할 때 취소된 작업은 기록에 남겨 다음에 이어서 처리합니다.
+    """
+    job = job or job_journal.add(event, collection.name)
+    try:
+        future = laas_jira_pool.submit(laas_jira, event, say, collection, job, timeout=laas_jira_queue_timeout)
+    except QueueFullError as e:
+        thread_claims.release(thread_key(event))
+        job_journal.discard(job)
+        print(f'Rejected laas_jira job: {laas_jira_pool.stats()}')
         say(
-            channel=slack.item_channel,
-            blocks=issue.refined_blocks(jira_response, slack.item_user, slack.reaction_user, collection.workspace),
-            # 스레드가 없으면 스레드를 생성합니다.
-            thread_ts=slack.thread_ts or slack.item_ts,
+            channel=event['user'],
+            blocks=slack_blocks.queue_full_blocks(e),
         )
+        return None
 
+    def on_done(future):
+        # 작업이 끝나면(실패해도) 다음 이모지가 다시 실행할 수 있도록 풀어줍니다.
+        thread_claims.release(thread_key(event))
+        if future.cancelled():
+            jobs_total.inc(status='cancelled')
+            return
+        failed = future.exception() is not None
+        job_journal.finish(job, failed=failed)
+        jobs_total.inc(status='failed' if failed else 'done')
 
+    future.add_done_callback(on_done)
+    return future
 
-@app.event("reaction_added")
-def reaction(event, say):
+
+def resume_laas_jira():
     """
-    이모지에 따라 트리거되는 작업을 정의합니다.
+    지난 프로세스가 끝내지 못한 작업을 마지막으로 마친 단계부터 이어서 처리합니다.
     """
-    match event['reaction']:
-        case PICollection.trigger_emoji:
-            t = threading.Thread(target=laas_jira, args=(event, say, PICollection), daemon=False)
-            t.start()
+    job_journal.purge()
+    say = slack_rate_limiter.wrap_say(slack_client.client.chat_postMessage)
+    for job in job_journal.resume():
+        collection = collections.get(job.event['reaction'])
+        if collection is None or thread_claims.claim(None, thread_key(job.event)) != CLAIMED:
+            job_journal.finish(job, failed=True)
+            continue
+        print(f'Resuming laas_jira job: {job}')
+        submit_laas_jira(job.event, say, collection, job)
 
 
 def os_term_handler(signum, frame):
@@ -473,18 +564,36 @@ def os_term_handler(signum, frame):
     print(f'SIGNAL received: {signame} ({signum})')
     print('Frame:', frame)
 
+    # 종료 시간까지 대기 중인 작업을 처리하고, 끝내지 못한 작업은 job_journal 에 남겨 다음에 이어서 처리합니다.
+    deadline = time.monotonic() + JOB_SHUTDOWN_TIMEOUT
+    print(f'Shutting down laas_jira pool: {laas_jira_pool.stats()}')
+    print(f'Slack user cache: {slack_user_cache.stats()}')
+    print(f'Slack rate limit: {slack_rate_limiter.stats()}')
+    if not laas_jira_pool.shutdown(timeout=JOB_SHUTDOWN_TIMEOUT):
+        print(f'Shutdown deadline exceeded, jobs left in journal: {job_journal.stats()}')
+    if coordinator:
+        print(f'Coordination: {coordinator.stats()}')
+        coordinator.stop()
+
     # 진행 중인 모든 non-daemon thread를 종료합니다.
     for thread in threading.enumerate():
         if thread is threading.main_thread() or thread.daemon:
             continue
         print(f'Terminating thread: {thread.name}, daemon: {thread.daemon}')
-        thread.join()
+        thread.join(max(0, deadline - time.monotonic()))
+        if thread.is_alive():
+            break
     else:
         print('All non-daemon threads terminated')
         # main thread인 slack_handler 를 종료합니다.
         slack_handler.close()
         sys.exit(128 + signum)
 
+    # SIGKILL 을 받기 전에 남은 스레드를 기다리지 않고 종료합니다.
+    print(f'Exiting with running threads: {[t.name for t in threading.enumerate() if t.is_alive()]}')
+    slack_handler.close()
+    os._exit(128 + signum)
+
 
 # Start your app
 if __name__ == "__main__":
@@ -494,12 +603,33 @@ if __name__ == "__main__":
     # Sentry 등 초기화 코드가 있다면 여기에 작성합니다.
     sentry_sdk.init(
         dsn=os.environ['SENTRY_DSN'],
-        # Set traces_sample_rate to 1.0 to capture 100%
-        # of transactions for performance monitoring.
-        # We recommend adjusting this value in production.
-        traces_sample_rate=1.0,
+        # SENTRY_TRACES_SAMPLE_RATE 비율로 샘플링하고,
+        # SENTRY_TRACES_PER_MINUTE 를 지정하면 요청이 많을 때 비율을 낮춥니다.
+        traces_sampler=AdaptiveSampler(),
         server_name='wanted_jira_bolt',
         # 세션 추적은 하지 않는다.
         auto_session_tracking=False,
     )
+
+    # Jira 연결 풀은 시작할 때 한 번 생성하여 모든 작업이 공유합니다.
+    jira = get_jira_operator()
+
+    # 이전에 조회했던 Jira 유저 캐시를 백그라운드에서 갱신합니다.
+    if os.getenv('JIRA_USER_CACHE_PREWARM', False):
+        threading.Thread(target=jira.prewarm_user_cache, daemon=True).start()
+
+    # 여러 레플리카로 실행하면 생존 신호를 보내고 작업 임대를 갱신합니다.
+    if coordinator:
+        coordinator.start()
+
+    # Slack 유저와 Jira 계정 디렉터리를 백그라운드에서 동기화하고 주기적으로 갱신합니다.
+    if USER_DIRECTORY_SYNC:
+        user_directory.start(slack_client, jira)
+
+    # METRICS_PORT 를 지정하면 /metrics 를 제공합니다.
+    start_metrics_server()
+
+    # 지난 프로세스가 끝내지 못한 작업을 이어서 처리합니다.
+    resume_laas_jira()
+
     slack_handler.start()
@@ -0,0 +1,676 @@
+"""
+app.py 의 비동기 실행 방식입니다.
+slack_bolt 의 AsyncApp 을 사용하여 모든 요청을 하나의 이벤트 루프에서 처리합니다.
+LLM 응답을 기다리는 작업이 많아도 작업마다 OS 스레드를 사용하지 않습니다.
+
+python async_app.py
+"""
+import os
+import json
+import time
+import signal
+import asyncio
+import contextlib
+from datetime import datetime
+from json import JSONDecodeError
+
+import aiohttp
+import sentry_sdk
+from pydantic import ValidationError
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+
+from middleware import slack_blocks
+from middleware.cache import TTLCache
+from middleware.slack_rate_limit import SlackRateLimiter, AsyncRateLimitedSlackClient, COSMETIC
+from middleware.journal import (
+    Job, job_journal, JOB_SHUTDOWN_TIMEOUT, THREAD_FETCHED, LLM_OUTPUT, ISSUE_CREATED, REPLIED, ATTACHMENTS_UPLOADED,
+)
+from middleware.metrics import (
+    AdaptiveSampler, stage, registry, jobs_total, payload_bytes, queue_wait_seconds, start_metrics_server,
+)
+from middleware.recorder import event_recorder
+from middleware.coordination import coordinator
+from middleware.directory import user_directory, MISSING, USER_DIRECTORY_SYNC
+from middleware.screen_metadata import screen_metadata
+from middleware.dedupe import ThreadClaims, thread_key, CLAIMED, DUPLICATE
+from middleware.attachment import (
+    Attachment, MemoryBudget, CHUNK_SIZE, attachment_cache, attachment_cache_key,
+    ATTACHMENT_DOWNLOAD_CONCURRENCY, ATTACHMENT_MAX_FILE_BYTES, ATTACHMENT_MAX_JOB_BYTES,
+)
+from middleware.thread_reader import aiter_thread_messages
+from middleware.streaming import prune_attachment_urls
+from middleware.collection import SlackCollection, Collection, load_collections
+from middleware.laas.aio import AsyncLaaSClient, AsyncJiraOperator
+from middleware.laas.heuristic import outside_slack_jira_user_map
+from middleware.laas.mimetype import get_mime_type_from_url, is_downloadable_mime_type
+from middleware.laas.image import select_thumbnail_url, preview_attachment, to_image_ref_content
+from middleware.laas.response_cache import laas_response_cache, response_cache_key
+from middleware.laas.token_budget import (
+    LAAS_CONTEXT_TOKEN_BUDGET, LAAS_SUMMARY_HASH, SUMMARY_PARAMS, ThreadTooLongError, acompact_messages, estimate_tokens,
+)
+
+if os.getenv('DEBUG', False):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+SLACK_API_URL = os.getenv('SLACK_API_URL', AsyncWebClient.BASE_URL)
+
+# SLACK_API_URL 로 Slack Web API 주소를 바꿀 수 있습니다. e.g. benchmark 의 가짜 Slack 서버
+app = AsyncApp(token=os.environ['SLACK_BOT_TOKEN'])
+# 클라이언트를 직접 넘기면 Bolt 가 token 과 함께 지정했다는 경고를 남기므로, Bolt 가 만든 클라이언트의 주소만 바꿉니다.
+app.client.base_url = SLACK_API_URL
+# Slack API 는 모두 메서드별 rate limit 에 맞춰 호출합니다.
+slack_rate_limiter = SlackRateLimiter()
+slack_client = AsyncRateLimitedSlackClient(app.client, slack_rate_limiter)
+
+collections = load_collections()
+
+laas = AsyncLaaSClient()
+jira = AsyncJiraOperator()
+
+# 이벤트 루프에서 동시에 처리하는 작업 수와, 처리 중인 작업을 포함해 받을 수 있는 최대 작업 수입니다.
+laas_jira_concurrency = asyncio.Semaphore(int(os.getenv('LAAS_JIRA_ASYNC_CONCURRENCY', 100)))
+laas_jira_max_jobs = int(os.getenv('LAAS_JIRA_ASYNC_MAX_JOBS', 200))
+laas_jira_tasks = set()
+# 같은 이벤트나 같은 메시지에 대한 작업이 중복으로 실행되지 않도록 합니다.
+thread_claims = ThreadClaims(coordinator=coordinator)
+registry.gauge('jira_bolt_in_flight_jobs', '처리 중이거나 대기 중인 작업 수', lambda: len(laas_jira_tasks))
+registry.gauge('jira_bolt_user_directory_size', '유저 디렉터리의 Slack 유저 수', lambda: len(user_directory))
+
+slack_user_cache = TTLCache(
+    maxsize=int(os.getenv('SLACK_USER_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('SLACK_USER_CACHE_TTL', 3600)),
+)
+
+
+slack_user_lookups = {}
+
+
+async def get_slack_user(user_id):
+    """
+    Slack 유저 정보를 가져옵니다. 유저 디렉터리와 캐시에 없을 때만 users_info 를 호출합니다.
+    같은 유저를 동시에 조회하면 users_info 를 한 번만 호출합니다.
+    """
+    user = user_directory.slack_user(user_id) or slack_user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    lookup = slack_user_lookups.get(user_id)
+    if lookup is None:
+        lookup = slack_user_lookups[user_id] = asyncio.ensure_future(slack_client.users_info(user=user_id))
+        lookup.add_done_callback(lambda _: slack_user_lookups.pop(user_id, None))
+    user = (await lookup)['user']
+    slack_user_cache.set(user_id, user)
+    return user
+
+
+async def get_jira_user_id(slack_id):
+    """
+    Slack 유저의 Jira 유저 ID를 가져옵니다. 유저 디렉터리에 있으면 네트워크 호출 없이 가져옵니다.
+    """
+    account_id = user_directory.jira_account_id(slack_id)
+    if account_id is MISSING:
+        account_id = await jira.get_user_id_from_email((await get_slack_user(slack_id))['profile'].get('email'))
+    return account_id or outside_slack_jira_user_map(slack_id)
+
+
+class AsyncSlackOperator:
+    def __init__(self, event, say, trigger_emoji):
+        self.event = event
+        self.say = say
+
+        self.item_ts = event['item']['ts']
+        self.item_channel = event['item']['channel']
+        self.item_user = event['item_user']
+        self.reaction_user = event['user']
+        self.emoji = trigger_emoji
+
+        # after set_conversation_data
+        self.thread_ts = None
+        self.messages = None
+        self.file_data = None
+        self.files = None
+        # LLM 에 보낼 이미지입니다. 메시지에는 원본의 digest 로 가리키고, 요청을 보낼 때 조각 단위로 인코딩합니다.
+        self.images = {}
+        # 작업 하나가 메모리에 두는 첨부파일 크기를 제한하고, 넘으면 임시 파일에 저장합니다.
+        self.budget = MemoryBudget()
+        # 다운로드한 첨부파일 크기의 합입니다. ATTACHMENT_MAX_JOB_BYTES 를 넘는 파일은 건너뜁니다.
+        self.job_bytes = 0
+
+        # after check_gpt_response
+        self.response_cache_key = None
+
+    def _reserve(self, size):
+        if self.job_bytes + size > ATTACHMENT_MAX_JOB_BYTES:
+            return False
+        self.job_bytes += size
+        return True
+
+    @staticmethod
+    def download_session():
+        """
+        작업 하나의 첨부파일 다운로드에 사용하는 세션입니다. 동시 연결 수를 ATTACHMENT_DOWNLOAD_CONCURRENCY 로 제한합니다.
+        """
+        return aiohttp.ClientSession(
+            headers={'Authorization': f'Bearer {os.environ["SLACK_BOT_TOKEN"]}'},
+            connector=aiohttp.TCPConnector(limit=ATTACHMENT_DOWNLOAD_CONCURRENCY),
+            timeout=aiohttp.ClientTimeout(sock_connect=5, sock_read=60),
+            raise_for_status=True,
+        )
+
+    async def _download(self, session, file, url=None):
+        """
+        Slack 첨부파일을 Attachment 로 다운로드합니다. 실패하면 None 을 반환합니다.
+        AttachmentDownloader 와 같이 파일 하나와 작업 전체의 크기를 제한하고, 지원하지 않는 형식은 건너뜁니다.
+        최근 다운로드한 파일은 다시 다운로드하지 않습니다.
+        """
+        cache_key = attachment_cache_key(file, url)
+        if cache_key:
+            cached = attachment_cache.get(cache_key)
+            if cached is not None:
+                return cached if self._reserve(len(cached)) else None
+
+        private_file_url = url or file['url_private']
+        attachment = None
+        reserved = 0
+        try:
+            with stage('download'):
+                async with session.get(private_file_url) as response:
+                    # 본문을 읽기 전에 헤더로 형식과 크기를 확인합니다.
+                    mime_type = response.headers.get('Content-Type') or get_mime_type_from_url(private_file_url)
+                    if not is_downloadable_mime_type(mime_type):
+                        return None
+                    content_length = response.content_length or 0
+                    if content_length > ATTACHMENT_MAX_FILE_BYTES or not self._reserve(content_length):
+                        return None
+                    reserved = content_length
+
+                    attachment = Attachment(file.get('id'), file.get('name'), mime_type)
+                    if content_length > self.budget.max_file_memory:
+                        attachment.spill()
+                    # Content-Length 가 없거나 틀릴 수 있으므로 읽으면서 다시 확인합니다.
+                    size = 0
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        self.budget.write(attachment, chunk)
+                        size += len(chunk)
+                        if size > ATTACHMENT_MAX_FILE_BYTES:
+                            raise ValueError('file size limit exceeded')
+                        if size > reserved:
+                            if not self._reserve(size - reserved):
+                                raise ValueError('job size limit exceeded')
+                            reserved = size
+        except (ValueError, aiohttp.ClientError, asyncio.TimeoutError):
+            self.job_bytes -= reserved
+            if attachment is not None:
+                self.budget.discard(attachment)
+            return None
+        payload_bytes.observe(len(attachment), kind='attachment')
+        if cache_key:
+            attachment_cache.set(cache_key, attachment)
+        return attachment
+
+    async def _download_with_preview(self, session, file):
+        """
+        Jira 에 첨부할 원본과 LLM 에 보낼 미리보기(썸네일이나 축소한 이미지)를 함께 준비합니다.
+        """
+        thumbnail_url = select_thumbnail_url(file)
+        original, thumbnail = await asyncio.gather(
+            self._download(session, file),
+            self._download(session, file, thumbnail_url) if thumbnail_url else asyncio.sleep(0),
+        )
+        if original is None:
+            return None
+        preview = await asyncio.to_thread(preview_attachment, thumbnail or original, self.budget)
+        return original, preview
+
+    async def set_conversation_data(self):
+        """
+        스레드의 모든 메시지를 가져와 정제합니다
+        유저 정보 조회와 첨부파일 다운로드는 동시에 진행합니다.
+        """
+        messages = []
+        file_data = []
+        files = []
+        pending = []
+        # 같은 파일은 한 번만 다운로드하고, 여러 답글에 다시 공유된 같은 파일은 한 번만 첨부하고 LLM 에도 한 번만 보냅니다.
+        downloads_by_file = {}
+        digests = set()
+
+        async with self.download_session() as session:
+            # 페이지를 받는 대로 작성자 조회와 첨부파일 다운로드를 태스크로 시작합니다.
+            async for message in aiter_thread_messages(slack_client, self.item_channel, self.item_ts):
+                if not pending:
+                    self.thread_ts = message['thread_ts']
+                author = asyncio.ensure_future(get_slack_user(message['user'])) if message['user'] else None
+                for file in message['files']:
+                    key = file.get('id') or file['url_private']
+                    if key not in downloads_by_file:
+                        downloads_by_file[key] = asyncio.ensure_future(self._download_with_preview(session, file))
+                downloads = [downloads_by_file[file.get('id') or file['url_private']] for file in message['files']]
+                pending.append((message, author, list(zip(message['files'], downloads))))
+
+            for message, author, downloads in pending:
+                message_dt = datetime.fromtimestamp(float(message['ts'])).isoformat()
+                author_name = (await author)['real_name'] if author else message['name']
+                text = f'{message_dt} {author_name}: """{message["text"]}"""'
+                images = []
+                results = await asyncio.gather(*(download for _, download in downloads))
+                for (file, _), result in zip(downloads, results):
+                    if result is None or result[0].digest in digests:
+                        continue
+                    original, preview = result
+                    digests.add(original.digest)
+                    file_data.append(original)
+                    files.append({key: file.get(key) for key in ('id', 'name', 'mimetype', 'size', 'url_private')})
+                    image = to_image_ref_content(original.digest, preview)
+                    if image:
+                        self.images[original.digest] = preview
+                        images.append(image)
+
+                if images:
+                    messages.append({
+                        "role": "user",
+                        "content": [{"type": "text", "text": text}, *images]
+                    })
+                else:
+                    messages.append({
+                        "role": "user",
+                        "content": text,
+                    })
+
+        self.messages = messages
+        self.file_data = file_data
+        self.files = files
+        return True
+
+    def conversation_data(self):
+        return {'thread_ts': self.thread_ts, 'messages': self.messages, 'files': self.files}
+
+    async def restore_conversation_data(self, data):
+        """
+        작업 기록에 저장한 스레드 정보로 set_conversation_data 를 대신합니다.
+        """
+        self.thread_ts = data['thread_ts']
+        self.files = data['files']
+        async with self.download_session() as session:
+            downloads = await asyncio.gather(*(self._download(session, file) for file in self.files))
+        self.file_data = list(filter(None, downloads))
+        # 썸네일은 다시 다운로드하지 않고 원본으로 LLM 에 보낼 이미지를 만듭니다.
+        for attachment in self.file_data:
+            self.images[attachment.digest] = await asyncio.to_thread(preview_attachment, attachment, self.budget)
+        self.messages = prune_attachment_urls(data['messages'], self.images)
+
+    @property
+    def link(self):
+        return f'https://{SlackCollection.workspace}/archives/{self.item_channel}/p{self.item_ts.replace(".", "")}{f"?thread_ts={self.thread_ts}" if self.thread_ts else ""}'
+
+    async def compact_messages(self, hash, params, messages):
+        """
+        스레드가 LaaS 컨텍스트 예산을 넘으면 나눠서 요약한 메시지로 대체합니다.
+        """
+        budget = LAAS_CONTEXT_TOKEN_BUDGET - estimate_tokens(json.dumps(params, ensure_ascii=False))
+
+        async def summarize(chunk):
+            response = await laas.jira_summary_generator(LAAS_SUMMARY_HASH or hash, SUMMARY_PARAMS, chunk, self.images)
+            return response['choices'][0]['message']['content']
+
+        return await acompact_messages(messages, summarize, budget)
+
+    async def check_gpt_response(self, hash, params, messages):
+        """
+        GPT 응답이 올바른지 확인합니다.
+        이 단계는 LaaS 서버의 응답을 잘 받았는지 확인하는 단계입니다
+        스레드가 바뀌지 않았다면 캐시된 응답을 사용합니다.
+        """
+        self.response_cache_key = response_cache_key(hash, params, messages)
+        cached = laas_response_cache.get(self.response_cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            messages = await self.compact_messages(hash, params, messages)
+            gpt_response = await laas.jira_summary_generator(hash, params, messages, self.images)
+        except ThreadTooLongError as e:
+            await self.say(
+                channel=self.reaction_user,
+                blocks=slack_blocks.thread_too_long_blocks(self.link),
+            )
+            raise e
+        except Exception as e:
+            await self.say(
+                channel=self.reaction_user,
+                blocks=slack_blocks.laas_request_failed_blocks(e, self.link),
+            )
+            raise e
+        try:
+            return gpt_response['choices'][0]['message']['content']
+        except KeyError as e:
+            await self.say(
+                channel=self.reaction_user,
+                blocks=slack_blocks.laas_response_failed_blocks(gpt_response, self.link),
+            )
+            raise e
+
+    async def validate_gpt_response_json(self, gpt_response):
+        """
+        GPT 응답이 올바른 JSON 형식인지 확인합니다.
+        이 단계는 요구사항에 맞게 JSON 응답을 받았는지 확인하는 단계입니다
+        """
+        try:
+            return json.loads(gpt_response)
+        except JSONDecodeError as e:
+            await self.say(
+                channel=self.reaction_user,
+                blocks=slack_blocks.invalid_json_blocks(gpt_response, self.link),
+            )
+            raise e
+
+
+async def check_emoji(event, say, emoji):
+    """
+    이미 스레드에 이모지, 즉 생성된 이슈가 있는지 확인합니다.
+    작업이 실행되는 동안 다른 유저가 단 이모지는 이미 걸러냈으므로 개수에서 제외합니다.
+    """
+    reactions = await slack_client.reactions_get(
+        channel=event['item']['channel'],
+        timestamp=event['item']['ts'],
+    )
+    jira_gen_count = sum(
+        d['count'] for d in reactions['message']['reactions']
+        if d['name'] == emoji
+    ) - thread_claims.concurrent(thread_key(event))
+    if jira_gen_count > 1:
+        await say(
+            channel=event['user'],
+            blocks=slack_blocks.already_created_blocks(emoji),
+        )
+        return True
+    return False
+
+
+@contextlib.asynccontextmanager
+async def loading_reaction(event):
+    """
+    GPT를 처리하는 동안 UX를 위해
+    스레드에 loading 이모지를 추가합니다.
+    rate limit 에 여유가 없으면 이모지를 추가하지 않습니다.
+    """
+    channel = event['item']['channel']
+    item_ts = event['item']['ts']
+    try:
+        added = await slack_client.reactions_add(
+            channel=channel,
+            name=SlackCollection.loading_emoji,
+            timestamp=item_ts,
+            priority=COSMETIC,
+        )
+    except SlackApiError as e:
+        # 이어서 처리하는 작업은 지난 프로세스가 추가한 이모지가 남아 있습니다.
+        if e.response['error'] != 'already_reacted':
+            raise e
+        added = True
+    try:
+        yield
+    finally:
+        # 꾸미는 호출이므로 rate limit 에 여유가 없으면 건너뛰고, 실패해도 작업 결과에 영향을 주지 않습니다.
+        try:
+            if added:
+                await slack_client.reactions_remove(
+                    channel=channel,
+                    name=SlackCollection.loading_emoji,
+                    timestamp=item_ts,
+                    priority=COSMETIC,
+                )
+        except Exception as e:
+            print(f'Failed to remove loading reaction: {e}')
+
+
+async def laas_jira(event, say, collection: Collection, job: Job):
+    """
+    app.laas_jira 의 비동기 버전입니다.
+    """
+    async with loading_reaction(event):
+        with stage('check_emoji'):
+            already_created = not job.reached(THREAD_FETCHED) and await check_emoji(event, say, collection.trigger_emoji)
+        if already_created:
+            thread_claims.release(thread_key(event), created=True)
+            return
+
+        slack = AsyncSlackOperator(event, say, collection.trigger_emoji)
+
+        with stage('thread_fetch'):
+            if job.reached(THREAD_FETCHED):
+                await slack.restore_conversation_data(job.data)
+            elif await slack.set_conversation_data():
+                job_journal.checkpoint(job, THREAD_FETCHED, **slack.conversation_data())
+            else:
+                return
+
+        if job.reached(LLM_OUTPUT):
+            gpt_response = job.data['gpt_response']
+        else:
+            with stage('laas'):
+                gpt_response = await slack.check_gpt_response(
+                    collection.laas_jira_hash,
+                    collection.schema_params,
+                    slack.messages,
+                )
+        with stage('validation'):
+            gpt_metadata = await slack.validate_gpt_response_json(gpt_response)
+
+            try:
+                issue = collection.issue_model.model_validate(gpt_metadata)
+            except ValidationError as e:
+                await say(
+                    channel=slack.reaction_user,
+                    blocks=slack_blocks.validation_failed_blocks(e, slack.link),
+                )
+                raise e
+
+        if not job.reached(LLM_OUTPUT):
+            # 이슈 필드로 변환할 수 있는 응답만 캐시하여, 같은 스레드로 다시 시도하면 LaaS 를 호출하지 않습니다.
+            laas_response_cache.set(slack.response_cache_key, gpt_response)
+            job_journal.checkpoint(job, LLM_OUTPUT, gpt_response=gpt_response)
+
+        if job.reached(ISSUE_CREATED):
+            jira_response = job.data['jira_response']
+        else:
+            with stage('user_lookup'):
+                reporter_id, assignee_id = await asyncio.gather(
+                    get_jira_user_id(slack.item_user),
+                    get_jira_user_id(slack.reaction_user),
+                )
+                refined_fields = issue.refined_fields(
+                    reporter_id,
+                    assignee_id,
+                    slack.link,
+                    project=collection.project,
+                    field_map=collection.field_map,
+                )
+                refined_fields, _ = screen_metadata.filter_fields(refined_fields)
+
+            with stage('jira_create'):
+                try:
+                    jira_response = await jira.safe_create_issues(refined_fields)
+                    # 이슈를 다시 생성하지 않도록 바로 기록합니다.
+                    job_journal.checkpoint(job, ISSUE_CREATED, jira_response=jira_response)
+                    thread_claims.release(thread_key(event), created=True)
+                except Exception as e:
+                    await say(
+                        channel=slack.reaction_user,
+                        blocks=slack_blocks.jira_failed_blocks(e, slack.link),
+                    )
+                    raise e
+
+        if not job.reached(REPLIED):
+            await say(
+                channel=slack.item_channel,
+                blocks=issue.refined_blocks(jira_response, slack.item_user, slack.reaction_user, collection.workspace),
+                # 스레드가 없으면 스레드를 생성합니다.
+                thread_ts=slack.thread_ts or slack.item_ts,
+            )
+            job_journal.checkpoint(job, REPLIED)
+
+        # 이슈 키를 먼저 알린 뒤 첨부파일을 업로드하고, 결과를 스레드에 알립니다.
+        if slack.file_data:
+            with stage('attachment_upload'):
+                try:
+                    await jira.update_attachments(jira_response['key'], slack.file_data)
+                except Exception as e:
+                    await say(
+                        channel=slack.item_channel,
+                        blocks=slack_blocks.attachments_failed_blocks(e, jira_response['key'], collection.workspace),
+                        thread_ts=slack.thread_ts or slack.item_ts,
+                    )
+                    raise e
+            await say(
+                channel=slack.item_channel,
+                blocks=slack_blocks.attachments_uploaded_blocks(jira_response['key'], len(slack.file_data), collection.workspace),
+                thread_ts=slack.thread_ts or slack.item_ts,
+            )
+        job_journal.checkpoint(job, ATTACHMENTS_UPLOADED)
+
+
+async def run_laas_jira(event, say, collection, job):
+    """
+    동시에 처리하는 작업 수를 제한하고, 대기 시간과 Sentry 트랜잭션을 기록합니다.
+    """
+    queued_at = time.monotonic()
+    async with laas_jira_concurrency:
+        queue_wait_seconds.observe(time.monotonic() - queued_at, pool='laas_jira')
+        with sentry_sdk.start_transaction(op='laas_jira', name=collection.name), event_recorder.record(event, job):
+            return await laas_jira(event, say, collection, job)
+
+
+@app.event("reaction_added")
+async def reaction(event, say, body):
+    """
+    이모지에 따라 트리거되는 작업을 정의합니다.
+    작업은 백그라운드 태스크로 실행하고 이벤트는 바로 응답합니다.
+    재전송된 이벤트와 이미 처리 중이거나 처리한 메시지는 Slack, LaaS 를 호출하기 전에 걸러냅니다.
+    """
+    collection = collections.get(event['reaction'])
+    if not collection:
+        return
+    delay = coordinator.delay(event['item']['channel']) if coordinator else 0
+    if delay:
+        # 채널을 담당하는 레플리카가 먼저 처리할 수 있도록 기다린 뒤 처리합니다.
+        await asyncio.sleep(delay)
+    claim = thread_claims.claim(body.get('event_id'), thread_key(event))
+    if claim == DUPLICATE:
+        return
+    say = slack_rate_limiter.wrap_async_say(say)
+    if claim != CLAIMED:
+        # 이 프로세스의 상태로 알 수 있으므로 reactions_get 을 호출하지 않습니다.
+        await say(
+            channel=event['user'],
+            blocks=slack_blocks.already_created_blocks(collection.trigger_emoji),
+        )
+        return
+    if len(laas_jira_tasks) >= laas_jira_max_jobs:
+        thread_claims.release(thread_key(event))
+        await say(
+            channel=event['user'],
+            blocks=slack_blocks.queue_full_blocks(f'in-flight jobs: {len(laas_jira_tasks)}'),
+        )
+        return
+    start_laas_jira(event, say, collection)
+
+
+@app.event("reaction_removed")
+async def reaction_removed(event):
+    """
+    트리거 이모지를 지우면 이슈를 생성했다는 기록을 지워 이모지를 다시 달 때 reactions_get 으로 확인하게 합니다.
+    """
+    if collections.get(event['reaction']):
+        thread_claims.forget(thread_key(event))
+
+
+def start_laas_jira(event, say, collection, job=None):
+    """
+    laas_jira 작업을 기록하고 백그라운드 태스크로 실행합니다.
+    작업이 끝나면 thread_claims 를 풀어주고 결과를 기록합니다. 종료할 때 취소된 작업은 기록에 남겨 다음에 이어서 처리합니다.
+    """
+    job = job or job_journal.add(event, collection.name)
+    task = asyncio.create_task(run_laas_jira(event, say, collection, job))
+    # 태스크가 가비지 컬렉션되지 않도록 참조를 유지합니다.
+    laas_jira_tasks.add(task)
+    task.add_done_callback(laas_jira_tasks.discard)
+
+    def on_done(task):
+        thread_claims.release(thread_key(event))
+        if task.cancelled():
+            jobs_total.inc(status='cancelled')
+            return
+        failed = task.exception() is not None
+        job_journal.finish(job, failed=failed)
+        jobs_total.inc(status='failed' if failed else 'done')
+
+    task.add_done_callback(on_done)
+    return task
+
+
+def resume_laas_jira():
+    """
+    지난 프로세스가 끝내지 못한 작업을 마지막으로 마친 단계부터 이어서 처리합니다.
+    """
+    job_journal.purge()
+    say = slack_rate_limiter.wrap_async_say(slack_client.client.chat_postMessage)
+    for job in job_journal.resume():
+        collection = collections.get(job.event['reaction'])
+        if collection is None or thread_claims.claim(None, thread_key(job.event)) != CLAIMED:
+            job_journal.finish(job, failed=True)
+            continue
+        print(f'Resuming laas_jira job: {job}')
+        start_laas_jira(job.event, say, collection, job)
+
+
+async def main():
+    shutdown = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, shutdown.set)
+
+    # AsyncSocketModeHandler 는 실행 중인 이벤트 루프가 필요하므로 main 에서 생성합니다.
+    slack_handler = AsyncSocketModeHandler(app_token=os.environ['SLACK_APP_TOKEN'], app=app)
+    start_metrics_server()
+    # 여러 레플리카로 실행하면 생존 신호를 보내고 작업 임대를 갱신합니다.
+    if coordinator:
+        coordinator.start()
+    resume_laas_jira()
+    # Slack 유저와 Jira 계정 디렉터리를 백그라운드에서 동기화하고 주기적으로 갱신합니다.
+    directory_sync = asyncio.create_task(user_directory.arun(slack_client, jira)) if USER_DIRECTORY_SYNC else None
+    await slack_handler.connect_async()
+    await shutdown.wait()
+
+    # 종료 시간까지 진행 중인 작업을 처리하고, 끝내지 못한 작업은 취소하여 job_journal 에 남깁니다.
+    print(f'Waiting for {len(laas_jira_tasks)} in-flight jobs')
+    print(f'Slack rate limit: {slack_rate_limiter.stats()}')
+    if laas_jira_tasks:
+        _, unfinished = await asyncio.wait(laas_jira_tasks, timeout=JOB_SHUTDOWN_TIMEOUT)
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            print(f'Shutdown deadline exceeded, jobs left in journal: {len(unfinished)}')
+            await asyncio.wait(unfinished, timeout=1)
+    if directory_sync:
+        directory_sync.cancel()
+    if coordinator:
+        print(f'Coordination: {coordinator.stats()}')
+        coordinator.stop()
+    await slack_handler.close_async()
+    await laas.close()
+    await jira.close()
+
+
+if __name__ == "__main__":
+    sentry_sdk.init(
+        dsn=os.environ['SENTRY_DSN'],
+        traces_sampler=AdaptiveSampler(),
+        server_name='wanted_jira_bolt',
+        auto_session_tracking=False,
+    )
+    asyncio.run(main())
@@ -0,0 +1,7 @@
+"""
+가짜 Slack, 첨부파일, LaaS, Jira 서버로 laas_jira 작업 전체를 실행하여 처리량과 지연 시간, 메모리, 스레드 수를 측정합니다.
+실제 서비스를 호출하지 않으며, 서버마다 응답 지연과 오류 비율을 지정할 수 있습니다.
+
+python -m benchmark --events 200 --rate 20 --thread-lengths 1,20,300 --attachments 0,1,5
+python -m benchmark --mode async --laas-latency 3 --laas-error-rate 0.1
+"""
@@ -0,0 +1,47 @@
+"""
+python -m benchmark --help
+"""
+import random
+import argparse
+
+from benchmark.fake_servers import ThreadSpec
+from benchmark.runner import SERVICES, add_common_arguments, reaction_event, run
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='laas_jira 처리량 벤치마크')
+    parser.add_argument('--events', type=int, default=100, help='보낼 reaction_added 이벤트 수')
+    parser.add_argument('--rate', type=float, default=0, help='초당 이벤트 수. 0 이면 한꺼번에 보냅니다.')
+    parser.add_argument('--thread-lengths', type=int_list, default=[1, 10, 50], help='스레드 메시지 수 후보(쉼표 구분)')
+    parser.add_argument('--attachments', type=int_list, default=[0, 1, 3], help='스레드 첨부파일 수 후보(쉼표 구분)')
+    add_common_arguments(parser)
+    return parser.parse_args()
+
+
+def make_events(args):
+    """
+    스레드 길이와 첨부파일 수가 다른 reaction_added 이벤트와 가짜 Slack 서버의 스레드 정보를 만듭니다.
+    """
+    rng = random.Random(args.seed)
+    events = []
+    threads = {}
+    for index in range(args.events):
+        ts = f'{1700000000 + index}.000000'
+        threads[ts] = ThreadSpec(rng.choice(args.thread_lengths), rng.choice(args.attachments))
+        events.append(reaction_event(ts))
+    return events, threads
+
+
+def main():
+    args = parse_args()
+    events, threads = make_events(args)
+    offsets = [index / args.rate if args.rate else 0 for index in range(len(events))]
+    run(args, events, offsets, threads, {service: getattr(args, f'{service}_latency') for service in SERVICES})
+
+
+if __name__ == '__main__':
+    main()
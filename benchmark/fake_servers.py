@@ -0,0 +1,333 @@
+"""
+벤치마크에서 사용하는 가짜 Slack, 첨부파일, LaaS, Jira 서버입니다.
+서버마다 응답 지연(latency)과 오류 비율(error_rate)을 지정할 수 있습니다.
+latency 에 기록된 응답 시간 목록을 지정하면 그중에서 골라 지연합니다.
+
+- Slack: 오류는 429 + Retry-After 로 응답합니다.
+- 첨부파일, Jira: 오류는 500, 503 으로 응답합니다.
+- LaaS: 오류는 503 + Retry-After 로 응답합니다.
+"""
+import json
+import random
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ThreadSpec:
+    """
+    가짜 스레드의 메시지 수와 첨부파일 수입니다.
+    file_bytes 는 첨부파일별 크기, text_size 는 메시지 하나의 글자 수이며 지정하지 않으면 서버 설정을 따릅니다.
+    """
+    def __init__(self, messages=1, files=0, file_bytes=None, text_size=None):
+        self.messages = max(1, messages)
+        self.files = files
+        self.file_bytes = file_bytes or []
+        self.text_size = text_size
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 워커 수보다 많은 연결이 동시에 들어와도 거절하지 않습니다.
+    request_queue_size = 1024
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0, seed=None):
+        """
+        :param latency: 평균 응답 지연(초) 또는 응답 지연 목록
+        """
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def inject(self):
+        """
+        지연을 적용하고, 오류로 응답해야 하면 True 를 반환합니다.
+        지연은 latency 의 0.5 ~ 1.5 배에서 고르게 뽑거나, 목록이면 그중에서 고릅니다.
+        """
+        with self._lock:
+            self.requests += 1
+            if isinstance(self.latency, (list, tuple)):
+                delay = self.random.choice(self.latency) if self.latency else 0
+            else:
+                delay = self.latency * self.random.uniform(0.5, 1.5)
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            threading.Event().wait(delay)
+        return failed
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    # keep-alive 연결을 사용할 수 있도록 모든 응답에 Content-Length 를 지정합니다.
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def params(self, body):
+        """
+        쿼리스트링, form, JSON 본문의 파라미터를 합칩니다.
+        """
+        params = dict(parse_qsl(urlsplit(self.path).query))
+        content_type = self.headers.get('Content-Type') or ''
+        if body and content_type.startswith('application/json'):
+            params.update(json.loads(body))
+        elif body and content_type.startswith('application/x-www-form-urlencoded'):
+            params.update(parse_qsl(body.decode()))
+        return params
+
+    def send(self, status, body=b'', content_type='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def handle_request(self, method):
+        body = self.read_body()
+        if self.server.inject():
+            self.fail()
+            return
+        self.route(method, urlsplit(self.path).path, body)
+
+    def fail(self):
+        self.send(500, {'error': 'injected'})
+
+    def route(self, method, path, body):
+        raise NotImplementedError
+
+
+class SlackHandler(FakeHandler):
+    def fail(self):
+        self.send(429, {'ok': False, 'error': 'ratelimited'}, headers={'Retry-After': '1'})
+
+    def route(self, method, path, body):
+        api_method = path.rsplit('/', 1)[-1]
+        handler = getattr(self, 'api_' + api_method.replace('.', '_'), None)
+        if handler is None:
+            self.send(200, {'ok': False, 'error': 'unknown_method'})
+            return
+        self.send(200, {'ok': True, **handler(self.params(body))})
+
+    def api_auth_test(self, params):
+        return {'url': 'https://benchmark.slack.com/', 'team_id': 'T0BENCH', 'user_id': 'U0BOT', 'bot_id': 'B0BOT'}
+
+    def api_conversations_replies(self, params):
+        spec = self.server.threads.get(params['ts'], ThreadSpec())
+        limit = int(params.get('limit') or 200)
+        start = int(params.get('cursor') or 0)
+        end = min(start + limit, spec.messages)
+        return {
+            'messages': [self.server.message(params['ts'], index, spec) for index in range(start, end)],
+            'has_more': end < spec.messages,
+            'response_metadata': {'next_cursor': str(end) if end < spec.messages else ''},
+        }
+
+    def api_conversations_history(self, params):
+        """
+        threads 의 스레드를 최신순으로 응답합니다. debug.backfill 에서 사용합니다.
+        """
+        timestamps = sorted(self.server.threads, key=float, reverse=True)
+        limit = int(params.get('limit') or 100)
+        start = int(params.get('cursor') or 0)
+        end = min(start + limit, len(timestamps))
+        messages = []
+        for ts in timestamps[start:end]:
+            spec = self.server.threads[ts]
+            messages.append({**self.server.message(ts, 0, spec), 'reply_count': spec.messages - 1})
+        return {
+            'messages': messages,
+            'has_more': end < len(timestamps),
+            'response_metadata': {'next_cursor': str(end) if end < len(timestamps) else ''},
+        }
+
+    def api_users_info(self, params):
+        user = params['user']
+        return {'user': {
+            'id': user,
+            'name': user.lower(),
+            'real_name': f'Benchmark {user}',
+            'profile': {'email': f'{user.lower()}@benchmark.test'},
+        }}
+
+    def api_users_list(self, params):
+        limit = int(params.get('limit') or 200)
+        start = int(params.get('cursor') or 0)
+        end = min(start + limit, self.server.users)
+        return {
+            'members': [self.api_users_info({'user': f'U{index:04d}'})['user'] for index in range(start, end)],
+            'response_metadata': {'next_cursor': str(end) if end < self.server.users else ''},
+        }
+
+    def api_reactions_get(self, params):
+        return {'type': 'message', 'message': {
+            'ts': params['timestamp'],
+            'reactions': [{'name': self.server.reaction, 'count': 1, 'users': ['U0000']}],
+        }}
+
+    def api_reactions_add(self, params):
+        return {}
+
+    def api_reactions_remove(self, params):
+        return {}
+
+    def api_chat_postMessage(self, params):
+        return {'channel': params.get('channel'), 'ts': '1.000000', 'message': {'text': params.get('text', '')}}
+
+
+class FakeSlackServer(FakeServer):
+    """
+    threads 는 스레드 ts -> ThreadSpec 입니다. 지정하지 않은 스레드는 메시지 하나만 가진 스레드로 응답합니다.
+    """
+    def __init__(self, files_url, reaction, threads=None, users=20, text_size=200, **kwargs):
+        super().__init__(SlackHandler, **kwargs)
+        self.files_url = files_url
+        self.reaction = reaction
+        self.threads = threads or {}
+        self.users = users
+        self.text = ('benchmark message ' * (text_size // 18 + 1))[:text_size]
+
+    def message(self, ts, index, spec):
+        message_ts = ts if index == 0 else f'{ts.split(".")[0]}.{index:06d}'
+        text = self.text if spec.text_size is None else ('benchmark ' * (spec.text_size // 10 + 1))[:spec.text_size]
+        return {
+            'type': 'message',
+            'ts': message_ts,
+            'thread_ts': ts,
+            'user': f'U{index % self.users:04d}',
+            'text': f'{index}: {text}',
+            # 첨부파일은 앞에서부터 메시지마다 하나씩 나눠 붙입니다.
+            'files': [self.file(ts, number, spec) for number in range(index, spec.files, spec.messages)],
+        }
+
+    def file(self, ts, number, spec):
+        file_id = f'F{ts.replace(".", "")}{number:03d}'
+        size = spec.file_bytes[number] if number < len(spec.file_bytes) else None
+        return {
+            'id': file_id,
+            'name': f'{file_id}.png',
+            'mimetype': 'image/png',
+            'size': size,
+            'url_private': f'{self.files_url}/files/{file_id}.png' + (f'?size={size}' if size else ''),
+            'original_w': 800,
+            'original_h': 600,
+        }
+
+
+class FilesHandler(FakeHandler):
+    def route(self, method, path, body):
+        # 파일마다 내용이 달라야 digest 로 중복 제거되지 않습니다.
+        content = self.server.content
+        size = int(dict(parse_qsl(urlsplit(self.path).query)).get('size') or 0)
+        if size:
+            content = (content * (size // len(content) + 1))[:size]
+        self.send(200, path.encode() + content, content_type='image/png')
+
+
+class FakeFilesServer(FakeServer):
+    def __init__(self, file_size=200 * 1024, **kwargs):
+        super().__init__(FilesHandler, **kwargs)
+        self.content = random.Random(0).randbytes(file_size)
+
+
+class LaaSHandler(FakeHandler):
+    def fail(self):
+        self.send(503, {'error': 'injected'}, headers={'Retry-After': '0'})
+
+    def route(self, method, path, body):
+        self.send(200, {'choices': [{'message': {'role': 'assistant', 'content': json.dumps(self.server.issue, ensure_ascii=False)}}]})
+
+
+class FakeLaaSServer(FakeServer):
+    def __init__(self, **kwargs):
+        super().__init__(LaaSHandler, **kwargs)
+        self.issue = {
+            'summary': '벤치마크 이슈',
+            'issue_type': '작업',
+            'environment': 'dev(개발 서버)',
+            'priority': 'P3',
+            'bug_property': None,
+            'description': '벤치마크에서 생성한 이슈입니다.',
+            'due_date': None,
+        }
+
+
+class JiraHandler(FakeHandler):
+    def fail(self):
+        self.send(503, {'errorMessages': ['injected']})
+
+    def route(self, method, path, body):
+        if path.endswith('/attachments'):
+            self.send(200, [{'id': '1'}])
+        elif path.endswith('/issue/bulk'):
+            updates = json.loads(body)['issueUpdates']
+            self.send(201, {'issues': [
+                {'id': '1', 'key': f'BENCH-{self.server.next_issue_number()}'} for _ in updates
+            ], 'errors': []})
+        elif path.endswith('/issue') and method == 'POST':
+            self.send(201, {'id': '1', 'key': f'BENCH-{self.server.next_issue_number()}'})
+        elif path.endswith('/users/search'):
+            params = self.params(body)
+            start = int(params.get('startAt') or 0)
+            end = min(start + int(params.get('maxResults') or 50), self.server.users)
+            self.send(200, [
+                {'accountId': f'account-u{index:04d}@benchmark.test', 'accountType': 'atlassian', 'active': True,
+                 'emailAddress': f'u{index:04d}@benchmark.test'}
+                for index in range(start, end)
+            ])
+        elif path.endswith('/user/search'):
+            self.send(200, [{'accountId': 'account-' + self.params(body).get('query', '')}])
+        elif path.endswith('/myself'):
+            self.send(200, {'accountId': 'account-bot'})
+        else:
+            self.send(404, {'errorMessages': [f'{method} {path}']})
+
+
+class FakeJiraServer(FakeServer):
+    """
+    users 는 유저 디렉터리의 계정 수이며 가짜 Slack 서버의 유저와 이메일이 같습니다.
+    """
+    def __init__(self, users=20, **kwargs):
+        super().__init__(JiraHandler, **kwargs)
+        self.users = users
+        self._issue_number = 0
+
+    def next_issue_number(self):
+        with self._lock:
+            self._issue_number += 1
+            return self._issue_number
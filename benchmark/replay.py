@@ -0,0 +1,76 @@
+"""
+EVENT_RECORD_PATH 로 기록한 이벤트를 가짜 서버로 다시 재생합니다.
+이벤트는 기록된 간격을 --speed 배로 줄여 보내고, 스레드는 기록된 메시지 수와 첨부파일 크기로 응답합니다.
+Slack, LaaS, Jira 의 응답 지연은 기록된 단계별 소요 시간에서 고르며, --<service>-latency 로 고정할 수 있습니다.
+트리거 이모지는 기본 설정(PI)의 이모지로 바꿔 보냅니다.
+
+python -m benchmark.replay events.jsonl --speed 10
+python -m benchmark.replay events.jsonl --speed 100 --mode async --report-json after.json
+"""
+import argparse
+
+from middleware.recorder import read_records
+from benchmark.fake_servers import ThreadSpec
+from benchmark.runner import SERVICES, DEFAULT_LATENCY, add_common_arguments, reaction_event, run
+
+
+# 서버별 응답 지연으로 사용할 단계입니다. 각 단계는 해당 서버를 한 번 호출합니다.
+LATENCY_STAGES = {'slack': 'check_emoji', 'laas': 'laas', 'jira': 'jira_create'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmark.replay', description='기록한 이벤트 재생')
+    parser.add_argument('path', help='EVENT_RECORD_PATH 로 기록한 JSONL 파일')
+    parser.add_argument('--speed', type=float, default=1, help='재생 배속. e.g. 1, 10, 100')
+    add_common_arguments(parser, latency=False)
+    for service in SERVICES:
+        parser.add_argument(f'--{service}-latency', type=float, help=f'{service} 응답 지연(초). 지정하지 않으면 기록된 시간을 사용합니다.')
+    return parser.parse_args()
+
+
+def replay_plan(records, speed):
+    """
+    기록을 이벤트, 도착 시각, 스레드 정보로 바꿉니다. 같은 메시지가 여러 번 기록되어도 서로 다른 작업으로 재생합니다.
+    """
+    records = sorted(records, key=lambda record: record['at'])
+    start = records[0]['at'] if records else 0
+    events, offsets, threads = [], [], {}
+    for index, record in enumerate(records):
+        ts = f'{1700000000 + index}.000000'
+        event = record['event']
+        events.append(reaction_event(ts, event['user'], event.get('item_user'), event['item']['channel']))
+        offsets.append((record['at'] - start) / speed)
+        thread = record.get('thread')
+        if thread:
+            threads[ts] = ThreadSpec(
+                thread['messages'],
+                thread['files'],
+                thread.get('file_bytes'),
+                thread.get('text_chars', 0) // max(1, thread['messages']),
+            )
+    return events, offsets, threads
+
+
+def recorded_latencies(records, args):
+    latencies = {}
+    for service in SERVICES:
+        fixed = getattr(args, f'{service}_latency')
+        samples = [
+            record['timings'][LATENCY_STAGES[service]]
+            for record in records
+            if LATENCY_STAGES.get(service) in record.get('timings', {})
+        ]
+        latencies[service] = fixed if fixed is not None else (samples or DEFAULT_LATENCY[service])
+    return latencies
+
+
+def main():
+    args = parse_args()
+    records = read_records(args.path)
+    events, offsets, threads = replay_plan(records, args.speed)
+    print(f'replaying {len(events)} events over {offsets[-1] if offsets else 0:.1f}s at {args.speed}x')
+    run(args, events, offsets, threads, recorded_latencies(records, args))
+
+
+if __name__ == '__main__':
+    main()
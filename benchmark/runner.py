@@ -0,0 +1,278 @@
+"""
+가짜 서버를 띄우고 app.py 또는 async_app.py 의 laas_jira 작업을 실행하여 결과를 측정합니다.
+python -m benchmark 와 python -m benchmark.replay 가 함께 사용합니다.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import resource
+import tempfile
+import threading
+import statistics
+import multiprocessing
+from collections import Counter
+
+from benchmark.fake_servers import FakeSlackServer, FakeFilesServer, FakeLaaSServer, FakeJiraServer
+
+
+SERVICES = ('slack', 'files', 'laas', 'jira')
+DEFAULT_LATENCY = {'slack': 0.05, 'files': 0.05, 'laas': 1.0, 'jira': 0.2}
+REACTION = 'pi_jira_gen'
+
+
+def add_common_arguments(parser, latency=True):
+    parser.add_argument('--mode', choices=('sync', 'async'), default='sync', help='app.py(sync) 또는 async_app.py(async)')
+    parser.add_argument('--file-size', type=int, default=200 * 1024, help='크기를 모르는 첨부파일 하나의 크기(bytes)')
+    parser.add_argument('--slack-rate-scale', type=float, default=1, help='Slack tier rate limit 배율. 가짜 서버의 처리량만 보려면 크게 지정합니다.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--user-directory', action='store_true', help='측정하기 전에 유저 디렉터리를 동기화하여 유저 조회에 네트워크를 사용하지 않습니다.')
+    parser.add_argument('--report-json', help='결과를 JSON 으로 저장할 경로. 빌드 사이의 결과를 비교할 때 사용합니다.')
+    for service in SERVICES:
+        if latency:
+            parser.add_argument(f'--{service}-latency', type=float, default=DEFAULT_LATENCY[service], help=f'{service} 평균 응답 지연(초)')
+        parser.add_argument(f'--{service}-error-rate', type=float, default=0, help=f'{service} 오류 응답 비율(0 ~ 1)')
+
+
+def reaction_event(ts, user='U0001', item_user='U0000', channel='C0BENCH'):
+    return {
+        'type': 'reaction_added',
+        'user': user,
+        'reaction': REACTION,
+        'item_user': item_user,
+        'item': {'type': 'message', 'channel': channel, 'ts': ts},
+        'event_ts': ts,
+    }
+
+
+def start_servers(args, threads, latencies):
+    """
+    가짜 서버를 별도의 프로세스에서 실행하여 측정하는 프로세스의 메모리와 스레드 수에 포함되지 않도록 합니다.
+    latencies 는 서버별 평균 응답 지연 또는 응답 지연 목록입니다.
+    """
+    options = {
+        service: {
+            'latency': latencies[service],
+            'error_rate': getattr(args, f'{service}_error_rate'),
+            'seed': args.seed,
+        }
+        for service in SERVICES
+    }
+    files = FakeFilesServer(file_size=args.file_size, **options['files'])
+    servers = {
+        'slack': FakeSlackServer(files.url, REACTION, threads, **options['slack']),
+        'files': files,
+        'laas': FakeLaaSServer(**options['laas']),
+        'jira': FakeJiraServer(**options['jira']),
+    }
+
+    def serve():
+        for server in servers.values():
+            server.start()
+        threading.Event().wait()
+
+    process = multiprocessing.get_context('fork').Process(target=serve, name='fake_servers', daemon=True)
+    process.start()
+    for server in servers.values():
+        server.server_close()
+    return process, {service: server.url for service, server in servers.items()}
+
+
+def configure_environment(urls, args, max_jobs):
+    """
+    app 을 가져오기 전에 가짜 서버 주소와 임시 캐시 경로를 지정합니다.
+    """
+    cache_path = os.path.join(tempfile.mkdtemp(prefix='jira_bolt_benchmark_'), 'jira_bolt.sqlite3')
+    os.environ.update({
+        'SLACK_API_URL': urls['slack'] + '/api/',
+        'LAAS_BASE_URL': urls['laas'],
+        'ATLASSIAN_URL': urls['jira'],
+        'SLACK_BOT_TOKEN': 'xoxb-benchmark',
+        'SLACK_APP_TOKEN': 'xapp-benchmark',
+        'ATLASSIAN_USER': 'benchmark@benchmark.test',
+        'ATLASSIAN_API_KEY': 'benchmark',
+        'LAAS_PROJECT': 'BENCHMARK',
+        'LAAS_API_KEY': 'benchmark',
+        'JOB_JOURNAL_PATH': cache_path,
+        'JIRA_USER_CACHE_PATH': cache_path,
+        'LAAS_RESPONSE_CACHE_PATH': cache_path,
+        # 모든 이벤트를 처리하도록 대기열이 가득 차면 거절하지 않고 기다립니다.
+        'LAAS_JIRA_QUEUE_TIMEOUT': os.getenv('LAAS_JIRA_QUEUE_TIMEOUT', '3600'),
+        'LAAS_JIRA_ASYNC_MAX_JOBS': os.getenv('LAAS_JIRA_ASYNC_MAX_JOBS', str(max_jobs)),
+    })
+    os.environ.pop('JIRA_BOLT_COLLECTIONS', None)
+    # 재생하는 중에 다시 기록하지 않습니다.
+    os.environ.pop('EVENT_RECORD_PATH', None)
+
+    from middleware import slack_rate_limit
+    for rates in (slack_rate_limit.SLACK_TIER_RATES, slack_rate_limit.SLACK_SPECIAL_RATES):
+        for key in rates:
+            rates[key] *= args.slack_rate_scale
+
+
+def error_name(error):
+    return type(error).__name__ if error is not None else None
+
+
+class ThreadSampler:
+    """
+    실행 중 최대 스레드 수를 기록합니다.
+    """
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='thread_sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_sync(events, offsets, user_directory=False):
+    """
+    offsets 는 시작 시각으로부터 이벤트가 도착하는 시각(초)입니다.
+    """
+    import app
+
+    if user_directory:
+        app.user_directory.refresh(app.slack_client, app.get_jira_operator())
+
+    say = app.slack_rate_limiter.wrap_say(app.slack_client.client.chat_postMessage)
+    collection = app.collections.get(REACTION)
+    latencies = []
+    done = threading.Semaphore(0)
+
+    def track(future, arrived_at):
+        latencies.append((time.perf_counter() - arrived_at, error_name(future.exception())))
+        done.release()
+
+    # 대기열이 가득 차면 submit 이 기다리므로, 지연 시간은 이벤트가 도착해야 하는 시각부터 잽니다.
+    started_at = time.perf_counter()
+    for event, offset in zip(events, offsets):
+        arrived_at = started_at + offset
+        time.sleep(max(0, arrived_at - time.perf_counter()))
+        app.thread_claims.claim(None, app.thread_key(event))
+        future = app.submit_laas_jira(event, say, collection)
+        if future is None:
+            # 대기열이 가득 차서 거절한 작업입니다.
+            latencies.append((time.perf_counter() - arrived_at, 'QueueFullError'))
+            done.release()
+            continue
+        future.add_done_callback(lambda future, arrived_at=arrived_at: track(future, arrived_at))
+    for _ in events:
+        done.acquire()
+    app.laas_jira_pool.shutdown()
+    return latencies, app.slack_rate_limiter.stats()
+
+
+def run_async(events, offsets, user_directory=False):
+    import async_app
+
+    async def main():
+        if user_directory:
+            await async_app.user_directory.arefresh(async_app.slack_client, async_app.jira)
+        say = async_app.slack_rate_limiter.wrap_async_say(async_app.slack_client.client.chat_postMessage)
+        collection = async_app.collections.get(REACTION)
+        latencies = []
+        tasks = []
+
+        def track(task, arrived_at):
+            latencies.append((time.perf_counter() - arrived_at, 'CancelledError' if task.cancelled() else error_name(task.exception())))
+
+        started_at = time.perf_counter()
+        for event, offset in zip(events, offsets):
+            arrived_at = started_at + offset
+            await asyncio.sleep(max(0, arrived_at - time.perf_counter()))
+            async_app.thread_claims.claim(None, async_app.thread_key(event))
+            task = async_app.start_laas_jira(event, say, collection)
+            task.add_done_callback(lambda task, arrived_at=arrived_at: track(task, arrived_at))
+            tasks.append(task)
+        if tasks:
+            await asyncio.wait(tasks)
+        await async_app.laas.close()
+        await async_app.jira.close()
+        return latencies
+
+    return asyncio.run(main()), async_app.slack_rate_limiter.stats()
+
+
+def percentile(values, q):
+    if len(values) < 2:
+        return values[0] if values else 0
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def max_rss():
+    # Linux 의 ru_maxrss 는 KB 단위입니다. macOS 는 bytes 단위입니다.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def summarize(mode, latencies, elapsed, baseline_rss, peak_threads, slack_stats):
+    durations = sorted(duration for duration, _ in latencies)
+    errors = Counter(error for _, error in latencies if error)
+    return {
+        'mode': mode,
+        'events': len(latencies),
+        'failed': sum(errors.values()),
+        'errors': dict(errors),
+        'elapsed': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0,
+        'p50': percentile(durations, 50),
+        'p95': percentile(durations, 95),
+        'p99': percentile(durations, 99),
+        'max': durations[-1] if durations else 0,
+        'peak_rss': max_rss(),
+        'baseline_rss': baseline_rss,
+        'peak_threads': peak_threads,
+        'slack_rate_limit': slack_stats,
+    }
+
+
+def report(summary):
+    mib = 1024 * 1024
+    print(f"mode: {summary['mode']}, events: {summary['events']}, failed: {summary['failed']}, elapsed: {summary['elapsed']:.2f}s")
+    print(f"throughput: {summary['throughput']:.2f} jobs/s")
+    print(f"latency: p50={summary['p50']:.3f}s p95={summary['p95']:.3f}s p99={summary['p99']:.3f}s max={summary['max']:.3f}s")
+    if summary['errors']:
+        print(f"errors: {summary['errors']}")
+    print(f"peak rss: {summary['peak_rss'] / mib:.1f} MiB (before run: {summary['baseline_rss'] / mib:.1f} MiB)")
+    print(f"peak threads: {summary['peak_threads']}")
+    print(f"slack rate limit: {summary['slack_rate_limit']}")
+
+
+def run(args, events, offsets, threads, latencies):
+    """
+    가짜 서버를 띄우고 events 를 offsets 시각에 보내 결과를 출력합니다.
+    """
+    process, urls = start_servers(args, threads, latencies)
+    try:
+        configure_environment(urls, args, len(events))
+        # app 을 가져온 뒤의 메모리 사용량을 기준으로 합니다.
+        __import__('app' if args.mode == 'sync' else 'async_app')
+        baseline_rss = max_rss()
+
+        started_at = time.perf_counter()
+        with ThreadSampler() as sampler:
+            if args.mode == 'sync':
+                results, slack_stats = run_sync(events, offsets, args.user_directory)
+            else:
+                results, slack_stats = run_async(events, offsets, args.user_directory)
+        summary = summarize(args.mode, results, time.perf_counter() - started_at, baseline_rss, sampler.peak, slack_stats)
+    finally:
+        process.terminate()
+
+    report(summary)
+    if args.report_json:
+        with open(args.report_json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return summary
@@ -1,73 +1,121 @@
+import os
 from argparse import ArgumentParser
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 from middleware.laas.jira_operator import JiraOperator
+from middleware.screen_metadata import SCREEN_METADATA_DIR, save_snapshot, load_snapshot
+
+
+# 페이지와 화면 필드를 동시에 가져오는 요청 수입니다.
+SCREEN_METADATA_CONCURRENCY = int(os.getenv('SCREEN_METADATA_CONCURRENCY', 8))
+PAGE_SIZE = 100
 
 
 class DebugJiraGenerator(JiraOperator):
+    def __init__(self, concurrency=SCREEN_METADATA_CONCURRENCY):
+        super().__init__(pool_size=concurrency)
+        self.concurrency = concurrency
+
+    def get_all_pages(self, path, **params):
+        """
+        첫 페이지의 total 로 나머지 페이지를 계산하여 동시에 가져옵니다. 결과는 페이지 순서를 유지합니다.
+        Jira 는 maxResults 보다 적게 반환할 수 있으므로 첫 페이지가 실제로 반환한 개수만큼씩 건너뜁니다.
+        합친 개수가 total 과 다르면 빠진 항목이 있는 것이므로 ValueError 를 발생시킵니다.
+        """
+        def get_page(start):
+            return self.client.get(path, params={**params, 'maxResults': PAGE_SIZE, 'startAt': start})
+
+        first = get_page(0)
+        values: list = first['values']
+        if not first['isLast']:
+            step = len(values)
+            if not step:
+                raise ValueError(f'{path}: empty first page of {first["total"]}')
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='jira_page') as executor:
+                for page in executor.map(get_page, range(step, first['total'], step)):
+                    values.extend(page['values'])
+        if 'total' in first and len(values) != first['total']:
+            raise ValueError(f'{path}: fetched {len(values)} of {first["total"]}')
+        return values
+
     def get_jira_screens(self):
-        resp = self.client.get(
-            self.client.resource_url('screens'),
-            params={'maxResults': 100, 'startAt': 0, 'expand': 'screenScheme'},
-        )
-        screens: list = resp['values']
-        while resp['isLast'] is False:
-            resp = self.client.get(
-                resp['nextPage'].removeprefix(self.base_url),
-                params={'expand': 'screenScheme'},
-            )
-            screens.extend(resp['values'])
-        return screens
+        return self.get_all_pages(self.client.resource_url('screens'), expand='screenScheme')
 
     def get_jira_screen_schemes(self):
-        start = 0
-        resp = self.client.get(
-            self.client.resource_url('issuetypescreenscheme') + '/mapping',
-            params={'maxResults': 100, 'startAt': start},
-        )
-        screen_schemes: list = resp['values']
-        while resp['isLast'] is False:
-            start += 100
-            resp = self.client.get(
-                self.client.resource_url('issuetypescreenscheme') + '/mapping',
-                params={'maxResults': 100, 'startAt': start},
-            )
-            screen_schemes.extend(resp['values'])
-        return screen_schemes
-
-
-def issue_type_screen_metadata(project):
+        return self.get_all_pages(self.client.resource_url('issuetypescreenscheme') + '/mapping')
+
+    def get_screens_fields(self, screen_ids):
+        """
+        화면마다 한 번씩 동시에 필드를 가져옵니다.
+        """
+        screen_ids = list(dict.fromkeys(screen_ids))
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='jira_screen') as executor:
+            return dict(zip(screen_ids, executor.map(self.client.get_all_screen_fields, screen_ids)))
+
+
+def create_screen_id(screen_scheme):
+    """
+    화면 스킴에서 이슈를 생성할 때 사용하는 화면 ID 입니다. create 화면을 지정하지 않았으면 default 화면을 사용합니다.
+    """
+    screens = screen_scheme.get('screens') or {}
+    return screens.get('create') or screens.get('default')
+
+
+def issue_type_screen_metadata(project, snapshot_dir=SCREEN_METADATA_DIR, refresh=False):
     """
     https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-issue-type-screen-schemes/#api-group-issue-type-screen-schemes
 
     이 API를 통해 프로젝트의 스크린 구성을 가져올 수 있습니다.
+    화면 스킴의 화면(create, edit, view) 중 이슈를 생성할 때 사용하는 화면만 이슈 유형에 연결합니다.
+    결과는 snapshot_dir 에 스냅샷으로 저장하여 실행 중인 앱이 Jira 를 호출하지 않고 이슈 필드를 확인할 때 사용합니다.
+    저장한 스냅샷이 있으면 refresh 를 지정하지 않는 한 Jira 를 호출하지 않고 스냅샷을 반환합니다.
     """
+    if not refresh:
+        snapshot = load_snapshot(project, snapshot_dir)
+        if snapshot is not None:
+            return snapshot['issue_types']
+
     jg = DebugJiraGenerator()
 
-    screens = jg.get_jira_screens()
-    screen_schemes = jg.get_jira_screen_schemes()
-    issue_type_map = {d['id']: d['name'] for d in jg.client.get_issue_types()}
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix='jira_metadata') as executor:
+        screens = executor.submit(jg.get_jira_screens)
+        screen_schemes = executor.submit(jg.get_jira_screen_schemes)
+        issue_types = executor.submit(jg.client.get_issue_types)
+        screens, screen_schemes = screens.result(), screen_schemes.result()
+        issue_type_map = {d['id']: d['name'] for d in issue_types.result()}
+
+    # 화면 스킴 ID -> 이슈 유형 ID 목록
+    issue_types_by_scheme = defaultdict(list)
+    for x in screen_schemes:
+        issue_types_by_scheme[str(x['screenSchemeId'])].append(x['issueTypeId'])
 
     datarq_screens = [s for s in screens if s['name'].startswith(f'{project}:')]
     datarq_screen_schemes = [
         dict(x, **{'screen_id': d['id'], 'screen_name': d['name'], 'screen_description': d['description']})
         for d in datarq_screens if d.get('screenSchemes')
         for x in d['screenSchemes']['values']
+        if str(create_screen_id(x)) == str(d['id'])
     ]
+    screen_fields = jg.get_screens_fields(s['screen_id'] for s in datarq_screen_schemes)
     for s in datarq_screen_schemes:
-        s['issue_type_id'] = [x['issueTypeId'] for x in screen_schemes if str(x['screenSchemeId']) == str(s['id'])]
-        s['screen_fields'] = jg.client.get_all_screen_fields(s['screen_id'])
+        s['issue_type_id'] = issue_types_by_scheme[str(s['id'])]
+        s['screen_fields'] = screen_fields[s['screen_id']]
 
-    return {
+    metadata = {
         issue_type_map.get(x, x): d
         for d in datarq_screen_schemes
         for x in d['issue_type_id']
     }
+    save_snapshot(project, metadata, snapshot_dir)
+    return metadata
 
 
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('--project', required=True)
+    parser.add_argument('--refresh', action='store_true', help='저장한 스냅샷을 사용하지 않고 Jira 에서 다시 가져옵니다.')
     args = parser.parse_args()
 
-    metadata = issue_type_screen_metadata(args.project)
-    print(metadata)
\ No newline at end of file
+    metadata = issue_type_screen_metadata(args.project, refresh=args.refresh)
+    print(metadata)
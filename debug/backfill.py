@@ -0,0 +1,347 @@
+"""
+채널에 쌓인 스레드를 한꺼번에 Jira 이슈로 만듭니다. 이모지를 하나씩 다는 대신 기간을 지정하여 실행합니다.
+
+python -m debug.backfill --channel C0123456 --oldest 2026-01-01 --latest 2026-03-31 --emoji pi_jira_gen --assignee U0123456
+
+- conversations.history 를 페이지 단위로 읽으며 답글이 있는 스레드를 고릅니다. --include-single 이면 답글이 없는 메시지도 포함합니다.
+  이미 트리거 이모지가 달린 스레드는 이모지로 이슈를 만든 것으로 보고 건너뜁니다.
+- 스레드마다 LaaS 로 이슈 필드를 추출하며, 동시에 --concurrency 개까지 처리합니다.
+- Jira bulk create API 로 --batch-size(최대 50)개씩 이슈를 생성합니다.
+- 스레드마다 진행 상황(추출한 필드, 생성한 이슈 키)을 --checkpoint 파일에 기록하므로, 다시 실행하면 끝낸 스레드는 건너뛰고 LaaS 를 다시 호출하지 않습니다.
+- 끝나면 처리량을 출력합니다. 스레드가 많으면 conversations.replies 의 rate limit(tier 3)이 처리량을 결정합니다.
+
+첨부파일은 업로드하지 않고 텍스트로만 이슈를 만듭니다.
+"""
+import os
+import json
+import time
+import argparse
+import threading
+import contextlib
+from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from slack_sdk import WebClient
+
+from middleware.cache import TTLCache
+from middleware.collection import SlackCollection, load_collections
+from middleware.directory import user_directory, MISSING
+from middleware.screen_metadata import screen_metadata
+from middleware.slack_rate_limit import SlackRateLimiter, RateLimitedSlackClient
+from middleware.thread_reader import iter_thread_messages, normalize_message, SLACK_THREAD_PAGE_SIZE
+from middleware.laas import laas_client
+from middleware.laas.heuristic import outside_slack_jira_user_map
+from middleware.laas.jira_operator import JiraOperator, JIRA_BULK_CREATE_MAX
+from middleware.laas.token_budget import LAAS_CONTEXT_TOKEN_BUDGET, LAAS_SUMMARY_HASH, SUMMARY_PARAMS, compact_messages, estimate_tokens
+
+
+EXTRACTED = 'extracted'
+CREATED = 'created'
+FAILED = 'failed'
+
+# 스레드가 아닌 채널 이벤트 메시지는 건너뜁니다.
+SKIPPED_SUBTYPES = {'channel_join', 'channel_leave', 'channel_topic', 'channel_purpose', 'channel_name', 'pinned_item'}
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m debug.backfill', description='채널의 스레드를 Jira 이슈로 일괄 생성합니다.')
+    parser.add_argument('--channel', required=True, help='Slack 채널 ID')
+    parser.add_argument('--oldest', type=parse_date, required=True, help='시작 날짜(YYYY-MM-DD, 포함)')
+    parser.add_argument('--latest', type=parse_date, required=True, help='끝 날짜(YYYY-MM-DD, 포함)')
+    parser.add_argument('--emoji', default='pi_jira_gen', help='사용할 Collection 의 트리거 이모지')
+    parser.add_argument('--assignee', required=True, help='이슈 담당자의 Slack 유저 ID. 이모지를 단 유저와 같은 역할입니다.')
+    parser.add_argument('--include-single', action='store_true', help='답글이 없는 메시지도 이슈로 만듭니다.')
+    parser.add_argument('--concurrency', type=int, default=4, help='동시에 추출하는 스레드 수')
+    parser.add_argument('--batch-size', type=int, default=JIRA_BULK_CREATE_MAX, help=f'bulk create 한 번에 생성하는 이슈 수(최대 {JIRA_BULK_CREATE_MAX})')
+    parser.add_argument('--limit', type=int, default=0, help='처리할 최대 스레드 수. 0 이면 모두 처리합니다.')
+    parser.add_argument('--checkpoint', help='진행 상황을 기록할 파일. 기본값은 .cache/backfill_<channel>_<oldest>_<latest>.json')
+    parser.add_argument('--reply', action='store_true', help='이슈를 생성하면 스레드에 결과 메시지를 남깁니다.')
+    parser.add_argument('--dry-run', action='store_true', help='필드만 추출하고 이슈는 생성하지 않습니다.')
+    parser.add_argument('--user-directory', action='store_true', help='시작할 때 유저 디렉터리를 동기화하여 유저 조회를 네트워크 호출 없이 처리합니다.')
+    args = parser.parse_args()
+    if not 0 < args.batch_size <= JIRA_BULK_CREATE_MAX:
+        parser.error(f'--batch-size must be between 1 and {JIRA_BULK_CREATE_MAX}')
+    if args.checkpoint is None:
+        args.checkpoint = f'.cache/backfill_{args.channel}_{args.oldest:%Y%m%d}_{args.latest:%Y%m%d}.json'
+    return args
+
+
+class Checkpoint:
+    """
+    스레드 ts -> 진행 상황을 JSON 파일에 기록합니다. 중간에 멈춰도 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.threads = json.load(f)
+        else:
+            self.threads = {}
+
+    def get(self, ts):
+        return self.threads.get(ts)
+
+    def update(self, ts, **record):
+        with self._lock:
+            self.threads[ts] = {**self.threads.get(ts, {}), **record}
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.threads, ensure_ascii=False)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class Report:
+    """
+    단계별 처리 수와 소요 시간을 모아 처리량을 계산합니다.
+    """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.counts = defaultdict(int)
+        self.durations = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counts[name] += value
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.durations[name] += time.perf_counter() - start
+                self.counts[f'{name}_calls'] += 1
+
+    def print(self):
+        elapsed = time.perf_counter() - self.started_at
+        counts = self.counts
+        print(f"elapsed: {elapsed:.1f}s")
+        print(
+            f"threads: scanned={counts['scanned']} skipped={counts['skipped']} extracted={counts['extracted']} "
+            f"extract_failed={counts['extract_failed']} created={counts['created']} create_failed={counts['create_failed']}"
+        )
+        print(f"throughput: {counts['extracted'] / elapsed:.2f} threads/s, {counts['created'] / elapsed:.2f} issues/s")
+        for name in ('history', 'extract', 'bulk_create', 'reply'):
+            calls = counts[f'{name}_calls']
+            if calls:
+                print(f"{name}: {calls} calls, {self.durations[name]:.1f}s total, {self.durations[name] / calls:.2f}s avg")
+
+
+class Backfill:
+    def __init__(self, args, slack_client, jira, collection):
+        self.args = args
+        self.slack_client = slack_client
+        self.jira = jira
+        self.collection = collection
+        self.checkpoint = Checkpoint(args.checkpoint)
+        self.report = Report()
+        self.slack_users = TTLCache(maxsize=4096, ttl=24 * 60 * 60)
+        # bulk create 를 기다리는 스레드 ts 입니다.
+        self.batch = []
+
+    def get_slack_user(self, user_id):
+        user = user_directory.slack_user(user_id)
+        if user is not None:
+            return user
+        return self.slack_users.get_or_load(user_id, lambda: self.slack_client.users_info(user=user_id)['user'])
+
+    def get_jira_user_id(self, slack_id):
+        account_id = user_directory.jira_account_id(slack_id)
+        if account_id is MISSING:
+            account_id = self.jira.get_user_id_from_email(self.get_slack_user(slack_id)['profile'].get('email'))
+        return account_id or outside_slack_jira_user_map(slack_id)
+
+    def link(self, ts):
+        return f'https://{SlackCollection.workspace}/archives/{self.args.channel}/p{ts.replace(".", "")}'
+
+    def iter_threads(self):
+        """
+        기간 안의 스레드 첫 메시지를 오래된 순서가 아닌 Slack 이 응답하는 순서(최신순)로 반환합니다.
+        """
+        oldest = self.args.oldest.timestamp()
+        latest = (self.args.latest + timedelta(days=1)).timestamp()
+        cursor = None
+        while True:
+            with self.report.timed('history'):
+                response = self.slack_client.conversations_history(
+                    channel=self.args.channel, oldest=str(oldest), latest=str(latest),
+                    limit=SLACK_THREAD_PAGE_SIZE, cursor=cursor,
+                )
+            for message in response['messages']:
+                if message.get('subtype') in SKIPPED_SUBTYPES:
+                    continue
+                if not message.get('reply_count') and not self.args.include_single:
+                    continue
+                yield message
+            cursor = (response.get('response_metadata') or {}).get('next_cursor')
+            if not cursor:
+                return
+
+    def thread_messages(self, message):
+        if message.get('reply_count'):
+            return iter_thread_messages(self.slack_client, self.args.channel, message['ts'])
+        return [normalize_message(message)]
+
+    def extract(self, message):
+        """
+        스레드를 읽어 LaaS 로 이슈 필드를 추출합니다. 워커 스레드에서 실행합니다.
+        """
+        messages = []
+        for reply in self.thread_messages(message):
+            message_dt = datetime.fromtimestamp(float(reply['ts'])).isoformat()
+            author = self.get_slack_user(reply['user'])['real_name'] if reply['user'] else reply['name']
+            messages.append({"role": "user", "content": f'{message_dt} {author}: """{reply["text"]}"""'})
+
+        hash, params = self.collection.laas_jira_hash, self.collection.schema_params
+        budget = LAAS_CONTEXT_TOKEN_BUDGET - estimate_tokens(json.dumps(params, ensure_ascii=False))
+
+        def summarize(chunk):
+            response = laas_client.jira_summary_generator(LAAS_SUMMARY_HASH or hash, SUMMARY_PARAMS, chunk)
+            return response.json()['choices'][0]['message']['content']
+
+        with self.report.timed('extract'):
+            messages = compact_messages(messages, summarize, budget)
+            response = laas_client.jira_summary_generator(hash, params, messages)
+            response.raise_for_status()
+        issue = self.collection.issue_model.model_validate_json(response.json()['choices'][0]['message']['content'])
+        reporter = message.get('user')
+        fields = issue.refined_fields(
+            self.get_jira_user_id(reporter) if reporter else outside_slack_jira_user_map(reporter),
+            self.get_jira_user_id(self.args.assignee),
+            self.link(message['ts']),
+            project=self.collection.project,
+            field_map=self.collection.field_map,
+        )
+        fields, _ = screen_metadata.filter_fields(fields)
+        return {'fields': fields, 'issue': issue.model_dump(mode='json'), 'user': reporter}
+
+    def on_extracted(self, ts, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f'Extraction failed: {ts}: {e!r}')
+            self.report.count('extract_failed')
+            self.checkpoint.update(ts, status=FAILED, error=repr(e))
+            return
+        self.report.count('extracted')
+        self.checkpoint.update(ts, status=EXTRACTED, **result)
+        self.enqueue(ts)
+
+    def enqueue(self, ts):
+        self.batch.append(ts)
+        if len(self.batch) >= self.args.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        모인 스레드를 bulk create 로 생성하고 진행 상황을 저장합니다.
+        """
+        batch, self.batch = self.batch, []
+        if batch and not self.args.dry_run:
+            records = [self.checkpoint.get(ts) for ts in batch]
+            with self.report.timed('bulk_create'):
+                try:
+                    results = self.jira.bulk_create_issues([record['fields'] for record in records])
+                except Exception as e:
+                    # 요청 전체가 실패하면 추출한 필드를 남겨두고 다음 실행에서 다시 시도합니다.
+                    print(f'Bulk create failed for {len(batch)} threads: {e!r}')
+                    self.report.count('create_failed', len(batch))
+                    results = []
+            for ts, record, (response, error) in zip(batch, records, results):
+                if error is not None:
+                    print(f'Create failed: {ts}: {error.get("elementErrors")}')
+                    self.report.count('create_failed')
+                    self.checkpoint.update(ts, error=error.get('elementErrors'))
+                    continue
+                self.report.count('created')
+                self.checkpoint.update(ts, status=CREATED, key=response['key'])
+                if self.args.reply:
+                    self.reply(ts, record, response)
+        self.checkpoint.save()
+
+    def reply(self, ts, record, response):
+        issue = self.collection.issue_model.model_validate(record['issue'])
+        with self.report.timed('reply'):
+            self.slack_client.chat_postMessage(
+                channel=self.args.channel,
+                thread_ts=ts,
+                blocks=issue.refined_blocks(response, record['user'], self.args.assignee, self.collection.workspace),
+            )
+
+    def should_skip(self, message):
+        record = self.checkpoint.get(message['ts'])
+        if record and record['status'] == CREATED:
+            return True
+        return any(reaction['name'] == self.collection.trigger_emoji for reaction in message.get('reactions', []))
+
+    def run(self):
+        # 스레드를 읽는 속도가 추출보다 빨라도 대기 중인 스레드가 쌓이지 않도록 제한합니다.
+        max_in_flight = self.args.concurrency * 2
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.args.concurrency, thread_name_prefix='backfill') as executor:
+            for message in self.iter_threads():
+                self.report.count('scanned')
+                if self.should_skip(message):
+                    self.report.count('skipped')
+                    continue
+                record = self.checkpoint.get(message['ts'])
+                if record and record['status'] == EXTRACTED:
+                    # 추출까지 마친 스레드는 LaaS 를 다시 호출하지 않고 생성만 다시 시도합니다.
+                    self.enqueue(message['ts'])
+                else:
+                    in_flight[executor.submit(self.extract, message)] = message['ts']
+                while len(in_flight) >= max_in_flight:
+                    self._drain(in_flight, FIRST_COMPLETED)
+                if self.args.limit and self.report.counts['scanned'] - self.report.counts['skipped'] >= self.args.limit:
+                    break
+            while in_flight:
+                self._drain(in_flight, FIRST_COMPLETED)
+        self.flush()
+        self.report.print()
+
+    def _drain(self, in_flight, return_when):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            self.on_extracted(in_flight.pop(future), future)
+
+
+def main():
+    args = parse_args()
+    collection = load_collections().get(args.emoji)
+    if collection is None:
+        raise SystemExit(f'Unknown emoji: {args.emoji}')
+
+    web_client = WebClient(token=os.environ['SLACK_BOT_TOKEN'], base_url=os.getenv('SLACK_API_URL', WebClient.BASE_URL))
+    # 일괄 작업이므로 rate limit 을 넘지 않도록 기다리는 시간에 제한을 두지 않습니다.
+    slack_rate_limiter = SlackRateLimiter(max_wait=float('inf'))
+    slack_client = RateLimitedSlackClient(web_client, slack_rate_limiter)
+    jira = JiraOperator(pool_size=args.concurrency)
+    if args.user_directory:
+        user_directory.refresh(slack_client, jira)
+
+    backfill = Backfill(args, slack_client, jira, collection)
+    try:
+        backfill.run()
+    except KeyboardInterrupt:
+        backfill.checkpoint.save()
+        backfill.report.print()
+        raise SystemExit(130)
+    finally:
+        print(f'slack rate limit: {slack_rate_limiter.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Slack 첨부파일을 다운로드합니다.
+작업마다 동시 연결 수를 제한하고, 모든 작업이 keep-alive 연결 풀을 공유합니다.
+같은 파일은 작업 안에서 한 번만 다운로드하고, 최근 다운로드한 파일은 작업 사이에서도 재사용합니다.
+큰 파일과 작업의 메모리 한도를 넘는 파일은 임시 파일(디스크)에 저장하고, 업로드할 때도 조각 단위로 읽습니다.
+"""
+import io
+import os
+import hashlib
+import tempfile
+import threading
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from middleware.cache import TTLCache
+from middleware.metrics import stage, payload_bytes
+from middleware.laas.mimetype import get_mime_type_from_url, is_downloadable_mime_type
+
+
+ATTACHMENT_DOWNLOAD_CONCURRENCY = int(os.getenv('ATTACHMENT_DOWNLOAD_CONCURRENCY', 4))
+ATTACHMENT_MAX_FILE_BYTES = int(os.getenv('ATTACHMENT_MAX_FILE_BYTES', 20 * 1024 * 1024))
+ATTACHMENT_MAX_JOB_BYTES = int(os.getenv('ATTACHMENT_MAX_JOB_BYTES', 100 * 1024 * 1024))
+ATTACHMENT_POOL_SIZE = int(os.getenv('ATTACHMENT_POOL_SIZE', 32))
+# 여러 스레드에 공유된 파일을 다시 다운로드하지 않도록 최근 파일을 Slack file ID 로 캐시합니다. 0 이면 캐시하지 않습니다.
+ATTACHMENT_CACHE_SIZE = int(os.getenv('ATTACHMENT_CACHE_SIZE', 16))
+ATTACHMENT_CACHE_TTL = float(os.getenv('ATTACHMENT_CACHE_TTL', 10 * 60))
+# 이보다 큰 파일은 메모리 대신 임시 파일에 저장합니다.
+ATTACHMENT_SPOOL_MAX_SIZE = int(os.getenv('ATTACHMENT_SPOOL_MAX_SIZE', 1024 * 1024))
+# 작업 하나가 메모리에 두는 첨부파일 전체 크기입니다. 넘으면 이후 파일은 임시 파일에 저장합니다.
+ATTACHMENT_MAX_JOB_MEMORY = int(os.getenv('ATTACHMENT_MAX_JOB_MEMORY', 8 * 1024 * 1024))
+# 임시 파일을 만들 디렉터리입니다. 지정하지 않으면 시스템 임시 디렉터리를 사용합니다.
+ATTACHMENT_SPOOL_DIR = os.getenv('ATTACHMENT_SPOOL_DIR')
+CHUNK_SIZE = 64 * 1024
+
+attachment_cache = TTLCache(maxsize=ATTACHMENT_CACHE_SIZE, ttl=ATTACHMENT_CACHE_TTL)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    모든 작업이 공유하는 keep-alive 세션을 반환합니다.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=ATTACHMENT_POOL_SIZE)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+class Attachment:
+    """
+    첨부파일 내용을 메모리에 두거나, spill() 한 뒤에는 임시 파일에 둡니다.
+    읽을 때는 파일 위치를 공유하지 않으므로 여러 작업이 같은 Attachment 를 동시에 읽어도 됩니다.
+    """
+    def __init__(self, file_id, name, mime_type, content=b''):
+        self.file_id = file_id
+        self.name = name
+        self.mime_type = mime_type
+        self._buffer = bytearray(content)
+        self._file = None
+        self._size = len(content)
+        self._sha256 = hashlib.sha256(content)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def in_memory(self):
+        return self._file is None
+
+    def write(self, chunk):
+        self._sha256.update(chunk)
+        self._size += len(chunk)
+        if self._file is None:
+            self._buffer += chunk
+        else:
+            self._write_file(chunk)
+
+    def _write_file(self, data):
+        # buffering=0 인 FileIO 는 일부만 쓸 수 있으므로 모두 쓸 때까지 반복합니다.
+        view = memoryview(data)
+        while view:
+            view = view[self._file.write(view):]
+
+    def spill(self):
+        """
+        메모리에 있는 내용을 임시 파일로 옮기고, 이후 내용은 임시 파일에 씁니다.
+        임시 파일은 만들자마자 삭제되어 닫히면(가비지 컬렉션되면) 디스크에서 사라집니다.
+        """
+        if self._file is not None:
+            return
+        self._file = tempfile.TemporaryFile(dir=ATTACHMENT_SPOOL_DIR, buffering=0)
+        self._write_file(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    @cached_property
+    def digest(self):
+        return self._sha256.hexdigest()
+
+    def read_at(self, offset, size):
+        if self._file is None:
+            return bytes(self._buffer[offset:offset + size])
+        chunks = []
+        while size > 0:
+            chunk = os.pread(self._file.fileno(), size, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """
+        마지막 조각을 제외하면 모두 chunk_size 크기입니다.
+        """
+        for offset in range(0, self._size, chunk_size):
+            yield self.read_at(offset, chunk_size)
+
+    def open(self):
+        """
+        위치를 따로 가지는 읽기 전용 파일 객체를 반환합니다.
+        """
+        return AttachmentReader(self)
+
+    @property
+    def content(self):
+        """
+        전체 내용을 bytes 로 읽습니다. 큰 파일은 iter_chunks() 나 open() 을 사용합니다.
+        """
+        return self.read_at(0, self._size)
+
+
+class AttachmentReader(io.RawIOBase):
+    def __init__(self, attachment):
+        self.attachment = attachment
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self.attachment)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def readinto(self, buffer):
+        chunk = self.attachment.read_at(self._position, len(buffer))
+        buffer[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+class MemoryBudget:
+    """
+    작업 하나가 메모리에 두는 첨부파일 크기를 제한합니다.
+    max_file_memory 보다 큰 파일이나 한도를 넘게 하는 파일은 임시 파일로 옮깁니다.
+    """
+    def __init__(self, limit=ATTACHMENT_MAX_JOB_MEMORY, max_file_memory=ATTACHMENT_SPOOL_MAX_SIZE):
+        self.limit = limit
+        self.max_file_memory = max_file_memory
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used(self):
+        return self._used
+
+    def write(self, attachment, chunk):
+        if attachment.in_memory:
+            with self._lock:
+                fits = len(attachment) + len(chunk) <= self.max_file_memory and self._used + len(chunk) <= self.limit
+                self._used += len(chunk) if fits else -len(attachment)
+            if not fits:
+                attachment.spill()
+        attachment.write(chunk)
+
+    def discard(self, attachment):
+        if attachment.in_memory:
+            with self._lock:
+                self._used -= len(attachment)
+        attachment.close()
+
+    def store(self, attachment, content):
+        for offset in range(0, len(content), CHUNK_SIZE):
+            self.write(attachment, content[offset:offset + CHUNK_SIZE])
+        return attachment
+
+
+def attachment_cache_key(file, url=None):
+    """
+    file ID 가 없는 파일은 캐시하지 않습니다.
+    """
+    return (file['id'], url) if file.get('id') else None
+
+
+class AttachmentDownloader:
+    """
+    하나의 작업(스레드)에 속한 첨부파일을 동시에 다운로드합니다.
+    파일 하나의 크기와 작업 전체의 크기를 제한하며, 제한을 넘거나 지원하지 않는 형식의 파일은 건너뜁니다.
+    메모리에는 budget 한도까지만 두고 나머지는 임시 파일에 저장합니다.
+    """
+    def __init__(
+        self,
+        token,
+        max_connections=ATTACHMENT_DOWNLOAD_CONCURRENCY,
+        max_file_bytes=ATTACHMENT_MAX_FILE_BYTES,
+        max_job_bytes=ATTACHMENT_MAX_JOB_BYTES,
+        budget=None,
+    ):
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.max_file_bytes = max_file_bytes
+        self.max_job_bytes = max_job_bytes
+        self.budget = budget or MemoryBudget()
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='attachment')
+        self._lock = threading.Lock()
+        self._job_bytes = 0
+        self._futures = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def job_bytes(self):
+        return self._job_bytes
+
+    def submit(self, file, url=None):
+        """
+        다운로드를 예약하고 Future 를 반환합니다. 결과는 Attachment 또는 None 입니다.
+        url 을 지정하면 url_private 대신 해당 URL(썸네일 등)을 다운로드합니다.
+        같은 파일을 다시 요청하면 이전 Future 를 반환합니다.
+        """
+        key = (file.get('id') or file['url_private'], url)
+        with self._lock:
+            if key not in self._futures:
+                self._futures[key] = self._executor.submit(self.download, file, url)
+            return self._futures[key]
+
+    def _reserve(self, size):
+        with self._lock:
+            if self._job_bytes + size > self.max_job_bytes:
+                return False
+            self._job_bytes += size
+            return True
+
+    def _release(self, size):
+        with self._lock:
+            self._job_bytes -= size
+
+    def download(self, file, url=None):
+        with stage('download'):
+            attachment = self._download(file, url)
+        if attachment is not None:
+            payload_bytes.observe(len(attachment), kind='attachment')
+        return attachment
+
+    def _download(self, file, url=None):
+        cache_key = attachment_cache_key(file, url)
+        if cache_key:
+            cached = attachment_cache.get(cache_key)
+            if cached is not None:
+                return cached if self._reserve(len(cached)) else None
+
+        private_file_url = url or file['url_private']
+        try:
+            response = get_session().get(private_file_url, headers=self.headers, stream=True, timeout=(5, 60))
+        except requests.RequestException:
+            return None
+
+        with response:
+            if not response.ok:
+                return None
+
+            # 본문을 읽기 전에 헤더로 형식과 크기를 확인합니다.
+            mime_type = response.headers.get('Content-Type') or get_mime_type_from_url(private_file_url)
+            if not is_downloadable_mime_type(mime_type):
+                return None
+            content_length = int(response.headers.get('Content-Length') or 0)
+            if content_length > self.max_file_bytes or not self._reserve(content_length):
+                return None
+
+            attachment = Attachment(file.get('id'), file.get('name'), mime_type)
+            if content_length > self.budget.max_file_memory:
+                attachment.spill()
+
+            # Content-Length 가 없거나 틀릴 수 있으므로 읽으면서 다시 확인합니다.
+            reserved = content_length
+            size = 0
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    self.budget.write(attachment, chunk)
+                    size += len(chunk)
+                    if size > self.max_file_bytes:
+                        raise ValueError('file size limit exceeded')
+                    if size > reserved:
+                        if not self._reserve(size - reserved):
+                            raise ValueError('job size limit exceeded')
+                        reserved = size
+            except (ValueError, requests.RequestException):
+                self._release(reserved)
+                self.budget.discard(attachment)
+                return None
+
+        if cache_key:
+            attachment_cache.set(cache_key, attachment)
+        return attachment
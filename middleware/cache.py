@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    만료 시간(TTL)과 최대 크기를 가진 LRU 캐시입니다.
+    여러 워커 스레드가 함께 사용할 수 있으며, 같은 키를 동시에 조회하면 한 번만 불러옵니다.
+    """
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # 다른 스레드의 조회 결과를 기다려 받은 횟수입니다.
+        self.coalesced = 0
+        self._data = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self._lookup(key, count=False) is not _MISSING
+
+    def _lookup(self, key, count=True):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return value
+                del self._data[key]
+            if count:
+                self.misses += 1
+            return _MISSING
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        캐시에 값이 없으면 loader() 로 불러와 저장합니다.
+        같은 키를 동시에 조회하면 먼저 조회한 스레드만 loader 를 호출하고 나머지는 그 결과를 기다립니다.
+        """
+        value = self._lookup(key, count=False)
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            self.set(key, flight.value, ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
+
+
+class SQLiteCache:
+    """
+    재시작 후에도 유지되는 SQLite 기반의 TTL 캐시입니다.
+    값은 JSON 으로 저장하며 None 도 저장할 수 있습니다. 만료된 값은 keys(expired=True) 로 찾아 갱신할 수 있습니다.
+    """
+    def __init__(self, path, table='cache', maxsize=None):
+        self.path = path
+        self.table = table
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        # import 시점에 파일을 만들지 않도록 처음 사용할 때 연결합니다.
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)'
+            )
+        return self._conn
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self.conn.execute(
+                f'SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?', (key, time.time()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self.conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), time.time() + ttl),
+            )
+            if self.maxsize:
+                # 먼저 만료되는 값부터 삭제하여 최대 크기를 유지합니다.
+                self.conn.execute(
+                    f'DELETE FROM {self.table} WHERE key IN '
+                    f'(SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                    (self.maxsize,),
+                )
+
+    def delete(self, key):
+        with self._lock:
+            self.conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def keys(self, expired=False):
+        with self._lock:
+            op = '<=' if expired else '>'
+            return [row[0] for row in self.conn.execute(
+                f'SELECT key FROM {self.table} WHERE expires_at {op} ?', (time.time(),),
+            )]
+
+    def purge(self):
+        """
+        만료된 값을 삭제합니다.
+        """
+        with self._lock:
+            self.conn.execute(f'DELETE FROM {self.table} WHERE expires_at <= ?', (time.time(),))
+
+    def stats(self):
+        with self._lock:
+            size = self.conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+            return {
+                'size': size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,97 @@
+"""
+이모지별로 이슈를 생성할 Jira 프로젝트, LaaS 프리셋, 이슈 모델을 정의합니다.
+JIRA_BOLT_COLLECTIONS 환경변수에 설정 파일(JSON) 경로를 지정하면 여러 팀의 프로젝트를 하나의 프로세스에서 운영할 수 있습니다.
+
+[
+    {
+        "name": "PI",
+        "workspace": "wantedlab.atlassian.net",
+        "project": "PI",
+        "trigger_emoji": "pi_jira_gen",
+        "laas_jira_hash": "...",
+        "issue_model": "middleware.laas.jira_fields_schema:Issue",
+        "field_map": {"environment": "customfield_10106", "bug_property": "customfield_10177"}
+    }
+]
+"""
+import os
+import json
+from importlib import import_module
+
+from middleware.laas.jira_fields_schema import DEFAULT_FIELD_MAP, get_format_instructions
+
+
+class SlackCollection:
+    # FIXME:
+    workspace = 'wantedx.slack.com'
+    loading_emoji = 'loading'
+
+
+class Collection:
+    """
+    이모지 하나에 대응하는 이슈 생성 설정입니다.
+    스키마와 필드 매핑은 생성할 때 한 번만 계산하여 이벤트마다 다시 만들지 않습니다.
+    """
+    def __init__(self, name, workspace, project, trigger_emoji, laas_jira_hash, issue_model, field_map=None):
+        self.name = name
+        self.workspace = workspace
+        self.project = project
+        self.trigger_emoji = trigger_emoji
+        self.laas_jira_hash = laas_jira_hash
+        self.issue_model = import_string(issue_model) if isinstance(issue_model, str) else issue_model
+        self.field_map = {**DEFAULT_FIELD_MAP, **(field_map or {})}
+        self.schema_params = {'schema': get_format_instructions(self.issue_model)}
+
+    def __repr__(self):
+        return f'Collection({self.name!r}, project={self.project!r}, trigger_emoji={self.trigger_emoji!r})'
+
+
+def import_string(path):
+    """
+    "module.path:ClassName" 형식의 문자열로 클래스를 가져옵니다.
+    """
+    module_name, _, attr = path.partition(':')
+    return getattr(import_module(module_name), attr)
+
+
+# FIXME:
+PICollection = Collection(
+    name='PI',
+    workspace='wantedlab.atlassian.net',
+    project='PI',
+    trigger_emoji='pi_jira_gen',
+    laas_jira_hash='8008b106b08d86b0af7a55d0ad18ca058aab88fc7e7a5945eedee7f16827d21e',
+    issue_model='middleware.laas.jira_fields_schema:Issue',
+)
+
+
+class CollectionRegistry:
+    """
+    트리거 이모지로 Collection 을 찾습니다.
+    """
+    def __init__(self, collections):
+        self._by_emoji = {}
+        for collection in collections:
+            if collection.trigger_emoji in self._by_emoji:
+                raise ValueError(f'Duplicated trigger emoji: {collection.trigger_emoji}')
+            self._by_emoji[collection.trigger_emoji] = collection
+
+    def __iter__(self):
+        return iter(self._by_emoji.values())
+
+    def __len__(self):
+        return len(self._by_emoji)
+
+    def get(self, emoji):
+        return self._by_emoji.get(emoji)
+
+
+def load_collections(path=None):
+    """
+    설정 파일에서 Collection 목록을 불러옵니다. 설정 파일이 없으면 PICollection 만 사용합니다.
+    """
+    path = path or os.getenv('JIRA_BOLT_COLLECTIONS')
+    if not path:
+        return CollectionRegistry([PICollection])
+    with open(path, encoding='utf-8') as f:
+        return CollectionRegistry([Collection(**config) for config in json.load(f)])
@@ -0,0 +1,305 @@
+"""
+여러 레플리카(app.py 컨테이너)가 같은 Slack 앱으로 동시에 실행될 때 작업을 나눠 처리합니다.
+COORDINATION_STORE 를 지정할 때만 사용하며, 지정하지 않으면 한 프로세스 안에서만 중복을 걸러냅니다.
+
+- 임대(lease): 이벤트 ID 와 (channel, ts, emoji) 마다 한 레플리카만 작업을 실행합니다.
+  작업이 실행되는 동안 임대를 갱신하고, 레플리카가 죽으면 임대가 만료되어 다른 레플리카가 다시 처리할 수 있습니다.
+- 샤딩: 살아 있는 레플리카 중 채널마다 하나(rendezvous hashing)가 이벤트를 바로 처리합니다.
+  다른 레플리카는 SHARD_HANDOFF_DELAY 만큼 기다린 뒤 임대를 시도하므로, 담당 레플리카가 이벤트를 받지 못해도 처리됩니다.
+- 공유 캐시: Jira 유저, LaaS 응답 캐시를 모든 레플리카가 함께 사용합니다.
+
+저장소는 COORDINATION_STORE 의 scheme 으로 고릅니다. 기본으로 SQLite(sqlite:///절대/경로, sqlite:상대/경로)를 제공하며,
+같은 호스트나 잠금을 지원하는 공유 볼륨에서 실행하는 레플리카, 로컬 테스트에 사용합니다.
+다른 저장소(Redis 등)는 SharedStore 를 구현하여 register_store 로 등록하고, COORDINATION_STORE_MODULES 로 가져옵니다.
+"""
+import os
+import time
+import socket
+import sqlite3
+import hashlib
+import importlib
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import urlsplit
+
+from middleware.cache import SQLiteCache
+
+
+COORDINATION_STORE = os.getenv('COORDINATION_STORE')
+# 저장소를 등록하는 모듈 목록(쉼표 구분)입니다. e.g. myorg.jira_bolt_redis
+COORDINATION_STORE_MODULES = os.getenv('COORDINATION_STORE_MODULES', '')
+REPLICA_ID = os.getenv('REPLICA_ID') or f'{socket.gethostname()}:{os.getpid()}'
+# 임대를 갱신하지 않으면 만료되는 시간(초)입니다. 레플리카가 죽으면 이 시간 뒤에 다른 레플리카가 이어받습니다.
+COORDINATION_LEASE_TTL = float(os.getenv('COORDINATION_LEASE_TTL', 30))
+# 담당하지 않는 채널의 이벤트를 처리하기 전에 기다리는 시간(초)입니다.
+SHARD_HANDOFF_DELAY = float(os.getenv('SHARD_HANDOFF_DELAY', 5))
+
+
+class SharedStore(ABC):
+    """
+    레플리카가 공유하는 저장소입니다. 모든 연산은 레플리카 사이에서 원자적이어야 합니다.
+    """
+    @abstractmethod
+    def acquire(self, key, owner, ttl):
+        """
+        key 가 비어 있거나 만료되었거나 owner 가 이미 가진 임대이면 ttl 동안 가지고 True 를 반환합니다.
+        """
+
+    @abstractmethod
+    def release(self, key, owner):
+        """
+        owner 가 가진 임대를 내려놓습니다.
+        """
+
+    @abstractmethod
+    def owner(self, key):
+        """
+        만료되지 않은 임대의 owner 를 반환합니다. 없으면 None 입니다.
+        """
+
+    @abstractmethod
+    def owners(self, prefix):
+        """
+        prefix 로 시작하는 만료되지 않은 임대의 owner 목록입니다.
+        """
+
+    @abstractmethod
+    def incr(self, key, ttl):
+        """
+        카운터를 1 늘리고 새 값을 반환합니다. ttl 이 지나면 0 부터 다시 셉니다.
+        """
+
+    @abstractmethod
+    def count(self, key):
+        """
+        만료되지 않은 카운터 값입니다. 없으면 0 입니다.
+        """
+
+    @abstractmethod
+    def delete(self, key):
+        """
+        카운터를 삭제합니다.
+        """
+
+    def purge(self):
+        """
+        만료된 임대와 카운터를 삭제합니다. 만료되면 스스로 사라지는 저장소는 구현하지 않아도 됩니다.
+        """
+
+    @abstractmethod
+    def cache(self, table, maxsize=None):
+        """
+        SQLiteCache 와 같은 get/set/delete/keys/purge/stats 를 가진 공유 캐시를 반환합니다.
+        """
+
+
+class SQLiteSharedStore(SharedStore):
+    """
+    SQLite 파일 잠금으로 레플리카 사이의 원자성을 보장합니다.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS lease (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS counter (key TEXT PRIMARY KEY, value INTEGER, expires_at REAL)')
+        return self._conn
+
+    def acquire(self, key, owner, ttl):
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO lease (key, owner, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+                'WHERE lease.expires_at <= ? OR lease.owner = excluded.owner',
+                (key, owner, now + ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key, owner):
+        with self._lock:
+            self.conn.execute('DELETE FROM lease WHERE key = ? AND owner = ?', (key, owner))
+
+    def owner(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT owner FROM lease WHERE key = ? AND expires_at > ?', (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def owners(self, prefix):
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                'SELECT owner FROM lease WHERE substr(key, 1, ?) = ? AND expires_at > ?',
+                (len(prefix), prefix, time.time()),
+            )]
+
+    def incr(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            return self.conn.execute(
+                'INSERT INTO counter (key, value, expires_at) VALUES (?, 1, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'value = CASE WHEN counter.expires_at <= ? THEN 1 ELSE counter.value + 1 END, '
+                'expires_at = excluded.expires_at '
+                'RETURNING value',
+                (key, now + ttl, now),
+            ).fetchone()[0]
+
+    def count(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT value FROM counter WHERE key = ? AND expires_at > ?', (key, time.time()),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def delete(self, key):
+        with self._lock:
+            self.conn.execute('DELETE FROM counter WHERE key = ?', (key,))
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            self.conn.execute('DELETE FROM lease WHERE expires_at <= ?', (now,))
+            self.conn.execute('DELETE FROM counter WHERE expires_at <= ?', (now,))
+
+    def cache(self, table, maxsize=None):
+        return SQLiteCache(self.path, table=table, maxsize=maxsize)
+
+
+def _sqlite_store(url):
+    # sqlite:///절대/경로 또는 sqlite:상대/경로
+    return SQLiteSharedStore(url.netloc + url.path)
+
+
+_stores = {'sqlite': _sqlite_store}
+
+
+def register_store(scheme, factory):
+    """
+    factory 는 urlsplit 한 COORDINATION_STORE 를 받아 SharedStore 를 반환합니다.
+    """
+    _stores[scheme] = factory
+
+
+def load_store(url=COORDINATION_STORE):
+    for module in filter(None, map(str.strip, COORDINATION_STORE_MODULES.split(','))):
+        importlib.import_module(module)
+    parsed = urlsplit(url)
+    try:
+        factory = _stores[parsed.scheme]
+    except KeyError:
+        raise ValueError(f'Unknown COORDINATION_STORE scheme: {parsed.scheme!r}') from None
+    return factory(parsed)
+
+
+class Coordinator:
+    """
+    레플리카의 생존 신호(heartbeat)와 가지고 있는 임대를 주기적으로 갱신합니다.
+    """
+    def __init__(self, store, replica_id=REPLICA_ID, lease_ttl=COORDINATION_LEASE_TTL, handoff_delay=SHARD_HANDOFF_DELAY):
+        self.store = store
+        self.replica_id = replica_id
+        self.lease_ttl = lease_ttl
+        self.handoff_delay = handoff_delay
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def heartbeat(self):
+        self.store.acquire(f'replica:{self.replica_id}', self.replica_id, self.lease_ttl)
+        with self._lock:
+            held = list(self._held)
+        for key in held:
+            if not self.store.acquire(key, self.replica_id, self.lease_ttl):
+                # 갱신하지 못하는 사이 다른 레플리카가 가져갔습니다.
+                print(f'Lost lease: {key}')
+                with self._lock:
+                    self._held.discard(key)
+
+    def start(self):
+        def run():
+            while True:
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    # 다른 저장소(Redis 등)의 오류도 기록하고 계속 갱신합니다. 스레드가 끝나면 임대가 만료되어 다른 레플리카가 같은 이벤트를 다시 처리합니다.
+                    print(f'Coordination heartbeat failed: {e!r}')
+                if self._stop.wait(self.lease_ttl / 3):
+                    return
+
+        self.store.purge()
+        self.heartbeat()
+        threading.Thread(target=run, name='coordination', daemon=True).start()
+
+    def stop(self):
+        """
+        다른 레플리카가 바로 이어받을 수 있도록 생존 신호와 임대를 내려놓습니다.
+        """
+        self._stop.set()
+        with self._lock:
+            held, self._held = self._held, set()
+        for key in held:
+            self.store.release(key, self.replica_id)
+        self.store.release(f'replica:{self.replica_id}', self.replica_id)
+
+    def members(self):
+        return sorted(set(self.store.owners('replica:')) | {self.replica_id})
+
+    @staticmethod
+    def _weight(channel, member):
+        return hashlib.blake2b(f'{channel}:{member}'.encode(), digest_size=8).digest()
+
+    def shard_owner(self, channel):
+        """
+        레플리카가 늘거나 줄어도 대부분의 채널은 담당 레플리카가 바뀌지 않습니다.
+        """
+        return max(self.members(), key=lambda member: self._weight(channel, member))
+
+    def delay(self, channel):
+        """
+        이 레플리카가 이벤트를 처리하기 전에 기다릴 시간(초)입니다.
+        """
+        return 0 if self.shard_owner(channel) == self.replica_id else self.handoff_delay
+
+    def acquire(self, key, ttl=None):
+        """
+        ttl 을 지정하지 않으면 release 할 때까지 임대를 갱신합니다.
+        """
+        if not self.store.acquire(key, self.replica_id, ttl or self.lease_ttl):
+            return False
+        if ttl is None:
+            with self._lock:
+                self._held.add(key)
+        return True
+
+    def release(self, key):
+        with self._lock:
+            self._held.discard(key)
+        self.store.release(key, self.replica_id)
+
+    def stats(self):
+        with self._lock:
+            held = len(self._held)
+        return {'replica_id': self.replica_id, 'members': len(self.members()), 'held_leases': held}
+
+
+shared_store = load_store() if COORDINATION_STORE else None
+coordinator = Coordinator(shared_store) if shared_store else None
+
+
+def shared_cache(table, path, maxsize=None):
+    """
+    COORDINATION_STORE 를 지정하면 레플리카가 공유하는 캐시를, 아니면 path 의 로컬 SQLite 캐시를 반환합니다.
+    """
+    if shared_store is not None:
+        return shared_store.cache(table, maxsize)
+    return SQLiteCache(path, table=table, maxsize=maxsize)
@@ -0,0 +1,127 @@
+"""
+중복 이벤트를 Slack, LaaS 를 호출하기 전에 걸러냅니다.
+Socket Mode 는 응답이 늦으면 같은 이벤트를 다시 보내고, 여러 명이 거의 동시에 이모지를 달 수도 있습니다.
+이벤트 ID 로 재전송을 걸러내고, (channel, ts, emoji) 마다 하나의 작업만 실행합니다.
+coordinator 를 지정하면 여러 레플리카 사이에서도 임대로 같은 규칙을 적용합니다.
+"""
+import os
+import threading
+
+from middleware.cache import TTLCache
+
+
+EVENT_DEDUPE_SIZE = int(os.getenv('EVENT_DEDUPE_SIZE', 4096))
+EVENT_DEDUPE_TTL = float(os.getenv('EVENT_DEDUPE_TTL', 24 * 60 * 60))
+
+CLAIMED = 'claimed'
+# 이미 받은 이벤트(재전송)입니다.
+DUPLICATE = 'duplicate'
+# 같은 메시지에 대한 작업이 실행 중입니다.
+IN_PROGRESS = 'in_progress'
+# 이 프로세스(또는 다른 레플리카)에서 이미 이슈를 생성했습니다. 트리거 이모지를 지우면 forget 으로 풀어줍니다.
+CREATED = 'created'
+
+
+def thread_key(event):
+    return event['item']['channel'], event['item']['ts'], event['reaction']
+
+
+def _lease_name(key):
+    return ':'.join(key)
+
+
+class ThreadClaims:
+    """
+    작업을 시작하기 전에 claim 하고, 끝나면 release 합니다.
+    스레드와 이벤트 루프 어디에서 사용해도 되도록 잠금 안에서는 기다리지 않습니다.
+    """
+    def __init__(self, maxsize=EVENT_DEDUPE_SIZE, ttl=EVENT_DEDUPE_TTL, coordinator=None):
+        self.ttl = ttl
+        self.coordinator = coordinator
+        self._events = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._created = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 실행 중인 작업마다 그동안 걸러낸 다른 유저의 이모지 수를 기록합니다.
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def claim(self, event_id, key):
+        with self._lock:
+            if event_id:
+                if event_id in self._events:
+                    return DUPLICATE
+                self._events.set(event_id, True)
+            # 여러 레플리카로 실행하면 다른 레플리카가 지운 기록을 알 수 없으므로 공유 저장소로 확인합니다.
+            if self.coordinator is None and key in self._created:
+                return CREATED
+            if key in self._running:
+                self._running[key] += 1
+                return IN_PROGRESS
+            self._running[key] = 0
+        if self.coordinator is None:
+            return CLAIMED
+
+        claim = self._claim_shared(event_id, key)
+        if claim != CLAIMED:
+            with self._lock:
+                self._running.pop(key, None)
+        return claim
+
+    def _claim_shared(self, event_id, key):
+        """
+        이 프로세스에서 claim 한 뒤 다른 레플리카와 겹치는지 확인합니다.
+        """
+        name = _lease_name(key)
+        if event_id and not self.coordinator.acquire(f'event:{event_id}', ttl=self.ttl):
+            return DUPLICATE
+        if self.coordinator.store.owner(f'created:{name}'):
+            return CREATED
+        if not self.coordinator.acquire(f'thread:{name}'):
+            # 작업을 실행하는 레플리카가 reactions_get 의 개수에서 제외할 수 있도록 셉니다.
+            self.coordinator.store.incr(f'concurrent:{name}', self.ttl)
+            return IN_PROGRESS
+        return CLAIMED
+
+    def concurrent(self, key):
+        """
+        작업이 실행되는 동안 걸러낸 이모지 수입니다. reactions_get 의 개수에서 제외합니다.
+        """
+        with self._lock:
+            count = self._running.get(key, 0)
+        if self.coordinator is not None:
+            count += self.coordinator.store.count(f'concurrent:{_lease_name(key)}')
+        return count
+
+    def release(self, key, created=False):
+        with self._lock:
+            self._running.pop(key, None)
+            if created:
+                self._created.set(key, True)
+        if self.coordinator is None:
+            return
+        name = _lease_name(key)
+        if created:
+            self.coordinator.acquire(f'created:{name}', ttl=self.ttl)
+        self.coordinator.store.delete(f'concurrent:{name}')
+        self.coordinator.release(f'thread:{name}')
+
+    def forget(self, key):
+        """
+        트리거 이모지가 지워지면 이슈를 생성했다는 기록을 지웁니다.
+        이후에 단 이모지는 reactions_get 으로 남은 이모지를 확인하므로, 이모지를 모두 지우고 다시 달면 이슈를 다시 생성합니다.
+        """
+        with self._lock:
+            self._created.delete(key)
+        if self.coordinator is None:
+            return
+        name = f'created:{_lease_name(key)}'
+        owner = self.coordinator.store.owner(name)
+        if owner:
+            self.coordinator.store.release(name, owner)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': len(self._running),
+                'created': len(self._created),
+                'events': len(self._events),
+            }
@@ -0,0 +1,231 @@
+"""
+Slack 유저와 Jira 계정 디렉터리를 미리 읽어 Slack 유저 ID -> 이름, 이메일, Jira accountId 인덱스를 만듭니다.
+USER_DIRECTORY_SYNC 를 지정하면 시작할 때 백그라운드에서 동기화하고, USER_DIRECTORY_REFRESH_INTERVAL 마다 다시 동기화합니다.
+동기화를 마친 뒤에는 인덱스에 있는 유저를 네트워크 호출 없이 조회하고, 새로 들어온 유저만 기존처럼 조회합니다.
+
+- Slack: users.list 를 cursor 로 페이지네이션합니다.
+- Jira: users/search 를 startAt 으로 페이지네이션하고 이메일이 공개된 계정을 이메일로 매칭합니다.
+  이메일이 공개되지 않은 계정은 USER_DIRECTORY_LOOKUP_CONCURRENCY 개씩 동시에 이메일로 검색합니다.
+  모든 활성 계정의 이메일이 공개되어 있으면 목록에 없는 유저는 Jira 계정이 없으므로 검색하지 않습니다.
+  찾지 못한 이메일은 USER_DIRECTORY_NEGATIVE_TTL 동안 다시 검색하지 않습니다.
+- OUTSIDE_SLACK_JIRA_USERS 는 이메일로 찾지 못한 유저에 합칩니다.
+"""
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from middleware.laas.heuristic import OUTSIDE_SLACK_JIRA_USERS
+
+
+USER_DIRECTORY_SYNC = os.getenv('USER_DIRECTORY_SYNC', False)
+USER_DIRECTORY_REFRESH_INTERVAL = float(os.getenv('USER_DIRECTORY_REFRESH_INTERVAL', 6 * 60 * 60))
+SLACK_USERS_PAGE_SIZE = int(os.getenv('SLACK_USERS_PAGE_SIZE', 200))
+JIRA_USERS_PAGE_SIZE = int(os.getenv('JIRA_USERS_PAGE_SIZE', 1000))
+# 디렉터리에서 찾지 못한 이메일을 동시에 검색하는 요청 수입니다.
+USER_DIRECTORY_LOOKUP_CONCURRENCY = int(os.getenv('USER_DIRECTORY_LOOKUP_CONCURRENCY', 8))
+# 이메일로 찾지 못한 유저를 다시 검색하지 않는 시간(초)입니다. 동기화마다 다시 검색하지 않도록 동기화 주기보다 길게 둡니다.
+USER_DIRECTORY_NEGATIVE_TTL = float(os.getenv('USER_DIRECTORY_NEGATIVE_TTL', 24 * 60 * 60))
+
+# 인덱스에 없는 유저입니다. 인덱스에 있지만 Jira 계정이 없는 유저(None)와 구분합니다.
+MISSING = object()
+
+
+def normalize_user(user):
+    """
+    users.list, users.info 응답에서 이후 단계에서 사용하는 필드만 남깁니다.
+    """
+    profile = user.get('profile') or {}
+    return {
+        'id': user['id'],
+        'name': user.get('name'),
+        'real_name': user.get('real_name') or profile.get('real_name') or user.get('name'),
+        'is_bot': user.get('is_bot', False),
+        'deleted': user.get('deleted', False),
+        'profile': {'email': profile.get('email')},
+    }
+
+
+def is_active_account(account):
+    return account.get('active', True) and account.get('accountType', 'atlassian') == 'atlassian'
+
+
+def jira_email_index(accounts):
+    """
+    이메일이 공개된 활성 계정만 이메일(소문자) -> accountId 로 모읍니다.
+    """
+    return {
+        account['emailAddress'].lower(): account['accountId']
+        for account in accounts
+        if account.get('emailAddress') and is_active_account(account)
+    }
+
+
+def has_hidden_emails(accounts):
+    """
+    이메일이 공개되지 않은 활성 계정이 있는지 반환합니다. 없으면 디렉터리에 없는 이메일은 Jira 계정이 없습니다.
+    """
+    return any(not account.get('emailAddress') and is_active_account(account) for account in accounts)
+
+
+class UserDirectory:
+    def __init__(self, overrides=OUTSIDE_SLACK_JIRA_USERS):
+        self.overrides = overrides
+        # 동기화할 때마다 새 dict 로 교체하므로 읽을 때는 잠그지 않습니다.
+        self._users = {}
+        self._accounts = {}
+        self.synced_at = None
+        self._stop = threading.Event()
+        # 이메일로 찾지 못한 유저의 이메일 -> 다시 검색할 시각입니다. 동기화 사이에 유지합니다.
+        self._not_found = {}
+
+    @property
+    def warm(self):
+        return self.synced_at is not None
+
+    def __len__(self):
+        return len(self._users)
+
+    def slack_user(self, slack_id):
+        """
+        인덱스에 있으면 Slack 유저 정보를, 없으면 None 을 반환합니다.
+        """
+        return self._users.get(slack_id)
+
+    def jira_account_id(self, slack_id):
+        """
+        Jira accountId 를 반환합니다. Jira 계정이 없는 유저는 None, 인덱스에 없는 유저는 MISSING 을 반환합니다.
+        """
+        return self._accounts.get(slack_id, MISSING)
+
+    def _build(self, slack_users, emails, resolved):
+        """
+        :param emails: Jira 디렉터리의 이메일 -> accountId
+        :param resolved: 디렉터리에서 찾지 못해 이메일로 검색한 결과
+        """
+        users = {}
+        accounts = {}
+        for user in slack_users:
+            email = (user['profile']['email'] or '').lower()
+            users[user['id']] = user
+            if email and email not in emails and email not in resolved:
+                # 검색하지 않은 유저(봇, 비활성 유저)는 인덱스에서 빼고 기존처럼 조회합니다.
+                if user['id'] in self.overrides:
+                    accounts[user['id']] = self.overrides[user['id']]
+                continue
+            accounts[user['id']] = emails.get(email) or resolved.get(email) or self.overrides.get(user['id'])
+        for slack_id, account_id in self.overrides.items():
+            accounts.setdefault(slack_id, account_id)
+        self._users, self._accounts = users, accounts
+        self.synced_at = time.time()
+        print(f'User directory synced: {len(users)} slack users, {sum(1 for a in accounts.values() if a)} jira accounts')
+
+    @staticmethod
+    def _unmatched_emails(slack_users, emails):
+        return {
+            user['profile']['email'].lower()
+            for user in slack_users
+            if user['profile']['email'] and not user['is_bot'] and not user['deleted']
+            and user['profile']['email'].lower() not in emails
+        }
+
+    def _emails_to_search(self, slack_users, accounts, emails):
+        """
+        이메일로 검색할 이메일과, 검색하지 않고 Jira 계정이 없다고 볼 결과를 반환합니다.
+        """
+        unmatched = self._unmatched_emails(slack_users, emails)
+        if not has_hidden_emails(accounts):
+            return [], dict.fromkeys(unmatched)
+        now = time.time()
+        pending = [email for email in unmatched if self._not_found.get(email, 0) <= now]
+        return pending, dict.fromkeys(unmatched.difference(pending))
+
+    def _remember(self, resolved):
+        expires_at = time.time() + USER_DIRECTORY_NEGATIVE_TTL
+        for email, account_id in resolved.items():
+            if account_id:
+                self._not_found.pop(email, None)
+            else:
+                self._not_found[email] = expires_at
+
+    def refresh(self, slack_client, jira):
+        slack_users = []
+        cursor = None
+        while True:
+            response = slack_client.users_list(limit=SLACK_USERS_PAGE_SIZE, cursor=cursor)
+            slack_users.extend(normalize_user(user) for user in response['members'])
+            cursor = (response.get('response_metadata') or {}).get('next_cursor')
+            if not cursor:
+                break
+        accounts = list(jira.iter_users(page_size=JIRA_USERS_PAGE_SIZE))
+        emails = jira_email_index(accounts)
+        pending, resolved = self._emails_to_search(slack_users, accounts, emails)
+        if pending:
+            with ThreadPoolExecutor(max_workers=USER_DIRECTORY_LOOKUP_CONCURRENCY, thread_name_prefix='user_directory_lookup') as executor:
+                found = dict(zip(pending, executor.map(jira.get_user_id_from_email, pending)))
+            self._remember(found)
+            resolved.update(found)
+        self._build(slack_users, emails, resolved)
+
+    async def arefresh(self, slack_client, jira):
+        """
+        refresh 의 비동기 버전입니다.
+        """
+        slack_users = []
+        cursor = None
+        while True:
+            response = await slack_client.users_list(limit=SLACK_USERS_PAGE_SIZE, cursor=cursor)
+            slack_users.extend(normalize_user(user) for user in response['members'])
+            cursor = (response.get('response_metadata') or {}).get('next_cursor')
+            if not cursor:
+                break
+        accounts = [account async for account in jira.aiter_users(page_size=JIRA_USERS_PAGE_SIZE)]
+        emails = jira_email_index(accounts)
+        pending, resolved = self._emails_to_search(slack_users, accounts, emails)
+        if pending:
+            semaphore = asyncio.Semaphore(USER_DIRECTORY_LOOKUP_CONCURRENCY)
+
+            async def lookup(email):
+                async with semaphore:
+                    return await jira.get_user_id_from_email(email)
+
+            found = dict(zip(pending, await asyncio.gather(*map(lookup, pending))))
+            self._remember(found)
+            resolved.update(found)
+        self._build(slack_users, emails, resolved)
+
+    def start(self, slack_client, jira, interval=USER_DIRECTORY_REFRESH_INTERVAL):
+        """
+        백그라운드 스레드에서 바로 동기화하고 interval 마다 다시 동기화합니다.
+        동기화에 실패하면 이전 인덱스를 그대로 사용합니다.
+        """
+        def run():
+            while True:
+                try:
+                    self.refresh(slack_client, jira)
+                except Exception as e:
+                    print(f'User directory sync failed: {e!r}')
+                if self._stop.wait(interval):
+                    return
+
+        thread = threading.Thread(target=run, name='user_directory', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    async def arun(self, slack_client, jira, interval=USER_DIRECTORY_REFRESH_INTERVAL):
+        """
+        start 의 비동기 버전입니다. 태스크로 실행하고 취소하여 멈춥니다.
+        """
+        while True:
+            try:
+                await self.arefresh(slack_client, jira)
+            except Exception as e:
+                print(f'User directory sync failed: {e!r}')
+            await asyncio.sleep(interval)
+
+
+user_directory = UserDirectory()
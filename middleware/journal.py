@@ -0,0 +1,161 @@
+"""
+처리 중인 laas_jira 작업을 SQLite 에 기록합니다.
+작업은 단계를 마칠 때마다 결과를 저장(checkpoint)하고, 종료 시간 안에 끝나지 않은 작업은 다음에 시작할 때 마지막으로 마친 단계부터 이어서 처리합니다.
+컨테이너는 재시작하면 새 파일 시스템으로 시작하므로 JOB_JOURNAL_PATH 는 영구 볼륨에 있어야 이어서 처리할 수 있습니다.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+JOB_JOURNAL_PATH = os.getenv('JOB_JOURNAL_PATH', '.cache/jira_bolt.sqlite3')
+# 시작할 때 이어서 처리하는 최대 횟수입니다. 넘으면 실패로 기록하여 같은 작업이 재시작마다 반복되지 않도록 합니다.
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+# 끝난 작업을 보관하는 시간(초)입니다.
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', 7 * 24 * 60 * 60))
+# ECS 는 SIGTERM 후 30초가 지나면 SIGKILL 을 보내므로 그 전에 종료합니다.
+JOB_SHUTDOWN_TIMEOUT = float(os.getenv('JOB_SHUTDOWN_TIMEOUT', 25))
+
+RECEIVED = 'received'
+THREAD_FETCHED = 'thread_fetched'
+LLM_OUTPUT = 'llm_output'
+ISSUE_CREATED = 'issue_created'
+REPLIED = 'replied'
+ATTACHMENTS_UPLOADED = 'attachments_uploaded'
+STAGES = (RECEIVED, THREAD_FETCHED, LLM_OUTPUT, ISSUE_CREATED, REPLIED, ATTACHMENTS_UPLOADED)
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def mount_point(path):
+    path = os.path.abspath(path)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def job_id(event):
+    return f"{event['item']['channel']}:{event['item']['ts']}:{event['reaction']}"
+
+
+class Job:
+    def __init__(self, id, collection, event, stage=RECEIVED, data=None, attempts=0):
+        self.id = id
+        self.collection = collection
+        self.event = event
+        self.stage = stage
+        self.data = data or {}
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f'Job({self.id!r}, stage={self.stage!r}, attempts={self.attempts})'
+
+    def reached(self, stage):
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+
+class JobJournal:
+    """
+    SQLiteCache 와 같은 파일을 사용할 수 있도록 별도의 테이블에 기록합니다.
+    """
+    def __init__(self, path=JOB_JOURNAL_PATH, table='job'):
+        self.path = path
+        self.table = table
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if not os.path.exists(self.path) and mount_point(self.path) == '/':
+                # 새 파일이 마운트한 볼륨이 아닌 루트 파일 시스템에 있으면 컨테이너가 재시작할 때 함께 사라집니다.
+                print(
+                    f'Warning: job journal {os.path.abspath(self.path)} is not on a mounted volume. '
+                    'Unfinished jobs will not resume after the container restarts; set JOB_JOURNAL_PATH to a persistent volume.'
+                )
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                'id TEXT PRIMARY KEY, collection TEXT, event TEXT, stage TEXT, data TEXT,'
+                ' status TEXT, attempts INTEGER, updated_at REAL)'
+            )
+        return self._conn
+
+    def add(self, event, collection):
+        """
+        새 작업을 기록합니다. 같은 메시지의 작업이 끝난 뒤 다시 요청되면 처음부터 다시 기록합니다.
+        """
+        job = Job(job_id(event), collection, event)
+        with self._lock:
+            self.conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job.id, collection, json.dumps(event), job.stage, '{}', PENDING, 0, time.time()),
+            )
+        return job
+
+    def checkpoint(self, job, stage, **data):
+        """
+        단계를 마친 결과를 저장합니다. data 는 이전 단계의 결과에 합칩니다.
+        """
+        job.stage = stage
+        job.data.update(data)
+        with self._lock:
+            self.conn.execute(
+                f'UPDATE {self.table} SET stage = ?, data = ?, updated_at = ? WHERE id = ?',
+                (stage, json.dumps(job.data, ensure_ascii=False), time.time(), job.id),
+            )
+
+    def finish(self, job, failed=False):
+        with self._lock:
+            self.conn.execute(
+                f'UPDATE {self.table} SET status = ?, updated_at = ? WHERE id = ?',
+                (FAILED if failed else DONE, time.time(), job.id),
+            )
+
+    def discard(self, job):
+        with self._lock:
+            self.conn.execute(f'DELETE FROM {self.table} WHERE id = ?', (job.id,))
+
+    def resume(self, max_attempts=JOB_MAX_ATTEMPTS):
+        """
+        끝나지 않은 작업을 반환하고 시도 횟수를 늘립니다. 시도 횟수를 넘은 작업은 실패로 기록합니다.
+        """
+        with self._lock:
+            self.conn.execute(
+                f'UPDATE {self.table} SET status = ? WHERE status = ? AND attempts >= ?',
+                (FAILED, PENDING, max_attempts),
+            )
+            self.conn.execute(f'UPDATE {self.table} SET attempts = attempts + 1 WHERE status = ?', (PENDING,))
+            rows = self.conn.execute(
+                f'SELECT id, collection, event, stage, data, attempts FROM {self.table}'
+                ' WHERE status = ? ORDER BY updated_at',
+                (PENDING,),
+            ).fetchall()
+        return [
+            Job(id, collection, json.loads(event), stage, json.loads(data), attempts)
+            for id, collection, event, stage, data, attempts in rows
+        ]
+
+    def purge(self, retention=JOB_RETENTION):
+        """
+        보관 시간이 지난 끝난 작업을 삭제합니다.
+        """
+        with self._lock:
+            self.conn.execute(
+                f'DELETE FROM {self.table} WHERE status != ? AND updated_at < ?',
+                (PENDING, time.time() - retention),
+            )
+
+    def stats(self):
+        with self._lock:
+            return dict(self.conn.execute(f'SELECT status, COUNT(*) FROM {self.table} GROUP BY status').fetchall())
+
+
+job_journal = JobJournal()
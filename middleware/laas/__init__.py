@@ -1,30 +1,126 @@
 import os
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
 
+from middleware.metrics import payload_bytes
+from middleware.streaming import JSONBody
 
-def call_wanted_api(method, path, **kwargs):
+
+LAAS_BASE_URL = os.getenv('LAAS_BASE_URL', 'https://api-laas.wanted.co.kr')
+LAAS_CONNECT_TIMEOUT = float(os.getenv('LAAS_CONNECT_TIMEOUT', 5))
+LAAS_READ_TIMEOUT = float(os.getenv('LAAS_READ_TIMEOUT', 120))
+LAAS_MAX_RETRIES = int(os.getenv('LAAS_MAX_RETRIES', 3))
+LAAS_BACKOFF_BASE = float(os.getenv('LAAS_BACKOFF_BASE', 1))
+LAAS_BACKOFF_MAX = float(os.getenv('LAAS_BACKOFF_MAX', 30))
+# LaaS 프로젝트 할당량을 넘지 않도록 동시에 보내는 요청 수를 제한합니다.
+LAAS_CONCURRENCY = int(os.getenv('LAAS_CONCURRENCY', 8))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def get_retry_delay(attempt, retry_after=None):
     """
-    Wanted LaaS API를 호출합니다.
-    https://laas.wanted.co.kr/docs/guide/api/api-preset
+    재시도 전에 기다릴 시간(초)을 계산합니다.
+    Retry-After 헤더가 있으면 따르고, 없으면 지터를 적용한 지수 백오프를 사용합니다.
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), LAAS_BACKOFF_MAX)
+        except ValueError:
+            pass
+        try:
+            delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            return min(max(delay, 0), LAAS_BACKOFF_MAX)
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(LAAS_BACKOFF_MAX, LAAS_BACKOFF_BASE * 2 ** attempt))
+
+
+class LaaSClient:
+    """
+    연결 풀을 재사용하는 Wanted LaaS API 클라이언트입니다.
+    429, 5xx 응답과 연결 실패는 백오프 후 재시도합니다.
     """
-    return requests.request(
-        method=method,
-        url=f"https://api-laas.wanted.co.kr{path}",
-        headers={
+    def __init__(
+        self,
+        base_url=LAAS_BASE_URL,
+        timeout=(LAAS_CONNECT_TIMEOUT, LAAS_READ_TIMEOUT),
+        max_retries=LAAS_MAX_RETRIES,
+        max_concurrency=LAAS_CONCURRENCY,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def request(self, method, path, **kwargs):
+        """
+        Wanted LaaS API를 호출합니다.
+        https://laas.wanted.co.kr/docs/guide/api/api-preset
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        headers = {
             "project": os.environ['LAAS_PROJECT'],
             "apiKey": os.environ['LAAS_API_KEY'],
             "Content-Type": "application/json; charset=utf-8",
-        },
-        **kwargs,
-    )
+            **kwargs.pop('headers', {}),
+        }
+        for attempt in range(self.max_retries + 1):
+            with self._semaphore:
+                try:
+                    response = self.session.request(method=method, url=f"{self.base_url}{path}", headers=headers, **kwargs)
+                except (requests.ConnectionError, requests.ConnectTimeout):
+                    # 응답을 받지 못한 요청만 재시도합니다. 읽기 타임아웃은 LLM 이 처리 중일 수 있으므로 재시도하지 않습니다.
+                    if attempt == self.max_retries:
+                        raise
+                    retry_after = None
+                else:
+                    body = response.request.body
+                    payload_bytes.observe(len(body) if body is not None else 0, kind='laas_request')
+                    payload_bytes.observe(len(response.content), kind='laas_response')
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                        return response
+                    retry_after = response.headers.get('Retry-After')
+            # 기다리는 동안에는 다른 요청이 동시 요청 슬롯을 사용할 수 있도록 세마포어 밖에서 기다립니다.
+            time.sleep(get_retry_delay(attempt, retry_after))
+
+    def jira_summary_generator(self, hash, params: dict, messages: list, images=None):
+        """
+        Wanted LaaS API 중 Jira 생성기를 호출합니다.
+        images 를 지정하면 메시지의 attachment:<key> 이미지를 data URL 로 바꿔 조각 단위로 보냅니다.
+        """
+        payload = {
+            "hash": hash,
+            "params": params,
+            "messages": messages,
+        }
+        if not images:
+            return self.request('POST', '/api/preset/v2/chat/completions', json=payload)
+        return self.request('POST', '/api/preset/v2/chat/completions', data=JSONBody(payload, images))
+
+
+laas_client = LaaSClient()
+
+
+def call_wanted_api(method, path, **kwargs):
+    """
+    Wanted LaaS API를 호출합니다.
+    https://laas.wanted.co.kr/docs/guide/api/api-preset
+    """
+    return laas_client.request(method, path, **kwargs)
 
 
-def jira_summary_generator(hash, params: dict, messages: list):
+def jira_summary_generator(hash, params: dict, messages: list, images=None):
     """
     Wanted LaaS API 중 Jira 생성기를 호출합니다.
     """
-    return call_wanted_api('POST', '/api/preset/v2/chat/completions', json={
-        "hash": hash,
-        "params": params,
-        "messages": messages,
-    })
+    return laas_client.jira_summary_generator(hash, params, messages, images)
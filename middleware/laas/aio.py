@@ -0,0 +1,180 @@
+"""
+비동기 실행 방식(async_app.py)에서 사용하는 LaaS, Jira 클라이언트입니다.
+요청 대부분이 LLM 응답을 기다리므로 하나의 이벤트 루프에서 여러 요청을 동시에 처리합니다.
+"""
+import os
+import json
+import asyncio
+
+import aiohttp
+
+from middleware.laas import (
+    LAAS_BASE_URL, LAAS_CONNECT_TIMEOUT, LAAS_READ_TIMEOUT, LAAS_MAX_RETRIES, LAAS_CONCURRENCY,
+    RETRY_STATUS_CODES, get_retry_delay,
+)
+from middleware.metrics import payload_bytes
+from middleware.streaming import JSONBody, MultipartBody
+from middleware.laas.jira_operator import (
+    JIRA_BASE_URL, jira_user_cache, JIRA_USER_CACHE_TTL, JIRA_USER_CACHE_NEGATIVE_TTL, _NOT_CACHED,
+    JIRA_ATTACHMENT_BATCH_SIZE, JIRA_ATTACHMENT_CONCURRENCY,
+)
+
+
+class AsyncLaaSClient:
+    def __init__(self, base_url=LAAS_BASE_URL, max_retries=LAAS_MAX_RETRIES, max_concurrency=LAAS_CONCURRENCY):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    @property
+    def session(self):
+        # ClientSession 은 이벤트 루프 안에서 생성해야 하므로 처음 사용할 때 생성합니다.
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                headers={
+                    "project": os.environ['LAAS_PROJECT'],
+                    "apiKey": os.environ['LAAS_API_KEY'],
+                    "Content-Type": "application/json; charset=utf-8",
+                },
+                timeout=aiohttp.ClientTimeout(connect=LAAS_CONNECT_TIMEOUT, sock_read=LAAS_READ_TIMEOUT),
+            )
+        return self._session
+
+    async def call_wanted_api(self, method, path, **kwargs):
+        """
+        Wanted LaaS API를 호출하고 JSON 응답을 반환합니다.
+        429, 5xx 응답과 연결 실패는 백오프 후 재시도하고, 읽기 타임아웃은 재시도하지 않습니다.
+        https://laas.wanted.co.kr/docs/guide/api/api-preset
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                try:
+                    async with self.session.request(method, path, **kwargs) as response:
+                        if response.status not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                            body = await response.read()
+                            payload_bytes.observe(len(body), kind='laas_response')
+                            return json.loads(body)
+                        retry_after = response.headers.get('Retry-After')
+                except aiohttp.ClientConnectionError as e:
+                    # 응답을 받지 못한 요청만 재시도합니다. 읽기 타임아웃은 LLM 이 처리 중일 수 있으므로 재시도하지 않습니다.
+                    read_timeout = isinstance(e, aiohttp.ServerTimeoutError) and not isinstance(e, aiohttp.ConnectionTimeoutError)
+                    if read_timeout or attempt == self.max_retries:
+                        raise
+                    retry_after = None
+            await asyncio.sleep(get_retry_delay(attempt, retry_after))
+
+    async def jira_summary_generator(self, hash, params: dict, messages: list, images=None):
+        """
+        Wanted LaaS API 중 Jira 생성기를 호출합니다.
+        images 를 지정하면 메시지의 attachment:<key> 이미지를 data URL 로 바꿔 조각 단위로 보냅니다.
+        """
+        # 요청 크기를 기록할 수 있도록 직접 직렬화합니다.
+        data = JSONBody({
+            "hash": hash,
+            "params": params,
+            "messages": messages,
+        }, images or {})
+        payload_bytes.observe(len(data), kind='laas_request')
+        return await self.call_wanted_api(
+            'POST', '/api/preset/v2/chat/completions',
+            data=data, headers={'Content-Length': str(len(data))},
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class AsyncJiraOperator:
+    """
+    JiraOperator 의 비동기 버전입니다.
+    atlassian-python-api 는 동기 클라이언트만 제공하므로 Jira REST API 를 직접 호출합니다.
+    """
+    def __init__(self, base_url=JIRA_BASE_URL):
+        self.base_url = base_url
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                auth=aiohttp.BasicAuth(os.environ['ATLASSIAN_USER'], os.environ['ATLASSIAN_API_KEY']),
+                headers={'Accept': 'application/json'},
+                raise_for_status=True,
+            )
+        return self._session
+
+    async def update_attachments(self, issue_key, attachments):
+        """
+        Jira 이슈에 첨부파일을 업데이트합니다.
+        JIRA_ATTACHMENT_BATCH_SIZE 개씩 묶어 JIRA_ATTACHMENT_CONCURRENCY 개의 요청을 동시에 보냅니다.
+        """
+        semaphore = asyncio.Semaphore(JIRA_ATTACHMENT_CONCURRENCY)
+
+        async def upload(batch):
+            payload_bytes.observe(sum(map(len, batch)), kind='jira_attachment')
+            # 첨부파일을 메모리에 모두 올리지 않도록 multipart 본문을 조각 단위로 보냅니다.
+            body = MultipartBody(batch)
+            async with semaphore, self.session.post(
+                f'/rest/api/2/issue/{issue_key}/attachments',
+                data=body,
+                headers={
+                    'X-Atlassian-Token': 'no-check',
+                    'Content-Type': body.content_type,
+                    'Content-Length': str(len(body)),
+                },
+            ):
+                pass
+
+        await asyncio.gather(*(
+            upload(attachments[i:i + JIRA_ATTACHMENT_BATCH_SIZE])
+            for i in range(0, len(attachments), JIRA_ATTACHMENT_BATCH_SIZE)
+        ))
+
+    async def aiter_users(self, page_size=1000):
+        """
+        JiraOperator.iter_users 의 비동기 버전입니다.
+        """
+        start_at = 0
+        while True:
+            async with self.session.get('/rest/api/2/users/search', params={'startAt': start_at, 'maxResults': page_size}) as response:
+                page = await response.json()
+            for account in page:
+                yield account
+            if len(page) < page_size:
+                return
+            start_at += len(page)
+
+    async def get_user_id_from_email(self, email):
+        """
+        Slack 유저 정보를 바탕으로 Jira 유저 ID를 가져옵니다.
+        """
+        if not email:
+            return None
+        account_id = jira_user_cache.get(email, _NOT_CACHED)
+        if account_id is not _NOT_CACHED:
+            return account_id
+
+        async with self.session.get('/rest/api/2/user/search', params={'query': email}) as response:
+            resp = await response.json()
+        account_id = resp[0]['accountId'] if resp else None
+        jira_user_cache.set(email, account_id, JIRA_USER_CACHE_TTL if account_id else JIRA_USER_CACHE_NEGATIVE_TTL)
+        return account_id
+
+    async def safe_create_issues(self, refined_fields, file_data=None):
+        """
+        Jira 이슈를 생성합니다.
+        이 단계는 Jira API를 사용하여 이슈를 생성하는 단계입니다.
+        """
+        async with self.session.post('/rest/api/2/issue', json={'fields': refined_fields}) as response:
+            response = await response.json()
+        if file_data:
+            await self.update_attachments(issue_key=response['key'], attachments=file_data)
+        return response
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
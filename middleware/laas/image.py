@@ -0,0 +1,116 @@
+"""
+LaaS 요청에 포함할 이미지를 준비합니다.
+LLM 에는 충분한 크기의 Slack 썸네일이나 축소한 이미지를 보내고, Jira 에는 원본을 첨부합니다.
+"""
+import os
+from io import BytesIO
+
+from middleware.attachment import Attachment
+from middleware.streaming import attachment_url
+from middleware.laas.mimetype import is_supported_mime_type
+
+
+LLM_IMAGE_MAX_DIMENSION = int(os.getenv('LLM_IMAGE_MAX_DIMENSION', 1024))
+LLM_IMAGE_MAX_BYTES = int(os.getenv('LLM_IMAGE_MAX_BYTES', 1024 * 1024))
+
+# Slack 이 제공하는 썸네일 크기입니다. https://api.slack.com/types/file
+SLACK_THUMB_SIZES = (64, 80, 160, 360, 480, 720, 800, 960, 1024)
+
+
+def select_thumbnail_url(file, max_dimension=LLM_IMAGE_MAX_DIMENSION):
+    """
+    LLM 에 보내기에 충분히 큰 썸네일 중 가장 작은 썸네일의 URL 을 반환합니다.
+    원본이 충분히 작거나 적당한 썸네일이 없으면 None 을 반환합니다.
+    """
+    if not (file.get('mimetype') or '').startswith('image/'):
+        return None
+    original = max(file.get('original_w') or 0, file.get('original_h') or 0)
+    if original and original <= max_dimension:
+        return None
+
+    for size in SLACK_THUMB_SIZES:
+        url = file.get(f'thumb_{size}')
+        if not url:
+            continue
+        longest = max(file.get(f'thumb_{size}_w') or size, file.get(f'thumb_{size}_h') or size)
+        if longest >= max_dimension:
+            return url
+    return None
+
+
+def downscale_image(content, mime_type, max_dimension=LLM_IMAGE_MAX_DIMENSION, max_bytes=LLM_IMAGE_MAX_BYTES):
+    """
+    이미지를 max_dimension 이하로 줄이고 max_bytes 이하가 되도록 다시 압축합니다.
+    Pillow 가 설치되어 있지 않거나 처리할 수 없는 이미지는 원본을 그대로 반환합니다.
+
+    :param content: bytes 또는 읽기 전용 파일 객체
+    :return: (content, mime_type)
+    """
+    if not (mime_type or '').startswith('image/') or mime_type == 'image/gif':
+        return content, mime_type
+    try:
+        from PIL import Image
+    except ImportError:
+        return content, mime_type
+
+    if isinstance(content, bytes):
+        size = len(content)
+        fp = BytesIO(content)
+    else:
+        size = content.seek(0, os.SEEK_END)
+        content.seek(0)
+        fp = content
+    try:
+        image = Image.open(fp)
+        image.load()
+    except Exception:
+        return content, mime_type
+    if max(image.size) <= max_dimension and size <= max_bytes:
+        return content, mime_type
+
+    image.thumbnail((max_dimension, max_dimension))
+    # 투명도가 있는 이미지는 PNG, 나머지는 JPEG 으로 다시 압축합니다.
+    if image.mode in ('RGBA', 'LA', 'P'):
+        buffer = BytesIO()
+        image.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue(), 'image/png'
+
+    image = image.convert('RGB')
+    for quality in (85, 70, 55, 40):
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=quality, optimize=True)
+        if buffer.tell() <= max_bytes:
+            break
+    return buffer.getvalue(), 'image/jpeg'
+
+
+def preview_attachment(attachment, budget=None):
+    """
+    LLM 에 보낼 이미지를 Attachment 로 반환합니다. 줄일 필요가 없으면 원본을 그대로 사용합니다.
+    budget 을 지정하면 줄인 이미지도 작업의 메모리 한도 안에서 저장합니다.
+    """
+    with attachment.open() as f:
+        content, mime_type = downscale_image(f, attachment.mime_type)
+    if content is f:
+        return attachment
+    preview = Attachment(attachment.file_id, attachment.name, mime_type)
+    if budget:
+        return budget.store(preview, content)
+    preview.write(content)
+    return preview
+
+
+def to_image_ref_content(key, preview):
+    """
+    첨부파일을 LaaS 요청 메시지에 포함할 수 있는 이미지 형식으로 변환합니다. 이미지는 attachment:<key> 로 가리키고,
+    LaaS 에 요청을 보낼 때 data URL 로 바꿔 조각 단위로 인코딩합니다. 지원되지 않는 형식이면 None 을 반환합니다.
+    """
+    if not is_supported_mime_type(preview.mime_type) or not len(preview):
+        return None
+    # Non-animated GIF인지 확인 (GIF에만 적용). NETSCAPE2.0 확장은 파일 앞부분에 있습니다.
+    if preview.mime_type == "image/gif" and b"NETSCAPE2.0" in preview.read_at(0, 4096):
+        return None
+    return {
+        "type": "image_url",
+        "image_url": {"url": attachment_url(key)},
+    }
@@ -28,6 +28,32 @@ def get_format_instructions(cls: BaseModel) -> str:
     return json.dumps(reduced_schema, ensure_ascii=False)
 
 
+# Jira 화면 구성에 맞는 커스텀 필드 ID 입니다. 프로젝트마다 다르면 Collection 의 field_map 으로 지정합니다.
+# FIXME:
+DEFAULT_FIELD_MAP = {
+    'environment': 'customfield_10106',
+    'bug_property': 'customfield_10177',
+}
+
+# 이슈 생성 메시지에서 매번 같은 블록입니다.
+CREATED_HEADER_BLOCKS = (
+    {
+        "type": "header",
+        "text": {
+            "type": "plain_text",
+            "text": f'Jira 이슈가 생성되었습니다!'
+        }
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": f'이모지를 스레드 최상단에 달면 스레드 전체를 요약하고, 이모지를 내부에 달면 해당 메시지만 요약합니다. 생성된 내용을 확인해 주세요.'
+        }
+    },
+)
+
+
 class Issue(BaseModel):
     """
     Wanted에서 발생한 이슈를 생성하기 위한 필드입니다.
@@ -63,48 +89,31 @@ class Issue(BaseModel):
     description: Optional[str] = Field(description='이슈의 상세 내용입니다. 버그가 발생한 상황, 버그의 영향도, 버그의 재현 방법 등을 기술해주세요.')
     due_date: Optional[date] = Field(description='이슈의 기한입니다. 이슈의 우선순위에 따라 기한을 설정해주세요.')
 
-    def refined_fields(self, reporter_id, assignee_id, slack_link):
+    def refined_fields(self, reporter_id, assignee_id, slack_link, project='PI', field_map=DEFAULT_FIELD_MAP):
+        """
+        :param field_map: 이슈 필드 이름 -> Jira 커스텀 필드 ID
+        """
         self.description += f'\n\n*Slack Link*: {slack_link}\n_이 이슈는 Wanted Jira Bolt로부터 자동 생성되었습니다._'
+        fields = {
+            'project': {'key': project},
+            'assignee': {'accountId': assignee_id},
+            'reporter': {'accountId': reporter_id},
+            'issuetype': {'name': self.issue_type},
+            'description': self.description,
+            'summary': self.summary,
+            'duedate': str(self.due_date) if self.due_date else None,
+        }
         if self.issue_type == '버그':
-            return {
-                'project': {'key': 'PI'},
-                'assignee': {'accountId': assignee_id},
-                'reporter': {'accountId': reporter_id},
-                'issuetype': {'name': self.issue_type},
-                'description': self.description,
-                'summary': self.summary,
-                'duedate': str(self.due_date) if self.due_date else None,
+            fields.update({
                 'priority': {'name': self.priority} if self.priority else None,
-                'customfield_10106': {'value': self.environment} if self.environment else None,
-                'customfield_10177': [{'value': prop} for prop in self.bug_property] if self.bug_property else None,
-            }
-        else:
-            return {
-                'project': {'key': 'PI'},
-                'assignee': {'accountId': assignee_id},
-                'reporter': {'accountId': reporter_id},
-                'issuetype': {'name': self.issue_type},
-                'description': self.description,
-                'summary': self.summary,
-                'duedate': str(self.due_date) if self.due_date else None,
-            }
+                field_map['environment']: {'value': self.environment} if self.environment else None,
+                field_map['bug_property']: [{'value': prop} for prop in self.bug_property] if self.bug_property else None,
+            })
+        return fields
 
     def refined_blocks(self, jira_response, item_user, reaction_user, workspace):
         blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": f'Jira 이슈가 생성되었습니다!'
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f'이모지를 스레드 최상단에 달면 스레드 전체를 요약하고, 이모지를 내부에 달면 해당 메시지만 요약합니다. 생성된 내용을 확인해 주세요.'
-                }
-            },
+            *CREATED_HEADER_BLOCKS,
             {
                 "type": "section",
                 "text": {
@@ -194,3 +203,10 @@ class Issue(BaseModel):
                 },
             ]
         return blocks
+
+
+class ThreadSummary(BaseModel):
+    """
+    긴 스레드를 나눠서 요약할 때 사용하는 응답 형식입니다.
+    """
+    summary: str = Field(description='스레드에서 이슈를 만드는 데 필요한 내용(문제 상황, 재현 방법, 영향 범위, 결정 사항, 담당자, 기한 등)을 빠짐없이 요약한 내용입니다.')
@@ -1,31 +1,133 @@
 import os
-from io import BytesIO
+import time
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from middleware.coordination import shared_cache
+from middleware.metrics import payload_bytes
+from middleware.streaming import MultipartBody
+
+
+JIRA_BASE_URL = os.getenv('ATLASSIAN_URL', 'https://wantedlab.atlassian.net')
+# 워커마다 연결 하나를 사용할 수 있도록 워커 수에 맞춰 연결 풀 크기를 정합니다.
+JIRA_POOL_SIZE = int(os.getenv('JIRA_POOL_SIZE', os.getenv('LAAS_JIRA_WORKERS', 4)))
+JIRA_CONNECT_TIMEOUT = float(os.getenv('JIRA_CONNECT_TIMEOUT', 5))
+JIRA_READ_TIMEOUT = float(os.getenv('JIRA_READ_TIMEOUT', 30))
+# 이 시간(초)보다 오래 사용하지 않은 연결 풀은 사용하기 전에 상태를 확인합니다.
+JIRA_POOL_MAX_IDLE = float(os.getenv('JIRA_POOL_MAX_IDLE', 300))
+# 첨부파일은 여러 개씩 묶어 multipart 요청 하나로 보내고, 묶음은 동시에 업로드합니다.
+JIRA_ATTACHMENT_BATCH_SIZE = int(os.getenv('JIRA_ATTACHMENT_BATCH_SIZE', 5))
+JIRA_ATTACHMENT_CONCURRENCY = int(os.getenv('JIRA_ATTACHMENT_CONCURRENCY', 2))
+# Jira bulk create API 가 한 번에 받는 최대 이슈 수입니다.
+JIRA_BULK_CREATE_MAX = 50
+
+JIRA_USER_CACHE_TTL = float(os.getenv('JIRA_USER_CACHE_TTL', 7 * 24 * 60 * 60))
+# 지라에 없는 유저(봇, 외부 유저)는 짧게 캐시합니다.
+JIRA_USER_CACHE_NEGATIVE_TTL = float(os.getenv('JIRA_USER_CACHE_NEGATIVE_TTL', 60 * 60))
+
+# 이메일 -> Jira 유저 ID 매핑은 거의 변하지 않으므로 재시작 후에도 유지하고, 여러 레플리카로 실행하면 함께 사용합니다.
+jira_user_cache = shared_cache('jira_user', os.getenv('JIRA_USER_CACHE_PATH', '.cache/jira_bolt.sqlite3'))
+
+_NOT_CACHED = object()
 
 
 class JiraOperator:
-    def __init__(self):
+    """
+    Jira 클라이언트입니다. 연결 풀을 재사용하도록 시작할 때 한 번 생성하여 모든 작업이 공유합니다.
+    get_jira_operator() 로 공유 인스턴스를 가져옵니다.
+    """
+    def __init__(self, base_url=JIRA_BASE_URL, pool_size=JIRA_POOL_SIZE):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        # 연결 풀을 교체할 때마다 늘어납니다. 여러 워커가 같은 실패를 보고 여러 번 다시 연결하지 않도록 합니다.
+        self._generation = 0
+        self.client = self._connect()
+
+    def _connect(self):
         from atlassian import Jira
-        self.base_url = 'https://wantedlab.atlassian.net'
-        self.client = Jira(
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        client = Jira(
             self.base_url,
             username=os.environ['ATLASSIAN_USER'],
             password=os.environ['ATLASSIAN_API_KEY'],
             cloud=True,
+            session=session,
         )
+        # atlassian-python-api 는 timeout 을 정수 하나로만 받으므로 연결/읽기 타임아웃을 직접 지정합니다.
+        client.timeout = (JIRA_CONNECT_TIMEOUT, JIRA_READ_TIMEOUT)
+        return client
+
+    def reconnect(self, generation=None):
+        """
+        새 연결 풀로 클라이언트를 교체합니다.
+        generation 을 지정하면 그 사이 다른 워커가 이미 교체했을 때는 다시 연결하지 않습니다.
+        이전 클라이언트로 요청 중인 워커가 있을 수 있으므로 닫지 않고, 참조가 없어지면 가비지 컬렉션으로 정리합니다.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self.client = self._connect()
+            self._generation += 1
+
+    def is_healthy(self):
+        try:
+            self.client.myself()
+            return True
+        except requests.RequestException:
+            return False
+
+    def ensure_connection(self):
+        """
+        오래 사용하지 않은 연결 풀은 상태를 확인하고, 응답이 없으면 다시 연결합니다.
+        """
+        generation = self._generation
+        if time.monotonic() - self._last_used > JIRA_POOL_MAX_IDLE and not self.is_healthy():
+            self.reconnect(generation)
+        self._last_used = time.monotonic()
 
     def update_attachments(self, issue_key, attachments):
         """
         Jira 이슈에 첨부파일을 업데이트합니다.
+        JIRA_ATTACHMENT_BATCH_SIZE 개씩 묶어 JIRA_ATTACHMENT_CONCURRENCY 개의 요청을 동시에 보냅니다.
         """
-        for attachment in attachments:
-            self.client.add_attachment_object(issue_key, BytesIO(attachment))
+        batches = [
+            attachments[i:i + JIRA_ATTACHMENT_BATCH_SIZE]
+            for i in range(0, len(attachments), JIRA_ATTACHMENT_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(
+            max_workers=min(JIRA_ATTACHMENT_CONCURRENCY, len(batches)) or 1,
+            thread_name_prefix='jira_attachment',
+        ) as executor:
+            # 실패한 묶음이 있으면 예외를 다시 발생시킵니다.
+            list(executor.map(partial(self._upload_attachment_batch, issue_key), batches))
 
-    def get_user_id_from_email(self, email):
+    def _upload_attachment_batch(self, issue_key, attachments):
+        payload_bytes.observe(sum(map(len, attachments)), kind='jira_attachment')
+        # atlassian-python-api 는 files 를 dict 로만 받아 같은 필드 이름으로 여러 파일을 보낼 수 없으므로 세션으로 직접 보냅니다.
+        # 첨부파일을 메모리에 모두 올리지 않도록 multipart 본문을 조각 단위로 보냅니다.
+        body = MultipartBody(attachments)
+        response = self.client.session.post(
+            f"{self.base_url}/{self.client.resource_url('issue')}/{issue_key}/attachments",
+            headers={**self.client.no_check_headers, 'Content-Type': body.content_type},
+            data=body,
+            timeout=self.client.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def search_user_id(self, email):
         """
-        Slack 유저 정보를 바탕으로 Jira 유저 ID를 가져옵니다.
+        이메일로 Jira 유저를 검색하여 Jira 유저 ID를 가져옵니다.
         """
-        if not email:
-            return None
         resp = self.client.get(
             self.client.resource_url('user/search'),
             params={'query': email},
@@ -35,12 +137,96 @@ class JiraOperator:
         except IndexError:
             return None
 
-    def safe_create_issues(self, refined_fields, file_data):
+    def iter_users(self, page_size=1000):
+        """
+        Jira 유저 디렉터리를 startAt 으로 페이지네이션하며 계정을 하나씩 반환합니다.
+        """
+        start_at = 0
+        while True:
+            page = self.client.get(
+                self.client.resource_url('users/search'),
+                params={'startAt': start_at, 'maxResults': page_size},
+            )
+            yield from page
+            if len(page) < page_size:
+                return
+            start_at += len(page)
+
+    def get_user_id_from_email(self, email):
+        """
+        Slack 유저 정보를 바탕으로 Jira 유저 ID를 가져옵니다.
+        찾지 못한 결과도 캐시하여 같은 유저를 반복해서 검색하지 않습니다.
+        """
+        if not email:
+            return None
+        account_id = jira_user_cache.get(email, _NOT_CACHED)
+        if account_id is not _NOT_CACHED:
+            return account_id
+
+        account_id = self.search_user_id(email)
+        jira_user_cache.set(email, account_id, JIRA_USER_CACHE_TTL if account_id else JIRA_USER_CACHE_NEGATIVE_TTL)
+        return account_id
+
+    def prewarm_user_cache(self):
+        """
+        만료된 캐시를 다시 검색하여 갱신합니다.
+        시작할 때 호출하면 이전에 조회했던 유저는 첫 요청부터 캐시에서 가져옵니다.
+        """
+        for email in jira_user_cache.keys(expired=True):
+            account_id = self.search_user_id(email)
+            jira_user_cache.set(email, account_id, JIRA_USER_CACHE_TTL if account_id else JIRA_USER_CACHE_NEGATIVE_TTL)
+
+    def safe_create_issues(self, refined_fields, file_data=None):
         """
         Jira 이슈를 생성합니다.
         이 단계는 Jira API를 사용하여 이슈를 생성하는 단계입니다.
+        file_data 를 지정하면 첨부파일 업로드까지 마친 뒤 반환합니다.
         """
         response = self.client.create_issue(fields=refined_fields)
         if file_data:
             self.update_attachments(issue_key=response['key'], attachments=file_data)
         return response
+
+    def bulk_create_issues(self, fields_list):
+        """
+        Jira bulk create API 로 이슈를 JIRA_BULK_CREATE_MAX 개까지 한 번에 생성합니다.
+        일부만 실패하면 201, 모두 실패하면 400 으로 응답하므로 두 경우 모두 요소별 결과를 반환합니다.
+        https://developer.atlassian.com/cloud/jira/platform/rest/v2/api-group-issues/#api-rest-api-2-issue-bulk-post
+
+        :return: fields_list 와 같은 순서의 (response, error) 목록. 생성한 이슈는 error 가 None 입니다.
+        """
+        if len(fields_list) > JIRA_BULK_CREATE_MAX:
+            raise ValueError(f'bulk create accepts at most {JIRA_BULK_CREATE_MAX} issues')
+        response = self.client.session.post(
+            f"{self.base_url}/{self.client.resource_url('issue')}/bulk",
+            json={'issueUpdates': [{'fields': fields} for fields in fields_list]},
+            timeout=self.client.timeout,
+        )
+        if response.status_code not in (200, 201, 400):
+            response.raise_for_status()
+        body = response.json()
+        if response.status_code == 400 and 'errors' not in body:
+            response.raise_for_status()
+
+        errors = {error['failedElementNumber']: error for error in body.get('errors', [])}
+        # 생성한 이슈는 실패한 요소를 뺀 순서대로 응답합니다.
+        created = iter(body.get('issues', []))
+        return [
+            (None, errors[index]) if index in errors else (next(created), None)
+            for index in range(len(fields_list))
+        ]
+
+
+_jira_operator = None
+_jira_operator_lock = threading.Lock()
+
+
+def get_jira_operator():
+    """
+    모든 작업이 공유하는 JiraOperator 를 반환합니다.
+    """
+    global _jira_operator
+    with _jira_operator_lock:
+        if _jira_operator is None:
+            _jira_operator = JiraOperator()
+        return _jira_operator
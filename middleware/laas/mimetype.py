@@ -1,3 +1,4 @@
+import os
 import mimetypes
 from urllib.parse import urlparse
 
@@ -22,3 +23,15 @@ def get_mime_type_from_url(url):
     path = urlparse(url).path
     mime_type, _ = mimetypes.guess_type(path)
     return mime_type or "application/octet-stream"  # 기본 MIME 타입
+
+
+def is_downloadable_mime_type(mime_type):
+    """
+    ATTACHMENT_MIME_TYPES 환경변수에 지정된 형식만 다운로드합니다.
+    "image/png" 처럼 전체 형식이나 "image/" 처럼 접두사로 지정하며, 지정하지 않으면 모든 형식을 다운로드합니다.
+    """
+    allowed = os.getenv('ATTACHMENT_MIME_TYPES')
+    if not allowed:
+        return True
+    mime_type = (mime_type or '').split(';')[0].strip()
+    return any(mime_type.startswith(prefix.strip()) for prefix in allowed.split(',') if prefix.strip())
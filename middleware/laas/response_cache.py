@@ -0,0 +1,89 @@
+"""
+같은 스레드로 다시 요청하면 LaaS 를 호출하지 않고 이전 응답을 사용합니다.
+프리셋, 파라미터, 메시지(이미지는 digest)의 해시를 키로 사용하므로 스레드가 바뀌면 다시 호출합니다.
+attachment:<key> 로 가리키는 이미지는 key 가 이미 원본의 digest 이므로 그대로 사용합니다.
+"""
+import os
+import json
+import hashlib
+
+from middleware.cache import TTLCache
+from middleware.coordination import shared_cache
+from middleware.streaming import ATTACHMENT_URL_PREFIX
+
+
+LAAS_RESPONSE_CACHE_TTL = float(os.getenv('LAAS_RESPONSE_CACHE_TTL', 24 * 60 * 60))
+LAAS_RESPONSE_CACHE_SIZE = int(os.getenv('LAAS_RESPONSE_CACHE_SIZE', 256))
+LAAS_RESPONSE_CACHE_PATH = os.getenv('LAAS_RESPONSE_CACHE_PATH', '.cache/jira_bolt.sqlite3')
+
+_NOT_CACHED = object()
+
+
+def _digest(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def normalize_messages(messages):
+    """
+    data URL 로 포함된 이미지를 digest 로 바꿔 키를 작게 유지합니다.
+    """
+    def normalize_url(url):
+        return url if url.startswith(ATTACHMENT_URL_PREFIX) else f'sha256:{_digest(url)}'
+
+    normalized = []
+    for message in messages:
+        content = message['content']
+        if not isinstance(content, str):
+            content = [
+                {'type': 'image_url', 'image_url': {'url': normalize_url(part['image_url']['url'])}}
+                if part['type'] == 'image_url' else part
+                for part in content
+            ]
+        normalized.append({**message, 'content': content})
+    return normalized
+
+
+def response_cache_key(hash, params, messages):
+    return _digest(json.dumps(
+        [hash, params, normalize_messages(messages)],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    ))
+
+
+class ResponseCache:
+    """
+    메모리와 로컬 디스크(SQLite)를 함께 사용하는 LaaS 응답 캐시입니다.
+    COORDINATION_STORE 를 지정하면 디스크 대신 레플리카가 공유하는 캐시를 사용합니다.
+    """
+    def __init__(self, ttl=LAAS_RESPONSE_CACHE_TTL, maxsize=LAAS_RESPONSE_CACHE_SIZE, path=LAAS_RESPONSE_CACHE_PATH):
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk = shared_cache('laas_response', path, maxsize=maxsize)
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.memory.get(key, _NOT_CACHED)
+        if value is _NOT_CACHED:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        self.disk.set(key, value, self.ttl)
+
+    def stats(self):
+        return {'memory': self.memory.stats(), 'disk': self.disk.stats()}
+
+
+laas_response_cache = ResponseCache()
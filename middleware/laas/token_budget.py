@@ -0,0 +1,143 @@
+"""
+LaaS 에 요청하기 전에 메시지의 토큰 수를 추정하고, 컨텍스트 예산을 넘는 스레드는 나눠서 요약합니다.
+너무 긴 스레드가 LLM 호출 후에 실패하는 대신, 정해진 시간 안에 이슈를 생성할 수 있습니다.
+"""
+import os
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from middleware.laas.jira_fields_schema import ThreadSummary, get_format_instructions
+
+
+# 프리셋 모델의 컨텍스트 크기에서 응답 최대 길이를 뺀 값으로 지정합니다.
+LAAS_CONTEXT_TOKEN_BUDGET = int(os.getenv('LAAS_CONTEXT_TOKEN_BUDGET', 100000))
+LAAS_SUMMARY_CONCURRENCY = int(os.getenv('LAAS_SUMMARY_CONCURRENCY', 4))
+# 나눈 스레드를 요약할 때 사용하는 프리셋입니다. 지정하지 않으면 이슈 생성 프리셋을 사용합니다.
+LAAS_SUMMARY_HASH = os.getenv('LAAS_SUMMARY_HASH')
+# 나눈 스레드를 요약할 때 이슈 스키마 대신 보내는 params 입니다.
+SUMMARY_PARAMS = {'schema': get_format_instructions(ThreadSummary)}
+# 이미지 하나가 차지하는 토큰 수입니다. 1024px 이하 이미지의 high detail 기준입니다.
+LLM_IMAGE_TOKENS = int(os.getenv('LLM_IMAGE_TOKENS', 765))
+MESSAGE_OVERHEAD_TOKENS = 4
+MAX_COMPACTION_DEPTH = 3
+
+
+class ThreadTooLongError(Exception):
+    """
+    MAX_COMPACTION_DEPTH 번 요약해도 스레드가 예산을 넘을 때 발생합니다.
+    """
+
+
+def estimate_tokens(text):
+    """
+    토크나이저 없이 토큰 수를 추정합니다.
+    영문은 4글자에 1토큰, 한글 등 비 ASCII 문자는 1글자에 1토큰으로 넉넉하게 계산합니다.
+    """
+    ascii_count = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_count // 4 + (len(text) - ascii_count) + 1
+
+
+def estimate_message_tokens(message):
+    content = message['content']
+    if isinstance(content, str):
+        return MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content)
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    for part in content:
+        if part['type'] == 'text':
+            tokens += estimate_tokens(part['text'])
+        else:
+            tokens += LLM_IMAGE_TOKENS
+    return tokens
+
+
+def estimate_messages_tokens(messages):
+    return sum(map(estimate_message_tokens, messages))
+
+
+def truncate_message(message, budget):
+    """
+    메시지 하나가 예산을 넘으면 텍스트를 잘라냅니다. 이미지는 제외합니다.
+    """
+    content = message['content']
+    text = content if isinstance(content, str) else '\n'.join(p['text'] for p in content if p['type'] == 'text')
+    while estimate_tokens(text) > budget - MESSAGE_OVERHEAD_TOKENS and text:
+        text = text[:len(text) * 3 // 4]
+    return {**message, 'content': text + '...(생략)'}
+
+
+def chunk_messages(messages, budget):
+    """
+    메시지 순서를 유지하면서 예산 이하의 묶음으로 나눕니다.
+    """
+    chunks = [[]]
+    used = 0
+    for message in messages:
+        tokens = estimate_message_tokens(message)
+        if tokens > budget:
+            message = truncate_message(message, budget)
+            tokens = estimate_message_tokens(message)
+        if chunks[-1] and used + tokens > budget:
+            chunks.append([])
+            used = 0
+        chunks[-1].append(message)
+        used += tokens
+    return chunks
+
+
+def summary_text(content):
+    """
+    SUMMARY_PARAMS 형식({"summary": ...})의 응답에서 요약을 꺼냅니다. 형식이 다르면 응답을 그대로 사용합니다.
+    """
+    try:
+        return json.loads(content)['summary']
+    except (ValueError, TypeError, KeyError):
+        return content
+
+
+def _summary_messages(summaries):
+    return [
+        {
+            "role": "user",
+            "content": f'스레드 요약 ({i}/{len(summaries)}): """{summary_text(summary)}"""',
+        }
+        for i, summary in enumerate(summaries, start=1)
+    ]
+
+
+def compact_messages(messages, summarize, budget=LAAS_CONTEXT_TOKEN_BUDGET, max_workers=LAAS_SUMMARY_CONCURRENCY):
+    """
+    메시지가 예산을 넘으면 나눠서 동시에 요약(map)하고, 요약을 메시지로 대체(reduce)합니다.
+    요약도 예산을 넘으면 MAX_COMPACTION_DEPTH 까지 반복하고, 그래도 넘으면 ThreadTooLongError 를 발생시킵니다.
+
+    :param summarize: 메시지 목록을 받아 요약 문자열을 반환하는 함수. 요약 요청에는 SUMMARY_PARAMS 를 보냅니다.
+    """
+    for _ in range(MAX_COMPACTION_DEPTH):
+        if estimate_messages_tokens(messages) <= budget:
+            return messages
+        chunks = chunk_messages(messages, budget)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary') as executor:
+            messages = _summary_messages(list(executor.map(summarize, chunks)))
+    if estimate_messages_tokens(messages) <= budget:
+        return messages
+    raise ThreadTooLongError(f'thread exceeds {budget} tokens after {MAX_COMPACTION_DEPTH} compactions')
+
+
+async def acompact_messages(messages, summarize, budget=LAAS_CONTEXT_TOKEN_BUDGET, max_workers=LAAS_SUMMARY_CONCURRENCY):
+    """
+    compact_messages 의 비동기 버전입니다. summarize 는 코루틴 함수입니다.
+    """
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def limited(chunk):
+        async with semaphore:
+            return await summarize(chunk)
+
+    for _ in range(MAX_COMPACTION_DEPTH):
+        if estimate_messages_tokens(messages) <= budget:
+            return messages
+        chunks = chunk_messages(messages, budget)
+        messages = _summary_messages(await asyncio.gather(*map(limited, chunks)))
+    if estimate_messages_tokens(messages) <= budget:
+        return messages
+    raise ThreadTooLongError(f'thread exceeds {budget} tokens after {MAX_COMPACTION_DEPTH} compactions')
@@ -0,0 +1,216 @@
+"""
+laas_jira 작업의 단계별 소요 시간, 데이터 크기, 대기열 대기 시간, 오류 수를 수집합니다.
+METRICS_PORT 를 지정하면 Prometheus 형식으로 /metrics 에 노출하고, 각 단계는 Sentry span 으로도 기록합니다.
+
+    with stage('laas'):
+        gpt_response = ...
+"""
+import os
+import time
+import bisect
+import threading
+import contextlib
+import contextvars
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sentry_sdk
+
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+# Sentry 트랜잭션 샘플링 비율입니다.
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv('SENTRY_TRACES_SAMPLE_RATE', 0.1))
+# 분당 샘플링하는 트랜잭션 수의 목표입니다. 요청이 많으면 비율을 낮춥니다. 0 이면 SENTRY_TRACES_SAMPLE_RATE 를 그대로 사용합니다.
+SENTRY_TRACES_PER_MINUTE = float(os.getenv('SENTRY_TRACES_PER_MINUTE', 0))
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 5 * 1024 * 1024, 20 * 1024 * 1024, 100 * 1024 * 1024)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += value
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            for labels, value in self._values.items():
+                yield f'{self.name}{_format_labels(labels)} {value}'
+
+
+class Gauge:
+    """
+    수집할 때 함수를 호출하여 현재 값을 읽습니다.
+    """
+    def __init__(self, name, help, fn):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} gauge'
+        yield f'{self.name} {self.fn()}'
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels: [버킷별 개수, 합계, 개수]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [[0] * len(self.buckets), 0, 0]
+            counts, _, _ = item = self._values[key]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            item[1] += value
+            item[2] += 1
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            for labels, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    yield f'{self.name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}'
+                yield f'{self.name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}'
+                yield f'{self.name}_sum{_format_labels(labels)} {total}'
+                yield f'{self.name}_count{_format_labels(labels)} {count}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help):
+        return self.register(Counter(name, help))
+
+    def histogram(self, name, help, buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, help, buckets))
+
+    def gauge(self, name, help, fn):
+        return self.register(Gauge(name, help, fn))
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return '\n'.join(line for metric in self._metrics for line in metric.collect()) + '\n'
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.histogram('jira_bolt_stage_seconds', '작업 단계별 소요 시간(초)')
+stage_errors = registry.counter('jira_bolt_stage_errors_total', '작업 단계별 오류 수')
+payload_bytes = registry.histogram('jira_bolt_payload_bytes', '주고받은 데이터 크기(bytes)', BYTES_BUCKETS)
+queue_wait_seconds = registry.histogram('jira_bolt_queue_wait_seconds', '작업이 대기열에서 기다린 시간(초)')
+jobs_total = registry.counter('jira_bolt_jobs_total', '끝난 작업 수')
+# Slack API 호출 수, 토큰을 기다린 호출 수, 429 응답 수, 건너뛴 COSMETIC 호출 수입니다. SlackRateLimiter.stats() 와 같은 이름을 사용합니다.
+slack_calls = {
+    'calls': registry.counter('jira_bolt_slack_calls_total', 'Slack API 호출 수'),
+    'throttled': registry.counter('jira_bolt_slack_throttled_total', 'rate limit 토큰을 기다린 Slack API 호출 수'),
+    'rate_limited': registry.counter('jira_bolt_slack_rate_limited_total', 'Slack API 429 응답 수'),
+    'skipped': registry.counter('jira_bolt_slack_skipped_total', 'rate limit 에 여유가 없어 건너뛴 COSMETIC 호출 수'),
+}
+# 작업 하나의 단계별 소요 시간을 모읍니다. 작업을 기록할 때(EVENT_RECORD_PATH)만 설정합니다.
+stage_timings = contextvars.ContextVar('stage_timings', default=None)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    단계의 소요 시간과 오류를 기록하고 Sentry span 을 남깁니다.
+    """
+    start = time.perf_counter()
+    with sentry_sdk.start_span(op='laas_jira.stage', name=name):
+        try:
+            yield
+        except Exception as e:
+            stage_errors.inc(stage=name, error=type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stage_seconds.observe(elapsed, stage=name)
+            timings = stage_timings.get()
+            if timings is not None:
+                timings[name] = timings.get(name, 0) + elapsed
+
+
+class AdaptiveSampler:
+    """
+    sentry_sdk.init 의 traces_sampler 로 사용합니다.
+    rate 로 샘플링하되, 지난 1분 동안의 트랜잭션 수를 보고 분당 target_per_minute 개를 넘지 않도록 비율을 낮춥니다.
+    """
+    def __init__(self, rate=SENTRY_TRACES_SAMPLE_RATE, target_per_minute=SENTRY_TRACES_PER_MINUTE):
+        self.rate = rate
+        self.target_per_minute = target_per_minute
+        self._window_start = time.monotonic()
+        self._count = 0
+        self._last_count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sampling_context):
+        if sampling_context.get('parent_sampled') is not None:
+            return sampling_context['parent_sampled']
+        if not self.target_per_minute:
+            return self.rate
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 60:
+                self._last_count = self._count if now - self._window_start < 120 else 0
+                self._window_start = now
+                self._count = 0
+            self._count += 1
+            load = max(self._count, self._last_count)
+        return min(self.rate, self.target_per_minute / load)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """
+    METRICS_PORT 를 지정하면 백그라운드 스레드에서 /metrics 를 제공합니다.
+    """
+    if not port:
+        return None
+    server = ThreadingHTTPServer(('0.0.0.0', int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
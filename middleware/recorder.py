@@ -0,0 +1,115 @@
+"""
+처리한 reaction_added 이벤트를 JSONL 로 기록하여 benchmark.replay 로 같은 트래픽을 다시 재생할 수 있게 합니다.
+EVENT_RECORD_PATH 를 지정할 때만 기록합니다.
+
+유저와 채널 ID 는 프로세스마다 다른 salt 로 해시하고, 메시지 내용은 기록하지 않습니다.
+스레드는 메시지 수, 첨부파일 수와 크기, 글자 수만 기록하고, 단계별 소요 시간을 함께 기록합니다.
+
+{"at": 1700000000.0, "event": {...}, "thread": {"messages": 12, "files": 2, "file_bytes": [...], "text_chars": 3400},
+ "timings": {"check_emoji": 0.1, "thread_fetch": 0.8, "laas": 6.2, ...}, "duration": 9.1, "status": "done"}
+"""
+import os
+import json
+import time
+import hashlib
+import secrets
+import threading
+import contextlib
+
+from middleware.metrics import stage_timings
+
+
+# requests.jsonl 등 다른 파일을 덮어쓰지 않도록 기본값 없이 경로를 직접 지정해야 합니다.
+EVENT_RECORD_PATH = os.getenv('EVENT_RECORD_PATH')
+
+
+class EventRecorder:
+    def __init__(self, path=EVENT_RECORD_PATH):
+        self.path = path
+        self._salt = secrets.token_bytes(16)
+        self._lock = threading.Lock()
+
+    def pseudonym(self, value):
+        """
+        같은 프로세스에서는 같은 값이 같은 이름으로 바뀌어, 유저 캐시 적중률 같은 모양은 유지됩니다.
+        """
+        if not value:
+            return value
+        return value[0] + hashlib.blake2b(value.encode(), key=self._salt, digest_size=6).hexdigest().upper()
+
+    def sanitize(self, event):
+        return {
+            'type': event.get('type', 'reaction_added'),
+            'user': self.pseudonym(event['user']),
+            'reaction': event['reaction'],
+            'item_user': self.pseudonym(event.get('item_user')),
+            'item': {
+                'type': event['item'].get('type', 'message'),
+                'channel': self.pseudonym(event['item']['channel']),
+                'ts': event['item']['ts'],
+            },
+        }
+
+    @staticmethod
+    def thread_shape(data):
+        """
+        작업 기록(job.data)의 스레드 정보에서 모양만 남깁니다.
+        """
+        if 'messages' not in data:
+            return None
+        text_chars = 0
+        for message in data['messages']:
+            content = message['content']
+            if isinstance(content, list):
+                content = ''.join(part.get('text', '') for part in content)
+            text_chars += len(content)
+        return {
+            'messages': len(data['messages']),
+            'files': len(data['files']),
+            'file_bytes': [file.get('size') or 0 for file in data['files']],
+            'text_chars': text_chars,
+        }
+
+    @contextlib.contextmanager
+    def record(self, event, job):
+        """
+        작업을 실행하는 동안 단계별 소요 시간을 모으고, 끝나면 한 줄을 기록합니다.
+        """
+        if not self.path:
+            yield
+            return
+
+        timings = {}
+        token = stage_timings.set(timings)
+        at = time.time()
+        start = time.perf_counter()
+        status = 'failed'
+        try:
+            yield
+            status = 'done'
+        finally:
+            stage_timings.reset(token)
+            self.write({
+                'at': at,
+                'event': self.sanitize(event),
+                'thread': self.thread_shape(job.data),
+                'timings': timings,
+                'duration': time.perf_counter() - start,
+                'status': status,
+            })
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+event_recorder = EventRecorder()
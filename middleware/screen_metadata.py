@@ -0,0 +1,106 @@
+"""
+debug.issue_type_screen_metadata 로 저장한 Jira 화면 구성 스냅샷으로 이슈 필드를 확인합니다.
+Jira 는 이슈 유형의 생성 화면에 없는 필드를 지정하면 이슈 생성 전체를 거절하므로, Jira 를 호출하기 전에 화면에 없는 필드를 뺍니다.
+
+스냅샷은 이슈 유형마다 이슈를 생성할 때 사용하는 화면(create, 없으면 default)의 필드를 저장합니다.
+SCREEN_METADATA_DIR/<project>.json 에 저장하며, 형식이나 의미가 바뀌면 SNAPSHOT_VERSION 을 올립니다.
+버전이 다르거나 스냅샷이 없는 프로젝트는 확인하지 않습니다.
+
+{"version": 2, "project": "PI", "created_at": "...", "issue_types": {"버그": {"screen_id": ..., "screen_fields": [{"id": "summary", ...}], ...}}}
+"""
+import os
+import json
+import threading
+from datetime import datetime
+
+import sentry_sdk
+
+
+SCREEN_METADATA_DIR = os.getenv('SCREEN_METADATA_DIR', '.cache/screen_metadata')
+# 2: 화면 스킴의 모든 화면 중 마지막 화면 대신 생성 화면을 저장합니다.
+SNAPSHOT_VERSION = 2
+# 화면 구성과 관계없이 항상 지정할 수 있는 필드입니다.
+ALWAYS_ALLOWED_FIELDS = {'project', 'issuetype'}
+
+
+def snapshot_path(project, directory=SCREEN_METADATA_DIR):
+    return os.path.join(directory, f'{project}.json')
+
+
+def save_snapshot(project, issue_types, directory=SCREEN_METADATA_DIR):
+    path = snapshot_path(project, directory)
+    os.makedirs(directory, exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': SNAPSHOT_VERSION,
+            'project': project,
+            'created_at': datetime.now().isoformat(),
+            'issue_types': issue_types,
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def load_snapshot(project, directory=SCREEN_METADATA_DIR):
+    """
+    스냅샷이 없거나 버전이 다르면 None 을 반환합니다.
+    """
+    try:
+        with open(snapshot_path(project, directory), encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        print(f'Ignoring screen metadata snapshot of {project}: version {snapshot.get("version")} != {SNAPSHOT_VERSION}')
+        return None
+    return snapshot
+
+
+class ScreenMetadata:
+    """
+    프로젝트마다 처음 확인할 때 스냅샷을 읽어 이슈 유형 -> 화면 필드 ID 집합으로 보관합니다.
+    """
+    def __init__(self, directory=SCREEN_METADATA_DIR):
+        self.directory = directory
+        self._projects = {}
+        self._lock = threading.Lock()
+
+    def screen_fields(self, project, issue_type):
+        """
+        화면 필드 ID 집합을 반환합니다. 스냅샷이 없으면 None 입니다.
+        """
+        with self._lock:
+            if project not in self._projects:
+                snapshot = load_snapshot(project, self.directory)
+                self._projects[project] = snapshot and {
+                    name: {field['id'] for field in metadata['screen_fields']}
+                    for name, metadata in snapshot['issue_types'].items()
+                }
+            issue_types = self._projects[project]
+        if issue_types is None:
+            return None
+        return issue_types.get(issue_type)
+
+    def filter_fields(self, fields):
+        """
+        refined_fields 에서 이슈 유형의 생성 화면에 없는 필드를 뺍니다.
+        값이 있는 필드를 뺐다면 이슈에서 내용이 빠지므로 경고를 남기고 Sentry 로 보냅니다. 화면 구성을 확인하고 스냅샷을 다시 만들어 주세요.
+
+        :return: (fields, 뺀 필드 ID 목록)
+        """
+        allowed = self.screen_fields(fields['project']['key'], fields['issuetype']['name'])
+        if allowed is None:
+            return fields, []
+        dropped = [key for key in fields if key not in allowed and key not in ALWAYS_ALLOWED_FIELDS]
+        dropped_values = [key for key in dropped if fields[key] is not None]
+        if dropped_values:
+            message = (
+                f'Warning: dropped fields with values not on the {fields["project"]["key"]} '
+                f'{fields["issuetype"]["name"]} create screen: {dropped_values}'
+            )
+            print(message)
+            sentry_sdk.capture_message(message, level='warning')
+        return {key: value for key, value in fields.items() if key not in dropped}, dropped
+
+
+screen_metadata = ScreenMetadata()
@@ -0,0 +1,264 @@
+"""
+유저에게 전송하는 Slack 메시지 블록을 정의합니다.
+동기(app.py), 비동기(async_app.py) 실행 방식이 같은 메시지를 사용합니다.
+"""
+
+
+def laas_request_failed_blocks(error, link):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f'LaaS 서버에 요청하는 도중에 실패했습니다. 잠시 후 다시 시도해주세요. 동일한 문제가 계속 발생하면 관리자에게 문의해주세요.'
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f'Error Message: ```{error}``',
+                },
+                {
+                    "type": "mrkdwn",
+                    "text": f'<{link}|스레드 바로가기>',
+                }
+            ]
+        }
+    ]
+
+
+def thread_too_long_blocks(link):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f'스레드가 너무 길어서 Jira 이슈를 생성하지 못했습니다.'
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f'스레드를 나눠서 요약해도 LaaS 에 보낼 수 있는 길이를 넘었습니다. 필요한 내용만 담은 새 스레드에서 다시 시도해주세요.',
+                },
+                {
+                    "type": "mrkdwn",
+                    "text": f'<{link}|스레드 바로가기>',
+                }
+            ]
+        }
+    ]
+
+
+def laas_response_failed_blocks(gpt_response, link):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f'Jira 이슈 생성에 실패했습니다.'
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f'너무 많은 글자수가 스레드에 있진 않은지 확인해 보세요.\nError Message: ```{gpt_response}```',
+                },
+                {
+                    "type": "mrkdwn",
+                    "text": f'<{link}|스레드 바로가기>',
+                }
+            ]
+        }
+    ]
+
+
+def invalid_json_blocks(gpt_response, link):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f'Jira 이슈 생성에 실패했습니다.'
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": gpt_response,
+                },
+                {
+                    "type": "mrkdwn",
+                    "text": f'GPT 가 생성한 내용을 지라로 전달할 수 없어서 실패했습니다. 지라를 생성하기에 앞서 스레드 요약이 충분한지 확인해보세요.',
+                },
+                {
+                    "type": "mrkdwn",
+                    "text": f'<{link}|스레드 바로가기>',
+                }
+            ]
+        }
+    ]
+
+
+def already_created_blocks(emoji):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f'이미 지라 이슈가 생성되었습니다.'
+            },
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f'이미 :{emoji}: 이모지가 있어서 지라 이슈를 생성할 수 없습니다.'
+                    ' 히스토리가 이미 지라 티켓으로 저장되었으니 어사인을 변경하시거나, 스레드에서 논의를 지속하거나, 이모지를 모두 지우고 다시 시도해보세요.'
+                },
+            ]
+        }
+    ]
+
+
+def validation_failed_blocks(error, link):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": "Jira 이슈 생성에 실패했습니다."
+            }
+        },
+        {
+            "type": "section",
+            "text": {
+                "type": "plain_text",
+                "text": "이슈 타입별로 필수적인 필드가 있습니다. 필수 필드가 누락되지 않았는지 확인해보세요",
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"<{link}|스레드 바로가기>"
+                }
+            ]
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"Error Message: ```{str(error)}```"
+                }
+            ]
+        },
+    ]
+
+
+def jira_failed_blocks(error, link):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": "Jira 이슈 생성에 실패했습니다."
+            }
+        },
+        {
+            "type": "section",
+            "text": {
+                "type": "plain_text",
+                "text": "Jira 설정이 변경되거나, 개발 오류일 수 있습니다.",
+            }
+        },
+        {
+            "type": "section",
+            "text": {
+                "type": "plain_text",
+                "text": "혹은 Jira 서버 오류로 인해 이슈 생성에 실패할 수 있습니다. 이런 경우 잠시 후 다시 시도해보세요.",
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"<{link}|스레드 바로가기>"
+                }
+            ]
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"Error Message: ```{str(error)}```"
+                }
+            ]
+        },
+    ]
+
+
+def queue_full_blocks(error):
+    return [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": '요청이 많아 지금은 Jira 이슈를 생성할 수 없습니다.'
+            },
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f'처리 중인 요청이 많습니다. 이모지를 지우고 잠시 후 다시 시도해주세요.\nError Message: ```{error}```',
+                },
+            ]
+        }
+    ]
+
+
+def attachments_uploaded_blocks(issue_key, count, workspace):
+    return [
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f'<https://{workspace}/browse/{issue_key}|{issue_key}> 이슈에 첨부파일 {count}개를 업로드했습니다.',
+                },
+            ]
+        }
+    ]
+
+
+def attachments_failed_blocks(error, issue_key, workspace):
+    return [
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f'<https://{workspace}/browse/{issue_key}|{issue_key}> 이슈에 첨부파일을 업로드하지 못했습니다. 스크린샷 등은 직접 첨부해 주세요.',
+                },
+                {
+                    "type": "mrkdwn",
+                    "text": f'Error Message: ```{error}```',
+                },
+            ]
+        }
+    ]
@@ -0,0 +1,236 @@
+"""
+Slack Web API 를 메서드별 tier 에 맞춰 호출합니다.
+https://api.slack.com/apis/rate-limits
+
+메서드마다 토큰 버킷을 두고, 429 응답을 받으면 Retry-After 동안 해당 메서드 호출을 멈춘 뒤 다시 시도합니다.
+결과 메시지처럼 유저가 보는 호출(USER_VISIBLE)은 토큰을 기다리고,
+loading 이모지처럼 꾸미는 호출(COSMETIC)은 버킷에 여유가 있을 때만 호출하고 아니면 건너뜁니다.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from functools import partial
+
+from slack_sdk.errors import SlackApiError
+
+from middleware.metrics import slack_calls
+
+
+# 분당 호출 수입니다.
+SLACK_TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+SLACK_METHOD_TIERS = {
+    'conversations.history': 3,
+    'conversations.replies': 3,
+    'users.info': 4,
+    'users.list': 2,
+    'reactions.get': 3,
+    'reactions.add': 3,
+    'reactions.remove': 2,
+}
+# chat.postMessage 는 채널당 초당 1건 정도를 허용하는 special tier 입니다.
+SLACK_SPECIAL_RATES = {
+    'chat.postMessage': 60,
+}
+# 채널마다 버킷을 따로 두는 메서드입니다. 메시지가 많은 채널이 다른 채널의 안내 메시지를 막지 않습니다.
+SLACK_PER_CHANNEL_METHODS = {'chat.postMessage'}
+SLACK_DEFAULT_TIER = 3
+
+SLACK_RATE_LIMIT_MAX_WAIT = float(os.getenv('SLACK_RATE_LIMIT_MAX_WAIT', 30))
+SLACK_RATE_LIMIT_RETRIES = int(os.getenv('SLACK_RATE_LIMIT_RETRIES', 3))
+# COSMETIC 호출은 버킷에 이 비율보다 많은 토큰이 남아 있을 때만 호출합니다.
+SLACK_COSMETIC_RESERVE = float(os.getenv('SLACK_COSMETIC_RESERVE', 0.5))
+
+USER_VISIBLE = 'user_visible'
+COSMETIC = 'cosmetic'
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    rate_per_minute 만큼 채워지고 최대 capacity 개까지 쌓이는 토큰 버킷입니다.
+    잠금 안에서는 기다리지 않으므로 스레드와 이벤트 루프 어디에서 사용해도 됩니다.
+    """
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity or max(1, rate_per_minute // 6)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, reserve=0):
+        """
+        토큰을 하나 가져오면 0 을, 아니면 다시 시도할 때까지 기다릴 시간(초)을 반환합니다.
+        reserve 는 남겨둘 토큰 비율입니다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            needed = 1 + reserve * self.capacity
+            if self._tokens >= needed:
+                self._tokens -= 1
+                return 0
+            return (needed - self._tokens) / self.rate
+
+    def pause(self, seconds):
+        """
+        429 응답을 받으면 Retry-After 동안 멈추고, 이후에는 토큰 하나로 다시 시작합니다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 1
+            self._updated_at = self._paused_until
+
+
+def get_retry_after(error):
+    if not isinstance(error, SlackApiError) or error.response is None or error.response.status_code != 429:
+        return None
+    return float(error.response.headers.get('Retry-After') or 1)
+
+
+class SlackRateLimiter:
+    def __init__(
+        self,
+        max_wait=SLACK_RATE_LIMIT_MAX_WAIT,
+        max_retries=SLACK_RATE_LIMIT_RETRIES,
+        cosmetic_reserve=SLACK_COSMETIC_RESERVE,
+    ):
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.cosmetic_reserve = cosmetic_reserve
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # 메서드별로 토큰을 기다린 횟수(throttled), 429 응답 수(rate_limited), 건너뛴 COSMETIC 호출 수(skipped)입니다.
+        self._stats = defaultdict(lambda: {'calls': 0, 'throttled': 0, 'rate_limited': 0, 'skipped': 0})
+
+    def bucket(self, method, channel=None):
+        key = (method, channel) if method in SLACK_PER_CHANNEL_METHODS else (method, None)
+        with self._lock:
+            if key not in self._buckets:
+                rate = SLACK_SPECIAL_RATES.get(method) or SLACK_TIER_RATES[SLACK_METHOD_TIERS.get(method, SLACK_DEFAULT_TIER)]
+                self._buckets[key] = TokenBucket(rate)
+            return self._buckets[key]
+
+    def _count(self, method, key, priority):
+        with self._lock:
+            self._stats[method][key] += 1
+        slack_calls[key].inc(method=method, priority=priority)
+
+    def _next_delay(self, bucket, method, priority, waited):
+        """
+        토큰을 가져오면 0 을, 기다려야 하면 기다릴 시간을, COSMETIC 호출을 건너뛰어야 하면 None 을 반환합니다.
+        """
+        if priority == COSMETIC:
+            if bucket.try_acquire(self.cosmetic_reserve):
+                self._count(method, 'skipped', priority)
+                return None
+            return 0
+        delay = bucket.try_acquire()
+        if delay and not waited:
+            self._count(method, 'throttled', priority)
+        if delay and waited + delay > self.max_wait:
+            raise RateLimitTimeout(f'{method}: rate limit wait exceeded {self.max_wait}s')
+        return delay
+
+    def _on_error(self, bucket, method, priority, error, attempt):
+        """
+        429 응답이면 버킷을 멈추고 다시 시도할지 반환합니다.
+        """
+        retry_after = get_retry_after(error)
+        if retry_after is None:
+            return False
+        self._count(method, 'rate_limited', priority)
+        bucket.pause(retry_after)
+        return priority != COSMETIC and attempt < self.max_retries
+
+    def call(self, method, fn, *args, priority=USER_VISIBLE, **kwargs):
+        """
+        토큰을 가져온 뒤 fn 을 호출합니다. 건너뛰거나 rate limit 에 걸린 COSMETIC 호출은 None 을 반환합니다.
+        """
+        self._count(method, 'calls', priority)
+        bucket = self.bucket(method, kwargs.get('channel'))
+        for attempt in range(self.max_retries + 1):
+            waited = 0
+            while delay := self._next_delay(bucket, method, priority, waited):
+                time.sleep(delay)
+                waited += delay
+            if delay is None:
+                return None
+            try:
+                return fn(*args, **kwargs)
+            except SlackApiError as e:
+                if not self._on_error(bucket, method, priority, e, attempt):
+                    # COSMETIC 호출은 rate limit 일 때만 건너뛰고, already_reacted 같은 다른 오류는 호출한 쪽에서 처리합니다.
+                    if priority == COSMETIC and get_retry_after(e) is not None:
+                        return None
+                    raise
+
+    async def acall(self, method, fn, *args, priority=USER_VISIBLE, **kwargs):
+        """
+        call 의 비동기 버전입니다. fn 은 코루틴 함수입니다.
+        """
+        self._count(method, 'calls', priority)
+        bucket = self.bucket(method, kwargs.get('channel'))
+        for attempt in range(self.max_retries + 1):
+            waited = 0
+            while delay := self._next_delay(bucket, method, priority, waited):
+                await asyncio.sleep(delay)
+                waited += delay
+            if delay is None:
+                return None
+            try:
+                return await fn(*args, **kwargs)
+            except SlackApiError as e:
+                if not self._on_error(bucket, method, priority, e, attempt):
+                    # COSMETIC 호출은 rate limit 일 때만 건너뛰고, already_reacted 같은 다른 오류는 호출한 쪽에서 처리합니다.
+                    if priority == COSMETIC and get_retry_after(e) is not None:
+                        return None
+                    raise
+
+    def wrap_say(self, say, priority=USER_VISIBLE):
+        return partial(self.call, 'chat.postMessage', say, priority=priority)
+
+    def wrap_async_say(self, say, priority=USER_VISIBLE):
+        return partial(self.acall, 'chat.postMessage', say, priority=priority)
+
+    def stats(self):
+        with self._lock:
+            return {method: dict(stats) for method, stats in self._stats.items()}
+
+
+class RateLimitedSlackClient:
+    """
+    app.client 의 API 메서드를 SlackRateLimiter 를 거쳐 호출합니다.
+    메서드 이름은 Slack API 이름으로 바꿔 버킷을 찾습니다. e.g. reactions_add -> reactions.add
+
+        slack_client.reactions_add(channel=..., name=..., timestamp=..., priority=COSMETIC)
+    """
+    def __init__(self, client, limiter):
+        self.client = client
+        self.limiter = limiter
+
+    def _call(self, method, fn):
+        return partial(self.limiter.call, method, fn)
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        return self._call(name.replace('_', '.', 1), attr)
+
+
+class AsyncRateLimitedSlackClient(RateLimitedSlackClient):
+    def _call(self, method, fn):
+        return partial(self.limiter.acall, method, fn)
@@ -0,0 +1,119 @@
+"""
+첨부파일을 메모리에 모두 올리지 않고 요청 본문을 조각 단위로 만듭니다.
+본문의 길이는 미리 계산하여 Content-Length 로 보내므로 chunked 전송을 지원하지 않는 서버에도 보낼 수 있습니다.
+requests 는 __iter__ 를, aiohttp 는 __aiter__ 를 사용합니다.
+"""
+import re
+import json
+import base64
+import secrets
+
+
+ATTACHMENT_URL_PREFIX = 'attachment:'
+# base64 는 3바이트 단위로 인코딩하므로 조각을 3의 배수로 읽어야 이어 붙여도 전체를 인코딩한 결과와 같습니다.
+BASE64_CHUNK_SIZE = 3 * 16 * 1024
+_ATTACHMENT_URL = re.compile(r'"' + ATTACHMENT_URL_PREFIX + r'([0-9a-f]+)"')
+
+
+def attachment_url(key):
+    """
+    LaaS 메시지에서 이미지를 가리키는 URL 입니다. 요청을 보낼 때 data URL 로 바꿉니다.
+    """
+    return f'{ATTACHMENT_URL_PREFIX}{key}'
+
+
+def prune_attachment_urls(messages, images):
+    """
+    images 에 없는 이미지(다시 다운로드하지 못한 파일 등)를 메시지에서 제외합니다.
+    """
+    pruned = []
+    for message in messages:
+        content = message['content']
+        if not isinstance(content, str):
+            content = [
+                part for part in content
+                if part['type'] != 'image_url'
+                or not part['image_url']['url'].startswith(ATTACHMENT_URL_PREFIX)
+                or part['image_url']['url'][len(ATTACHMENT_URL_PREFIX):] in images
+            ]
+        pruned.append({**message, 'content': content})
+    return pruned
+
+
+class StreamingBody:
+    """
+    bytes 와 Attachment 를 이어 붙인 요청 본문입니다.
+    """
+    def __init__(self, parts):
+        self.parts = parts
+
+    def _part_length(self, part):
+        return len(part)
+
+    def _iter_part(self, part):
+        yield from part.iter_chunks()
+
+    def __len__(self):
+        return sum(len(part) if isinstance(part, bytes) else self._part_length(part) for part in self.parts)
+
+    def __iter__(self):
+        for part in self.parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from self._iter_part(part)
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
+
+
+class JSONBody(StreamingBody):
+    """
+    payload 의 "attachment:<key>" 문자열을 images[key] 의 data URL 로 바꾼 JSON 본문입니다.
+    base64 문자열 전체를 메모리에 만들지 않고 조각 단위로 인코딩합니다.
+    """
+    def __init__(self, payload, images):
+        encoded = json.dumps(payload)
+        parts = []
+        position = 0
+        for match in _ATTACHMENT_URL.finditer(encoded):
+            attachment = images[match.group(1)]
+            parts.append(encoded[position:match.start() + 1].encode())
+            parts.append(f'data:{attachment.mime_type};base64,'.encode())
+            parts.append(attachment)
+            position = match.end() - 1
+        parts.append(encoded[position:].encode())
+        super().__init__(parts)
+
+    def _part_length(self, part):
+        return (len(part) + 2) // 3 * 4
+
+    def _iter_part(self, part):
+        for chunk in part.iter_chunks(BASE64_CHUNK_SIZE):
+            yield base64.b64encode(chunk)
+
+
+class MultipartBody(StreamingBody):
+    """
+    multipart/form-data 본문입니다. 파일 내용은 보낼 때 조각 단위로 읽습니다.
+    """
+    def __init__(self, attachments, field='file'):
+        self.boundary = secrets.token_hex(16)
+        parts = []
+        for attachment in attachments:
+            # 따옴표와 개행은 HTML5 방식으로 이스케이프합니다.
+            filename = (attachment.name or 'file').replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+            parts.append((
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                f'Content-Type: {attachment.mime_type or "application/octet-stream"}\r\n\r\n'
+            ).encode())
+            parts.append(attachment)
+            parts.append(b'\r\n')
+        parts.append(f'--{self.boundary}--\r\n'.encode())
+        super().__init__(parts)
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
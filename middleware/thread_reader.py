@@ -0,0 +1,51 @@
+"""
+Slack 스레드 메시지를 페이지 단위로 읽어옵니다.
+긴 스레드도 잘리지 않으며, 첫 페이지를 받자마자 다음 단계(유저 조회, 첨부파일 다운로드)를 시작할 수 있습니다.
+"""
+import os
+
+
+SLACK_THREAD_PAGE_SIZE = int(os.getenv('SLACK_THREAD_PAGE_SIZE', 200))
+
+
+def normalize_message(message):
+    """
+    이후 단계에서 사용하는 필드만 남깁니다.
+    봇 메시지는 user 가 없으므로 봇 이름을 사용합니다.
+    """
+    return {
+        'ts': message['ts'],
+        'thread_ts': message.get('thread_ts'),
+        'user': message.get('user'),
+        'name': message.get('username') or message.get('bot_profile', {}).get('name'),
+        'text': message.get('text', ''),
+        'files': message.get('files', []),
+    }
+
+
+def iter_thread_messages(client, channel, ts, page_size=SLACK_THREAD_PAGE_SIZE):
+    """
+    conversations_replies 를 cursor 로 페이지네이션하며 메시지를 하나씩 반환합니다.
+    """
+    cursor = None
+    while True:
+        response = client.conversations_replies(channel=channel, ts=ts, limit=page_size, cursor=cursor)
+        for message in response['messages']:
+            yield normalize_message(message)
+        cursor = (response.get('response_metadata') or {}).get('next_cursor')
+        if not cursor:
+            return
+
+
+async def aiter_thread_messages(client, channel, ts, page_size=SLACK_THREAD_PAGE_SIZE):
+    """
+    iter_thread_messages 의 비동기 버전입니다.
+    """
+    cursor = None
+    while True:
+        response = await client.conversations_replies(channel=channel, ts=ts, limit=page_size, cursor=cursor)
+        for message in response['messages']:
+            yield normalize_message(message)
+        cursor = (response.get('response_metadata') or {}).get('next_cursor')
+        if not cursor:
+            return
@@ -0,0 +1,105 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from middleware.metrics import queue_wait_seconds
+
+
+class QueueFullError(Exception):
+    """
+    작업 대기열이 가득 차서 작업을 받을 수 없을 때 발생합니다.
+    """
+
+
+class BoundedWorkerPool:
+    """
+    고정된 개수의 워커와 크기가 제한된 대기열을 가진 실행기입니다.
+    이모지가 한꺼번에 몰려도 스레드 수와 메모리 사용량이 일정하게 유지됩니다.
+    """
+    def __init__(self, max_workers, max_queue_size, thread_name_prefix='worker'):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.name = thread_name_prefix
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        # 실행 중인 작업과 대기 중인 작업을 합친 슬롯입니다.
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        # 종료할 때 작업이 모두 끝나기를 기다릴 수 있도록 Condition 을 사용합니다.
+        self._lock = threading.Condition()
+        self._queued = 0
+        self._active = 0
+
+    def submit(self, fn, *args, timeout=None, **kwargs):
+        """
+        작업을 제출합니다.
+        timeout 동안 슬롯이 비지 않으면 QueueFullError 를 발생시킵니다. timeout 이 None 이면 즉시 거절합니다.
+        """
+        acquired = self._slots.acquire(timeout=timeout) if timeout else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise QueueFullError(f'queue is full (active={self.active_workers}, queued={self.queue_depth})')
+
+        with self._lock:
+            self._queued += 1
+        try:
+            future = self._executor.submit(self._run, time.monotonic(), fn, args, kwargs)
+        except Exception:
+            self._release_queued()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _release_queued(self):
+        with self._lock:
+            self._queued -= 1
+            self._lock.notify_all()
+        self._slots.release()
+
+    def _on_done(self, future):
+        # 시작하기 전에 취소된 작업은 _run 을 실행하지 않으므로 여기서 슬롯을 반환합니다.
+        if future.cancelled():
+            self._release_queued()
+
+    def _run(self, submitted_at, fn, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        queue_wait_seconds.observe(time.monotonic() - submitted_at, pool=self.name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._lock.notify_all()
+            self._slots.release()
+
+    @property
+    def queue_depth(self):
+        return self._queued
+
+    @property
+    def active_workers(self):
+        return self._active
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue_size': self.max_queue_size,
+                'active_workers': self._active,
+                'queue_depth': self._queued,
+            }
+
+    def shutdown(self, wait=True, cancel_futures=False, timeout=None):
+        """
+        timeout 을 지정하면 그 시간까지만 대기 중인 작업과 실행 중인 작업을 처리하고, 시작하지 못한 작업은 취소합니다.
+        모든 작업을 마쳤는지 반환합니다.
+        """
+        if timeout is None:
+            self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+            return True
+
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            drained = self._lock.wait_for(lambda: not self._queued and not self._active, timeout)
+        if not drained:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        return drained